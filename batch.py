@@ -0,0 +1,457 @@
+from collections import Counter, namedtuple
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from correction import GlycationGraph, read_clean_datasets, read_library
+
+#: a dataset of a batch: unique ``name`` and names of the files containing
+#: ``glycoforms``, ``glycation`` and the glycan ``library`` (or None)
+Sample = namedtuple("Sample", ["name", "glycoforms", "glycation", "library"])
+
+#: name of the journal in the output directory
+JOURNAL_NAME = "journal.jsonl"
+
+#: name of the directory (within the output directory)
+#: which collects error reports of failed samples
+QUARANTINE_NAME = "quarantine"
+
+#: names of the journal and the results of a shard of a batch,
+#: formatted with the shard index and the number of shards
+SHARD_JOURNAL_NAME = "journal_{}of{}.jsonl"
+SHARD_PART_NAME = "part_{}of{}.csv"
+_PART_PATTERN = re.compile(r"part_(\d+)of(\d+)\.csv$")
+
+#: a sample is quarantined after this number of runs
+#: which were aborted while correcting it
+MAX_ATTEMPTS = 2
+
+
+def read_manifest(filename: str) -> List[Sample]:
+    """
+    Read a batch manifest, i.e., a CSV file without header
+    which lists one sample per line: the glycoform file,
+    the glycation file and, optionally, a glycan library.
+    Relative paths refer to the directory of the manifest.
+    Samples are named after the path of their glycoform file
+    relative to the manifest, without extension and with
+    directory separators replaced by underscores
+    (e.g., "plate1_A01" for "plate1/A01.csv").
+
+    :param str filename: name of the manifest
+    :return: the samples
+    :rtype: list(Sample)
+    :raises ValueError: if the manifest contains too few columns,
+                        if a sample lacks a glycoform or glycation file
+                        or if two samples have the same name
+    """
+
+    df = pd.read_csv(filename, comment="#", header=None, dtype=str,
+                     skipinitialspace=True)
+    if df.shape[1] < 2:
+        raise ValueError("{} contains too few columns.".format(filename))
+    base = os.path.dirname(os.path.abspath(filename))
+
+    def path(value: Any) -> Optional[str]:
+        if pd.isnull(value) or not value.strip():
+            return None
+        return os.path.join(base, value.strip())
+
+    samples = []
+    names = {}  # type: Dict[str, str]
+    for i, row in enumerate(df.itertuples(index=False), 1):
+        glycoforms = path(row[0])
+        glycation = path(row[1])
+        if glycoforms is None or glycation is None:
+            raise ValueError(
+                "Sample {} in {} ('{}') lacks a {} file.".format(
+                    i, filename,
+                    ",".join("" if pd.isnull(v) else v for v in row),
+                    "glycoform" if glycoforms is None else "glycation"))
+        parts = os.path.splitext(os.path.relpath(glycoforms, base))[0]
+        name = "_".join(p for p in re.split(r"[\\/]", parts)
+                        if p not in ("", ".", ".."))
+
+        # result files of samples whose names differ only in case
+        # would overwrite each other on case-insensitive file systems
+        if name.lower() in names:
+            raise ValueError(
+                "Samples {} and {} in {} share the name '{}'."
+                .format(names[name.lower()], glycoforms, filename, name))
+        names[name.lower()] = glycoforms
+        samples.append(Sample(name=name,
+                              glycoforms=glycoforms,
+                              glycation=glycation,
+                              library=path(row[2]) if len(row) > 2 else None))
+    return samples
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification like "3/10".
+
+    :param str shard: the specification "i/N" of shard i (starting at 1)
+                      of N shards
+    :return: index and number of shards
+    :rtype: tuple(int, int)
+    :raises ValueError: if the specification is invalid
+    """
+
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", shard)
+    if match is None or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise ValueError(
+            "Invalid shard '{}': expected i/N with 1 <= i <= N."
+            .format(shard))
+    return int(match.group(1)), int(match.group(2))
+
+
+def shard_samples(samples: List[Sample],
+                  index: int,
+                  count: int) -> List[Sample]:
+    """
+    Select the samples of a shard. Samples are assigned to shards
+    by a stable hash of their name (which is derived from the path
+    of their glycoform file, not from its position in the manifest),
+    such that independent processes agree on the assignment without
+    coordination, and a sample stays in its shard if other samples
+    are added to the manifest.
+
+    :param list(Sample) samples: all samples of a batch
+    :param int index: index of the shard (starting at 1)
+    :param int count: number of shards
+    :return: the samples of the shard
+    :rtype: list(Sample)
+    """
+
+    return [s for s in samples
+            if int(hashlib.sha256(s.name.encode()).hexdigest(), 16)
+            % count == index - 1]
+
+
+def merge_parts(output_dir: str) -> pd.DataFrame:
+    """
+    Combine the results written by all shards of a batch
+    into one table.
+
+    :param str output_dir: output directory of the batch
+    :return: the results of all samples, with the sample name
+             in the first column, sorted by sample
+    :rtype: pd.DataFrame
+    :raises ValueError: if no parts exist, parts of different numbers
+                        of shards exist or parts are missing
+    """
+
+    parts = {}  # type: Dict[int, set]
+    for name in os.listdir(output_dir):
+        match = _PART_PATTERN.match(name)
+        if match is not None:
+            parts.setdefault(int(match.group(2)), set()).add(
+                int(match.group(1)))
+    if not parts:
+        raise ValueError("{} contains no results of shards."
+                         .format(output_dir))
+    if len(parts) > 1:
+        raise ValueError("{} contains results of {} shards. Remove "
+                         "the parts of earlier runs.".format(
+                             output_dir, " and ".join(
+                                 str(c) for c in sorted(parts))))
+    count, indices = parts.popitem()
+    missing = sorted(set(range(1, count + 1)) - indices)
+    if missing:
+        raise ValueError("Results of shards {} (of {}) are missing.".format(
+            ", ".join(str(i) for i in missing), count))
+
+    results = pd.concat(
+        [pd.read_csv(os.path.join(output_dir,
+                                  SHARD_PART_NAME.format(i, count)))
+         for i in range(1, count + 1)],
+        ignore_index=True)
+    order = np.argsort(results["sample"].values.astype(str),
+                       kind="mergesort")
+    return results.iloc[order].reset_index(drop=True)
+
+
+def input_hash(sample: Sample,
+               options: Dict[str, Any]) -> str:
+    """
+    Hash the contents of all input files of a sample
+    and the options that influence its results.
+
+    :param Sample sample: the sample
+    :param dict options: options passed to :func:`correct_sample`
+    :return: hexadecimal SHA-256 digest
+    :rtype: str
+    :raises OSError: if an input file cannot be read
+    """
+
+    digest = hashlib.sha256()
+    for filename in (sample.glycoforms, sample.glycation, sample.library):
+        if filename is None:
+            digest.update(b"\0")
+            continue
+        with open(filename, "rb") as f:
+            for block in iter(lambda: f.read(2**16), b""):
+                digest.update(block)
+        digest.update(b"\0")
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class Journal:
+    """
+    An append-only journal of a batch run in JSON Lines format.
+    Each record is written by a single system call and synced to disk
+    before the batch proceeds, so that the journal remains consistent
+    if the run is killed at any time. A truncated last record
+    is ignored when the journal is read.
+
+    :ivar str filename: name of the journal
+    :ivar dict records: maps sample names to a list of their records
+
+    .. automethod:: __init__
+    """
+
+    def __init__(self,
+                 filename: str) -> None:
+        """
+        Open a journal and read its records.
+
+        :param str filename: name of the journal, which is created
+                             if it does not exist
+        :return: nothing
+        :rtype: None
+        """
+
+        self.filename = filename
+        self.records = {}  # type: Dict[str, List[Dict[str, Any]]]
+        if not os.path.exists(filename):
+            return
+        with open(filename, "rb") as f:
+            content = f.read()
+        for line in content.splitlines():
+            try:
+                record = json.loads(line.decode())
+            except ValueError:
+                continue  # truncated by an aborted run
+            self.records.setdefault(record["sample"], []).append(record)
+        if content and not content.endswith(b"\n"):
+            self._append(b"\n")
+
+    def _append(self,
+                data: bytes) -> None:
+        """
+        Append data to the journal and sync it to disk.
+
+        :param bytes data: data to append
+        :return: nothing
+        :rtype: None
+        """
+
+        fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                     0o644)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def record(self,
+               sample: str,
+               status: str,
+               digest: str,
+               **fields: Any) -> None:
+        """
+        Add a record to the journal.
+
+        :param str sample: name of the sample
+        :param str status: "started", "done" or "failed"
+        :param str digest: input hash of the sample
+        :param fields: further fields of the record
+        :return: nothing
+        :rtype: None
+        """
+
+        record = dict(fields, sample=sample, status=status, hash=digest,
+                      time=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        self._append((json.dumps(record, sort_keys=True) + "\n").encode())
+        self.records.setdefault(sample, []).append(record)
+
+    def state(self,
+              sample: str,
+              digest: str) -> Optional[Dict[str, Any]]:
+        """
+        Determine the last record of a sample with unchanged input.
+
+        :param str sample: name of the sample
+        :param str digest: current input hash of the sample
+        :return: the last record or None if the sample has not been
+                 processed with this input
+        :rtype: dict
+        """
+
+        records = [r for r in self.records.get(sample, [])
+                   if r["hash"] == digest]
+        return records[-1] if records else None
+
+    def aborted_attempts(self,
+                         sample: str,
+                         digest: str) -> int:
+        """
+        Count the runs that were aborted while correcting a sample,
+        i.e., "started" records not followed by another record.
+
+        :param str sample: name of the sample
+        :param str digest: current input hash of the sample
+        :return: number of aborted attempts
+        :rtype: int
+        """
+
+        attempts = 0
+        for r in self.records.get(sample, []):
+            if r["hash"] != digest:
+                continue
+            attempts = attempts + 1 if r["status"] == "started" else 0
+        return attempts
+
+
+def correct_sample(sample: Sample,
+                   engine: str="dense",
+                   errors: bool=True,
+                   max_glycoforms: Optional[int]=None) -> pd.DataFrame:
+    """
+    Correct the abundances of a sample.
+
+    :param Sample sample: the sample
+    :param str engine: engine for solving the correction system
+    :param bool errors: propagate uncertainties if True
+    :param int max_glycoforms: maximum number of glycoforms
+    :return: results as returned by :meth:`GlycationGraph.to_dataframe`
+    :rtype: pd.DataFrame
+    :raises OSError: if an input file cannot be read
+    :raises ValueError: if the correction fails
+    """
+
+    glycoforms = read_clean_datasets(sample.glycoforms, errors=errors)
+    glycation = read_clean_datasets(sample.glycation, errors=errors)
+    if sample.library is None:
+        library = None
+    else:
+        library = read_library(sample.library)
+    G = GlycationGraph(library, glycoforms, glycation,
+                       errors=errors, max_glycoforms=max_glycoforms)
+    G.correct_abundances(engine)
+    return G.to_dataframe()
+
+
+def run_batch(samples: List[Sample],
+              output_dir: str,
+              retry_failed: bool=False,
+              journal_name: str=JOURNAL_NAME,
+              part_name: Optional[str]=None,
+              **options: Any) -> Counter:
+    """
+    Correct samples one after another and journal the results.
+    Results are written atomically to ``<output_dir>/<sample>_corr.csv``.
+    Samples whose results exist for unchanged input (and options)
+    are skipped, such that an aborted run can simply be restarted.
+    Samples that fail, or that were being corrected when
+    :data:`MAX_ATTEMPTS` runs were aborted, are quarantined:
+    their error is stored in ``<output_dir>/quarantine/<sample>.txt``,
+    and they are skipped in later runs unless retry_failed is True.
+
+    :param list(Sample) samples: the samples
+    :param str output_dir: directory for results and the journal
+    :param bool retry_failed: correct quarantined samples again
+    :param str journal_name: name of the journal in the output directory
+    :param str part_name: also write the results of all samples
+                          which are done (in this or an earlier run)
+                          to this file in the output directory,
+                          with the sample name in the first column
+                          (e.g., for :func:`merge_parts`)
+    :param options: options passed to :func:`correct_sample`
+    :return: number of samples per outcome
+             ("done", "skipped", "failed" and "quarantined",
+             i.e., failed in an earlier run)
+    :rtype: Counter
+    """
+
+    quarantine_dir = os.path.join(output_dir, QUARANTINE_NAME)
+    os.makedirs(quarantine_dir, exist_ok=True)
+    journal = Journal(os.path.join(output_dir, journal_name))
+    outcomes = Counter()  # type: Counter
+    outputs = []  # type: List[Tuple[str, str]]
+
+    def quarantine(sample: Sample,
+                   digest: str,
+                   error: str,
+                   report: str) -> None:
+        report_file = os.path.join(quarantine_dir,
+                                   "{}.txt".format(sample.name))
+        with open(report_file, "w") as f:
+            f.write(report)
+        journal.record(sample.name, "failed", digest, error=error,
+                       report=os.path.relpath(report_file, output_dir))
+        logging.error("Sample '{}' failed and was quarantined: {}"
+                      .format(sample.name, error))
+        outcomes["failed"] += 1
+
+    for sample in samples:
+        try:
+            digest = input_hash(sample, options)
+        except OSError as e:
+            quarantine(sample, "", str(e), traceback.format_exc())
+            continue
+
+        state = journal.state(sample.name, digest)
+        if state is not None:
+            if (state["status"] == "done" and os.path.exists(
+                    os.path.join(output_dir, state["output"]))):
+                outputs.append((sample.name, state["output"]))
+                outcomes["skipped"] += 1
+                continue
+            if state["status"] == "failed" and not retry_failed:
+                outcomes["quarantined"] += 1
+                continue
+            if (state["status"] == "started" and not retry_failed
+                    and journal.aborted_attempts(sample.name, digest)
+                    >= MAX_ATTEMPTS):
+                quarantine(sample, digest,
+                           "{} runs were aborted while correcting "
+                           "this sample.".format(MAX_ATTEMPTS), "")
+                continue
+
+        logging.info("Correcting sample '{}' …".format(sample.name))
+        journal.record(sample.name, "started", digest)
+        try:
+            results = correct_sample(sample, **options)
+            output = "{}_corr.csv".format(sample.name)
+            temp_file = os.path.join(output_dir, output + ".tmp")
+            results.to_csv(temp_file, index=False)
+            os.replace(temp_file, os.path.join(output_dir, output))
+        except Exception as e:  # quarantine any failure, continue the run
+            quarantine(sample, digest, str(e) or type(e).__name__,
+                       traceback.format_exc())
+            continue
+        journal.record(sample.name, "done", digest, output=output)
+        outputs.append((sample.name, output))
+        outcomes["done"] += 1
+
+    if part_name is not None:
+        part = pd.concat(
+            [pd.read_csv(os.path.join(output_dir, output))
+             .assign(sample=name) for name, output in outputs]
+            or [pd.DataFrame(columns=["sample"])],
+            ignore_index=True)
+        part = part[["sample"] + [c for c in part if c != "sample"]]
+        temp_file = os.path.join(output_dir, part_name + ".tmp")
+        part.to_csv(temp_file, index=False)
+        os.replace(temp_file, os.path.join(output_dir, part_name))
+    return outcomes
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser
+from itertools import product
+import logging
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from uncertainties import ufloat
+
+from correction import GlycationGraph, read_clean_datasets, read_library
+from glycan import PTMComposition
+from glycoprotein import Glycoprotein
+from hexchains import ENGINES, HexChains
+
+
+def _timeit(func: Callable[[], object],
+            repeat: int=3) -> float:
+    """
+    Measure the best wall-clock time of several calls of a function.
+
+    :param func: function without arguments
+    :param int repeat: number of calls
+    :return: best time in seconds
+    :rtype: float
+    """
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_memory(func: Callable[[], object]) -> Tuple[float, float]:
+    """
+    Measure runtime and peak memory allocated by Python during a function call.
+
+    :param func: function without arguments
+    :return: time in seconds and peak memory in MiB
+    :rtype: tuple(float, float)
+    """
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def _unique_glycoforms_materialized(gp: Glycoprotein) -> List[str]:
+    """
+    Reference enumeration that materializes all combinations
+    in a dataframe before merging equal compositions,
+    as done by cafog up to version 1.0.
+
+    :param Glycoprotein gp: glycoprotein
+    :return: names of the unique glycoforms
+    :rtype: list(str)
+    """
+
+    glycoforms = []
+    for combination in product(gp.glycan_library, repeat=gp.sites):
+        composition = sum([PTMComposition(ptm.composition)
+                           for ptm in combination],
+                          PTMComposition())
+        name = "/".join([ptm.name for ptm in combination])
+        glycoforms.append((composition, name, 0.0))
+    glycoforms = pd.DataFrame(
+        glycoforms, columns=["composition", "name", "abundance"])
+    glycoforms["group_key"] = glycoforms.apply(
+        lambda p: hash(p.composition), axis=1)
+    return list(glycoforms.groupby("group_key")["name"]
+                .agg(lambda n: " or ".join(n)))
+
+
+def _synthetic_chains(chains: int,
+                      length: int) -> HexChains:
+    """
+    Create complete hexose chains of equal length, as obtained
+    from libraries rich in high-mannose and galactosylated glycans.
+
+    :param int chains: number of chains
+    :param int length: number of glycoforms per chain
+    :return: the hexose chains
+    :rtype: HexChains
+    """
+
+    return HexChains(PTMComposition({"Hex": h, "HexNAc": n + 1})
+                     for n in range(chains)
+                     for h in range(length))
+
+
+def check_equivalence() -> bool:
+    """
+    Check that all engines yield the same corrected abundances
+    and errors as the dense engine for the sample data.
+
+    :return: True if all engines agree within 1e-9
+    :rtype: bool
+    """
+
+    glycoforms = read_clean_datasets("sample_data/glycoforms.csv")
+    glycation = read_clean_datasets("sample_data/glycation.csv")
+    library = read_library("sample_data/glycan_library.csv")
+
+    results = {}
+    for engine in ENGINES:
+        G = GlycationGraph(library, glycoforms, glycation)
+        G.correct_abundances(engine)
+        results[engine] = (G.to_dataframe()
+                           .set_index("glycoform")
+                           [["corr_abundance", "corr_abundance_error"]])
+
+    passed = True
+    reference = results["dense"]
+    for engine, result in results.items():
+        deviation = float(
+            (result.loc[reference.index] - reference).abs().max().max())
+        print("{:<8} max. deviation from dense: {:.2e}"
+              .format(engine, deviation))
+        passed &= deviation < 1e-9
+    return passed
+
+
+def bench_engines() -> bool:
+    """
+    Compare correction engines for increasing chain lengths.
+
+    :return: True
+    :rtype: bool
+    """
+
+    c = np.array([0.16, 0.045, 0.022, 0.015])
+    print("{:>6} {:>8} {:>12} {:>12}"
+          .format("length", "engine", "solve [ms]", "errors [ms]"))
+    for length in (10, 50, 200, 500):
+        chains = _synthetic_chains(20, length)
+        abundances = np.random.RandomState(0).rand(len(chains.nodes))
+        for engine in ENGINES:
+            t_solve = _timeit(lambda: chains.solve(c, abundances, engine))
+            t_errors = _timeit(lambda: chains.jacobian(c, abundances, engine))
+            print("{:>6} {:>8} {:>12.2f} {:>12.2f}"
+                  .format(length, engine, t_solve * 1e3, t_errors * 1e3))
+    return True
+
+
+def bench_enumeration() -> bool:
+    """
+    Compare peak memory of materialized and streaming enumeration
+    of glycoforms for a glycoprotein with four sites.
+
+    :return: True if both enumerations yield the same number of glycoforms
+    :rtype: bool
+    """
+
+    library = read_library("sample_data/glycan_library.csv").iloc[:7]
+    gp = Glycoprotein(sites=4, library=library)
+    results = {}
+
+    def materialized() -> None:
+        results["materialized"] = len(_unique_glycoforms_materialized(gp))
+
+    def streaming() -> None:
+        results["streaming"] = sum(1 for _ in gp.unique_glycoforms())
+
+    print("{} glycans, 4 sites, {} combinations"
+          .format(len(library), len(library) ** 4))
+    print("{:>12} {:>10} {:>10} {:>14}"
+          .format("method", "glycoforms", "time [s]", "peak [MiB]"))
+    for name, func in (("materialized", materialized),
+                       ("streaming", streaming)):
+        elapsed, peak = _peak_memory(func)
+        print("{:>12} {:>10} {:>10.2f} {:>14.1f}"
+              .format(name, results[name], elapsed, peak))
+    return results["materialized"] == results["streaming"]
+
+
+def bench_no_errors() -> bool:
+    """
+    Compare the runtime of correcting the sample data with and without
+    error propagation (``cafog.py --no-errors``). As when screening
+    a directory (``cafog.py --watch``), the glycation graph is assembled
+    once and reused for each sample, whose stages are timed separately;
+    the speedup compares their sum to the mode with errors.
+
+    :return: True if both modes yield identical nominal abundances
+    :rtype: bool
+    """
+
+    library = read_library("sample_data/glycan_library.csv")
+    results = {}
+    t_errors = None
+    print("{:>10} {:>10} {:>10} {:>10} {:>10} {:>11} {:>11} {:>8}"
+          .format("mode", "graph [ms]", "parse [ms]", "set [ms]",
+                  "solve [ms]", "export [ms]", "sample [ms]", "speedup"))
+    for errors in (True, False):
+        glycation = read_clean_datasets("sample_data/glycation.csv",
+                                        errors=errors)
+        data = {"glycoforms": read_clean_datasets(
+            "sample_data/glycoforms.csv", errors=errors)}
+
+        def graph() -> None:
+            data["graph"] = GlycationGraph(
+                library, data["glycoforms"], glycation, errors=errors)
+
+        def parse() -> None:
+            data["glycoforms"] = read_clean_datasets(
+                "sample_data/glycoforms.csv", errors=errors)
+
+        def set_abundances() -> None:
+            data["graph"].set_abundances(data["glycoforms"])
+
+        def solve() -> None:
+            data["graph"].correct_abundances()
+
+        def export() -> None:
+            results[errors] = data["graph"].to_dataframe()
+
+        t_graph = _timeit(graph) * 1e3
+        times = [_timeit(stage, repeat=50) * 1e3
+                 for stage in (parse, set_abundances, solve, export)]
+        if t_errors is None:
+            t_errors = sum(times)
+        print("{:>10} {:>10.1f} {:>10.2f} {:>10.2f} {:>10.2f} {:>11.2f} "
+              "{:>11.2f} {:>8.2f}"
+              .format("errors" if errors else "no errors", t_graph,
+                      *times, sum(times), t_errors / sum(times)))
+
+    columns = ["glycoform", "abundance", "corr_abundance"]
+    identical = results[True][columns].equals(results[False][columns])
+    print("nominal results identical: {}".format(identical))
+    return identical
+
+
+def _synthetic_glycoforms(library: pd.DataFrame,
+                          sites: int,
+                          observed: float) -> pd.Series:
+    """
+    Create observed abundances for a random subset of all glycoforms
+    of a glycoprotein, as for a huge library of which only a few
+    glycoforms are detected.
+
+    :param pd.DataFrame library: glycan library
+    :param int sites: number of glycosylation sites
+    :param float observed: fraction of glycoforms with nonzero abundance
+    :return: abundances with uncertainties (5 %), summing up to 100 %
+    :rtype: pd.Series
+    """
+
+    gp = Glycoprotein(sites=sites, library=library)
+    names = np.array([g.name.split(" or ")[0]
+                      for g in gp.unique_glycoforms()])
+    rs = np.random.RandomState(0)
+    selected = rs.choice(len(names), int(len(names) * observed),
+                         replace=False)
+    abundances = rs.lognormal(size=len(selected))
+    abundances *= 100 / abundances.sum()
+    return pd.Series([ufloat(a, 0.05 * a) for a in abundances],
+                     index=pd.Index(names[selected], name="index_col"),
+                     name="abundance")
+
+
+def bench_approximate() -> bool:
+    """
+    Compare speed and accuracy of approximate correction
+    (``cafog.py --epsilon``) for increasing epsilon, using
+    a glycoprotein with four sites of which 5 % of all glycoforms
+    are observed. The error is the sum of absolute deviations
+    of nominal corrected abundances from exact correction.
+    Times cover assembling the graph (including the enumeration
+    of glycoforms, which pruning cannot shorten) and the solve;
+    the speedup compares their sum to exact correction.
+
+    :return: True if all errors are within the reported bounds
+    :rtype: bool
+    """
+
+    library = read_library("sample_data/glycan_library.csv")
+    glycation = read_clean_datasets("sample_data/glycation.csv")
+    glycoforms = _synthetic_glycoforms(library, 4, 0.05)
+
+    exact = None
+    t_exact = None
+    passed = True
+    print("{:>8} {:>6} {:>6} {:>10} {:>10} {:>10} {:>8} {:>10} {:>10}"
+          .format("epsilon", "nodes", "edges", "graph [s]", "solve [ms]",
+                  "total [s]", "speedup", "error", "bound"))
+    for epsilon in (None, 1e-4, 1e-3, 1e-2, 1e-1, 1.0):
+        start = time.perf_counter()
+        G = GlycationGraph(library, glycoforms, glycation, epsilon=epsilon)
+        t_graph = time.perf_counter() - start
+        t_solve = _timeit(G.correct_abundances)
+        results = (G.to_dataframe()
+                   .set_index("glycoform")["corr_abundance"])
+        if exact is None:
+            exact = results
+            t_exact = t_graph + t_solve
+        error = float((results.reindex(exact.index).fillna(0.0)
+                       - exact).abs().sum())
+        passed &= error <= G.error_bound * (1 + 1e-9) + 1e-12
+        print("{:>8} {:>6} {:>6} {:>10.2f} {:>10.2f} {:>10.2f} {:>8.2f} "
+              "{:>10.2e} {:>10.2e}"
+              .format("exact" if epsilon is None else "{:g}".format(epsilon),
+                      len(G), G.number_of_edges(), t_graph, t_solve * 1e3,
+                      t_graph + t_solve, t_exact / (t_graph + t_solve),
+                      error, G.error_bound))
+    return passed
+
+
+_GUI_STARTUP_SCRIPT = """
+import sys
+from PyQt5.QtWidgets import QApplication
+import cafog_gui
+app = QApplication(sys.argv[:1])
+frame = cafog_gui.MainWindow()
+frame.show()
+app.processEvents()
+print(",".join(m for m in ("pandas", "networkx", "uncertainties",
+                           "correction", "PyQt5.QtSvg")
+               if m in sys.modules))
+"""
+
+
+def bench_gui_startup() -> bool:
+    """
+    Measure the cold start time of the GUI, i.e., the time from
+    starting the interpreter until the main window is shown,
+    using the offscreen Qt platform.
+
+    :return: True if the main window appears within one second
+    :rtype: bool
+    """
+
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        loaded = subprocess.check_output(
+            [sys.executable, "-c", _GUI_STARTUP_SCRIPT],
+            env=env, stderr=subprocess.DEVNULL,
+            universal_newlines=True).strip()
+        times.append(time.perf_counter() - start)
+    print("cold start until window is shown: {:.2f} s (best of 3)"
+          .format(min(times)))
+    print("heavy modules loaded at startup: {}".format(loaded or "none"))
+    return min(times) < 1
+
+
+#: available benchmarks
+BENCHMARKS = {
+    "equivalence": check_equivalence,
+    "engines": bench_engines,
+    "enumeration": bench_enumeration,
+    "no_errors": bench_no_errors,
+    "approximate": bench_approximate,
+    "gui_startup": bench_gui_startup
+}  # type: Dict[str, Callable[[], bool]]
+
+
+def setup_parser() -> ArgumentParser:
+    """
+    Set up options for the argument parser
+
+    :return: a parser for handling command line arguments
+    :rtype: ArgumentParser
+    """
+
+    parser = ArgumentParser(
+        description="Run benchmarks and consistency checks for cafog.")
+    parser.add_argument("benchmarks",
+                        nargs="*",
+                        help="benchmarks to run (default: all): {}"
+                             .format(", ".join(sorted(BENCHMARKS))),
+                        metavar="BENCHMARK")
+    return parser
+
+
+def _main() -> None:
+    """
+    Run the selected benchmarks.
+
+    :return: nothing
+    :rtype: None
+    """
+
+    logging.basicConfig(level=logging.ERROR)
+    parser = setup_parser()
+    args = parser.parse_args()
+    selected = args.benchmarks or sorted(BENCHMARKS)  # type: List[str]
+    for name in selected:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark: '{}'".format(name))
+
+    passed = True
+    for name in selected:
+        print("=== {} ===".format(name))
+        passed &= BENCHMARKS[name]()
+    if not passed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    _main()
@@ -1,3 +1,3 @@
-SOURCES = cafog.py cafog_gui.py correction.py glycan.py glycoprotein.py main_window.py widgets.py
+SOURCES = batch.py cafog.py cafog_gui.py correction.py glycan.py glycoprotein.py hexchains.py main_window.py memory.py report.py server.py session.py watch.py widgets.py
 FORMS = main_window.ui
 TRANSLATIONS = cafog_de.ts
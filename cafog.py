@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
 
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace
 import logging
 import os
+import signal
 import sys
 
-from correction import GlycationGraph, read_clean_datasets, read_library
+from batch import (JOURNAL_NAME, SHARD_JOURNAL_NAME, SHARD_PART_NAME,
+                   merge_parts, parse_shard, read_manifest, run_batch,
+                   shard_samples)
+from correction import (GlycationGraph, estimate_cost,
+                        read_clean_datasets, read_library)
+from hexchains import ENGINES
+from memory import MemoryProfile
+from server import CACHE_SIZE, DEFAULT_PORT, create_server
+from watch import POLL_INTERVAL, Watcher
 
 
 def setup_parser() -> ArgumentParser:
@@ -21,12 +30,13 @@ def setup_parser() -> ArgumentParser:
 
     parser.add_argument("-f", "--glycoforms",
                         action="store",
-                        help="CSV file containing glycoform abundances",
-                        required=True)
+                        help="CSV file containing glycoform abundances "
+                             "(required unless --batch or --watch "
+                             "is given)")
     parser.add_argument("-g", "--glycation",
                         action="store",
-                        help="CSV file containing glycation abundances",
-                        required=True)
+                        help="CSV file containing glycation abundances "
+                             "(required unless --batch is given)")
     parser.add_argument("-l", "--glycan-library",
                         action="store",
                         help="CSV file containing a glycan library")
@@ -35,6 +45,163 @@ def setup_parser() -> ArgumentParser:
                         help="graph output format, either 'dot' or 'gexf' ",
                         metavar="FORMAT",
                         choices=["dot", "gexf"])
+    parser.add_argument("-e", "--engine",
+                        action="store",
+                        help="engine for solving the correction system, "
+                             "either 'dense' (default) or 'fft' "
+                             "(requires a total glycation below 50 %%)",
+                        metavar="ENGINE",
+                        choices=ENGINES,
+                        default="dense")
+    parser.add_argument("-n", "--no-errors",
+                        action="store_true",
+                        help="only correct nominal abundances "
+                             "without propagating uncertainties; "
+                             "error columns are omitted from the output")
+    parser.add_argument("--epsilon",
+                        action="store",
+                        type=float,
+                        help="approximate correction: drop graph edges "
+                             "that carry at most EPS percent abundance "
+                             "and glycoforms whose observed abundance "
+                             "and inflow are at most EPS; an upper bound "
+                             "for the total error is reported "
+                             "(requires the 'dense' engine)",
+                        metavar="EPS")
+    parser.add_argument("-s", "--sensitivities",
+                        action="store_true",
+                        help="also write the derivatives of corrected "
+                             "abundances with respect to observed "
+                             "abundances and glycation abundances "
+                             "to <glycoforms>_sens_abundances.csv and "
+                             "<glycoforms>_sens_glycation.csv "
+                             "(nonzero entries only)")
+    parser.add_argument("--sensitivity-glycoforms",
+                        action="store",
+                        nargs="+",
+                        help="restrict sensitivities to these corrected "
+                             "glycoforms (e.g., 'A2G0F/A2G1F')",
+                        metavar="GLYCOFORM")
+    parser.add_argument("--alias-table",
+                        action="store",
+                        help="write all aliases of each glycoform "
+                             "to FILE and name glycoforms in the output "
+                             "only after their first alias",
+                        metavar="FILE")
+    parser.add_argument("--estimate",
+                        action="store_true",
+                        help="only estimate the numbers of glycoforms, "
+                             "graph edges and the required memory "
+                             "without correcting abundances")
+    parser.add_argument("--max-glycoforms",
+                        action="store",
+                        type=int,
+                        help="fail before enumerating glycoforms "
+                             "if there are more than N",
+                        metavar="N")
+    parser.add_argument("-b", "--batch",
+                        action="store",
+                        help="correct all samples listed in this CSV file "
+                             "(glycoform file, glycation file and "
+                             "optional glycan library per line); "
+                             "results and a journal are written to "
+                             "the output directory, and a restarted run "
+                             "skips samples whose input is unchanged",
+                        metavar="MANIFEST")
+    parser.add_argument("--shard",
+                        action="store",
+                        help="only correct shard I of N of a batch "
+                             "(e.g., for cluster array jobs); samples are "
+                             "assigned to shards by a stable hash of their "
+                             "name, and each shard writes its own journal "
+                             "and its results to part_IofN.csv in the "
+                             "output directory",
+                        metavar="I/N")
+    parser.add_argument("--merge",
+                        action="store",
+                        help="combine the results of all shards "
+                             "in this output directory of a batch "
+                             "and write them to STDOUT",
+                        metavar="DIR")
+    parser.add_argument("--report",
+                        action="store",
+                        help="render a report (bar charts in PNG and SVG "
+                             "format and an HTML page) for each result file "
+                             "(*_corr.csv) in this directory without "
+                             "a display; reports are written to the output "
+                             "directory (default: DIR/report)",
+                        metavar="DIR")
+    parser.add_argument("--report-top",
+                        action="store",
+                        type=int,
+                        help="number of glycoforms shown individually "
+                             "in a report; the remaining glycoforms are "
+                             "aggregated as 'other' (0: show all; "
+                             "default: 7)",
+                        metavar="N")
+    parser.add_argument("--jobs",
+                        action="store",
+                        type=int,
+                        help="number of worker processes for rendering "
+                             "reports (default: number of processors)",
+                        metavar="N")
+    parser.add_argument("-w", "--watch",
+                        action="store",
+                        help="correct each glycoform file (*.csv) "
+                             "that appears or changes in this directory "
+                             "with the given glycation file and glycan "
+                             "library until interrupted; inputs and "
+                             "glycation graphs are kept in memory, "
+                             "and results are written to the output "
+                             "directory",
+                        metavar="DIR")
+    parser.add_argument("--poll-interval",
+                        action="store",
+                        type=float,
+                        default=POLL_INTERVAL,
+                        help="time between two scans of a watched "
+                             "directory (default: %(default)s)",
+                        metavar="SECONDS")
+    parser.add_argument("--serve",
+                        action="store_true",
+                        help="run a correction server on localhost "
+                             "until interrupted; it keeps glycation graphs "
+                             "in memory and answers JSON requests "
+                             "(POST /correct, GET /stats)")
+    parser.add_argument("--port",
+                        action="store",
+                        type=int,
+                        default=DEFAULT_PORT,
+                        help="TCP port of the correction server "
+                             "(default: %(default)s)",
+                        metavar="PORT")
+    parser.add_argument("--socket",
+                        action="store",
+                        help="let the correction server listen on this "
+                             "Unix socket instead of a TCP port",
+                        metavar="PATH")
+    parser.add_argument("--cache-size",
+                        action="store",
+                        type=int,
+                        default=CACHE_SIZE,
+                        help="maximum number of glycation graphs cached "
+                             "by the correction server "
+                             "(default: %(default)s)",
+                        metavar="N")
+    parser.add_argument("--output-dir",
+                        action="store",
+                        help="output directory of a batch or a watched "
+                             "directory (default: MANIFEST or DIR without "
+                             "extension plus '_results')",
+                        metavar="DIR")
+    parser.add_argument("--retry-failed",
+                        action="store_true",
+                        help="correct quarantined samples of a batch again")
+    parser.add_argument("-m", "--memory-profile",
+                        action="store_true",
+                        help="report the memory used by parsing, enumeration, "
+                             "graph build, solve and export to STDERR, "
+                             "including the top allocators of the worst stage")
     parser.add_argument("-v", "--version",
                         action="version",
                         help="print the version number",
@@ -52,31 +219,254 @@ def _main() -> None:
 
     logging.basicConfig(format="%(levelname)s: %(message)s",
                         level=logging.INFO)
-    args = setup_parser().parse_args()
+    parser = setup_parser()
+    args = parser.parse_args()
+    if args.shard is not None and args.batch is None:
+        parser.error("argument --shard: requires -b/--batch")
+    if args.merge is not None:
+        _merge(args)
+        return
+    if args.report is not None:
+        _report(args)
+        return
+    if args.batch is not None:
+        _correct_batch(args)
+        return
+    if args.serve:
+        _serve(args)
+        return
+    if args.watch is not None:
+        if args.glycation is None:
+            parser.error("the following arguments are required "
+                         "for --watch: -g/--glycation")
+        _watch(args)
+        return
+    if args.glycoforms is None or args.glycation is None:
+        parser.error("the following arguments are required "
+                     "unless --batch or --watch is given: "
+                     "-f/--glycoforms, -g/--glycation")
+    with MemoryProfile(enabled=args.memory_profile) as profile:
+        _correct(args, profile)
+    if args.memory_profile:
+        print(profile.report(), file=sys.stderr)
+
+
+def _correct_batch(args: Namespace) -> None:
+    """
+    Correct all samples of a batch manifest.
+
+    :param Namespace args: parsed command line arguments
+    :return: nothing
+    :rtype: None
+    """
+
+    try:
+        samples = read_manifest(args.batch)
+        shard = None if args.shard is None else parse_shard(args.shard)
+    except (OSError, ValueError) as e:
+        logging.error(e)
+        sys.exit(-1)
+    output_dir = args.output_dir
+    if output_dir is None:
+        output_dir = os.path.splitext(args.batch)[0] + "_results"
+
+    journal_name, part_name = JOURNAL_NAME, None
+    if shard is not None:
+        samples = shard_samples(samples, *shard)
+        journal_name = SHARD_JOURNAL_NAME.format(*shard)
+        part_name = SHARD_PART_NAME.format(*shard)
+        logging.info("Shard {} of {} contains {} samples.".format(
+            shard[0], shard[1], len(samples)))
+    outcomes = run_batch(samples, output_dir,
+                         retry_failed=args.retry_failed,
+                         journal_name=journal_name,
+                         part_name=part_name,
+                         engine=args.engine,
+                         errors=not args.no_errors,
+                         max_glycoforms=args.max_glycoforms)
+    logging.info("{} samples: {} corrected, {} skipped (already done), "
+                 "{} failed, {} quarantined earlier".format(
+                     len(samples), outcomes["done"], outcomes["skipped"],
+                     outcomes["failed"], outcomes["quarantined"]))
+    if outcomes["failed"] or outcomes["quarantined"]:
+        sys.exit(1)
+
+
+def _merge(args: Namespace) -> None:
+    """
+    Combine the results of all shards of a batch.
+
+    :param Namespace args: parsed command line arguments
+    :return: nothing
+    :rtype: None
+    """
+
+    try:
+        results = merge_parts(args.merge)
+    except (OSError, ValueError) as e:
+        logging.error(e)
+        sys.exit(-1)
+    results.to_csv(sys.stdout, index=False)
+    logging.info("Merged the results of {} samples.".format(
+        results["sample"].nunique()))
+
+
+def _report(args: Namespace) -> None:
+    """
+    Render the reports of all result files in a directory.
+
+    :param Namespace args: parsed command line arguments
+    :return: nothing
+    :rtype: None
+    """
+
+    # Qt charts are only needed here
+    from report import TOP_GLYCOFORMS, render_reports
+
+    output_dir = args.output_dir
+    if output_dir is None:
+        output_dir = os.path.join(args.report, "report")
+    top = TOP_GLYCOFORMS if args.report_top is None else args.report_top
+    try:
+        filenames = sorted(os.path.join(args.report, f)
+                           for f in os.listdir(args.report)
+                           if f.endswith("_corr.csv"))
+        pages = render_reports(filenames, output_dir,
+                               top=top or None,
+                               workers=args.jobs)
+    except OSError as e:
+        logging.error(e)
+        sys.exit(-1)
+    failed = sum(page is None for page in pages.values())
+    logging.info("Rendered {} reports to '{}' ({} failed).".format(
+        len(pages) - failed, output_dir, failed))
+    if failed:
+        sys.exit(1)
+
+
+def _serve(args: Namespace) -> None:
+    """
+    Run a correction server until interrupted.
+
+    :param Namespace args: parsed command line arguments
+    :return: nothing
+    :rtype: None
+    """
+
+    try:
+        server = create_server(args.port, args.socket, args.engine,
+                               args.cache_size)
+    except OSError as e:
+        logging.error(e)
+        sys.exit(-1)
+    if args.socket is None:
+        logging.info("Serving on http://127.0.0.1:{} …".format(args.port))
+    else:
+        logging.info("Serving on {} …".format(args.socket))
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket is not None and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        logging.info("Server stopped.")
+
+
+def _watch(args: Namespace) -> None:
+    """
+    Correct all glycoform files that appear in a directory.
+
+    :param Namespace args: parsed command line arguments
+    :return: nothing
+    :rtype: None
+    """
+
+    output_dir = args.output_dir
+    if output_dir is None:
+        output_dir = os.path.normpath(args.watch) + "_results"
+    watcher = Watcher(args.watch, output_dir, args.glycation,
+                      library=args.glycan_library,
+                      engine=args.engine,
+                      errors=not args.no_errors,
+                      max_glycoforms=args.max_glycoforms)
+    try:
+        watcher.run(args.poll_interval)
+    except OSError as e:
+        logging.error(e)
+        sys.exit(-1)
+    except KeyboardInterrupt:
+        logging.info("Stopped watching '{}'.".format(args.watch))
+
+
+def _correct(args: Namespace,
+             profile: MemoryProfile) -> None:
+    """
+    Correct abundances as requested on the command line.
+
+    :param Namespace args: parsed command line arguments
+    :param MemoryProfile profile: record memory usage in this profile
+    :return: nothing
+    :rtype: None
+    """
 
     # read input files
     dataset_name = os.path.splitext(args.glycoforms)[0]
     try:
-        glycoforms = read_clean_datasets(args.glycoforms)
-        glycation = read_clean_datasets(args.glycation)
-        if args.glycan_library is None:
-            glycan_library = None
-        else:
-            glycan_library = read_library(args.glycan_library)
+        with profile.stage("parsing"):
+            glycoforms = read_clean_datasets(args.glycoforms,
+                                             errors=not args.no_errors)
+            glycation = read_clean_datasets(args.glycation,
+                                            errors=not args.no_errors)
+            if args.glycan_library is None:
+                glycan_library = None
+            else:
+                glycan_library = read_library(args.glycan_library)
     except (OSError, ValueError) as e:
         logging.error(e)
         sys.exit(-1)
 
+    if args.estimate:
+        try:
+            estimate = estimate_cost(glycan_library, glycoforms, glycation)
+        except ValueError as e:
+            logging.error(e)
+            sys.exit(1)
+        print("combinations,multisets,glycoforms,chains,chain_length,"
+              "edges,memory_mib")
+        print("{},{},{},{},{},{},{:.1f}".format(
+            estimate.combinations, estimate.multisets, estimate.compositions,
+            estimate.chains, estimate.chain_length, estimate.edges,
+            estimate.memory / 2**20))
+        return
+
     # assemble the glycation graph, correct abundances and store
     logging.info("Correcting dataset '{}' …".format(args.glycoforms))
     try:
-        G = GlycationGraph(glycan_library, glycoforms, glycation)
-        G.correct_abundances()
-        G.to_dataframe().to_csv(sys.stdout, index=False)
-        if args.graph_output_format == "dot":
-            G.to_dot("{}_corr.gv".format(dataset_name))
-        elif args.graph_output_format == "gexf":
-            G.to_gexf("{}_corr.gexf".format(dataset_name))
+        G = GlycationGraph(glycan_library, glycoforms, glycation,
+                           memory_profile=profile,
+                           errors=not args.no_errors,
+                           max_glycoforms=args.max_glycoforms,
+                           epsilon=args.epsilon)
+        G.correct_abundances(args.engine)
+        with profile.stage("export"):
+            G.to_dataframe(aliases=args.alias_table is None).to_csv(
+                sys.stdout, index=False)
+            if args.alias_table is not None:
+                G.alias_table().to_csv(args.alias_table, index=False)
+            if args.graph_output_format == "dot":
+                G.to_dot("{}_corr.gv".format(dataset_name))
+            elif args.graph_output_format == "gexf":
+                G.to_gexf("{}_corr.gexf".format(dataset_name))
+            if args.sensitivities or args.sensitivity_glycoforms:
+                d_abundances, d_glycation = G.sensitivities(
+                    args.sensitivity_glycoforms, args.engine)
+                d_abundances.to_csv(
+                    "{}_sens_abundances.csv".format(dataset_name))
+                d_glycation.to_csv(
+                    "{}_sens_glycation.csv".format(dataset_name))
     except ValueError as e:
         logging.error(e)
         sys.exit(1)
@@ -1,30 +1,39 @@
 import logging
 import math
+import queue
 import sys
-from typing import Optional
-
-import pandas as pd
+import threading
+from typing import List, Optional, Tuple
 
+# pandas, QtSvg and the correction stack (numpy, networkx, uncertainties)
+# are imported when first needed, so that the main window appears quickly;
+# QtChart is required by the chart views of the main window
 from PyQt5.QtChart import (QBarCategoryAxis, QBarSeries, QBarSet,
                            QChart, QChartView, QValueAxis)
-from PyQt5.QtCore import (Qt, QLibraryInfo, QLocale,
-                          QMargins, QRectF, QSize, QTranslator)
+from PyQt5.QtCore import (pyqtSignal, Qt, QLibraryInfo, QLocale, QMargins,
+                          QObject, QRectF, QSize, QThread, QTranslator)
 from PyQt5.QtGui import QBrush, QColor, QDropEvent, QMouseEvent, QPainter
-from PyQt5.QtSvg import QSvgGenerator
 from PyQt5.QtWidgets import (QApplication, QHeaderView, QMainWindow,
                              QMessageBox, QTableWidgetItem, QTextEdit, QWidget)
 
-from correction import GlycationGraph, read_clean_datasets, read_library
-
 from main_window import Ui_MainWindow
 from widgets import (FileTypes, SortableTableWidgetItem,
                      get_filename, open_manual)
 
 
+class _LogEmitter(QObject):
+    """
+    Carries formatted log records to the main thread.
+    """
+
+    message = pyqtSignal(str)
+
+
 class TextEditHandler(logging.Handler):
     """
     A handler for Python's logging module
     which redirects logging output to a QTextEdit.
+    Records may be logged from any thread.
 
     .. automethod:: __init__
     """
@@ -41,6 +50,8 @@ class TextEditHandler(logging.Handler):
 
         super().__init__()
         self.widget = widget
+        self._emitter = _LogEmitter()
+        self._emitter.message.connect(widget.append)
 
     def emit(self,
              record: logging.LogRecord) -> None:
@@ -52,7 +63,170 @@ class TextEditHandler(logging.Handler):
         :rtype: None
         """
 
-        self.widget.append(self.format(record))
+        self._emitter.message.emit(self.format(record))
+
+
+class FileLoader(QThread):
+    """
+    A worker thread which parses input files in the order
+    in which they were queued. Parsed data are collected
+    until all queued files are parsed and then handed over
+    in one batch.
+
+    Signals:
+
+    - ``loaded(batch)``: all queued files were parsed;
+      ``batch`` is a list of ``(kind, filename, data)`` tuples
+      in the order in which the files were queued
+    - ``failed(kind, filename, message)``: a file could not be parsed
+    - ``progress(done, total)``: number of parsed and queued files;
+      both are zero after cancellation
+
+    .. automethod:: __init__
+    """
+
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str, str, str)
+    progress = pyqtSignal(int, int)
+
+    #: kinds of input files
+    KINDS = ("glycation", "glycoforms", "library")
+
+    def __init__(self,
+                 parent: QObject=None) -> None:
+        """
+        Initialize the worker.
+
+        :param QObject parent: parent object
+        :return: nothing
+        :rtype: None
+        """
+
+        super().__init__(parent)
+        self._jobs = queue.Queue()  # type: queue.Queue
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._done = 0
+        self._total = 0
+        self._batch = []  # type: list
+
+    def load(self,
+             kind: str,
+             filename: str) -> None:
+        """
+        Queue a file for parsing and start the thread if necessary.
+
+        :param str kind: one of :attr:`KINDS`
+        :param str filename: name of the file
+        :return: nothing
+        :rtype: None
+        """
+
+        if kind not in self.KINDS:
+            raise ValueError("Unknown input file type '{}'.".format(kind))
+        with self._lock:
+            self._total += 1
+            self._jobs.put((self._generation, kind, filename))
+            done, total = self._done, self._total
+        self.progress.emit(done, total)
+        if not self.isRunning():
+            self.start()
+
+    def cancel(self) -> None:
+        """
+        Discard all queued files. The file currently being parsed
+        cannot be interrupted, but its data are discarded.
+
+        :return: nothing
+        :rtype: None
+        """
+
+        with self._lock:
+            self._generation += 1
+            self._done = self._total = 0
+            self._batch = []
+            while True:
+                try:
+                    self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+        self.progress.emit(0, 0)
+
+    def stop(self) -> None:
+        """
+        Cancel all pending files and wait until the thread has finished.
+
+        :return: nothing
+        :rtype: None
+        """
+
+        self.cancel()
+        if self.isRunning():
+            self._jobs.put(None)
+            self.wait()
+
+    def busy(self) -> bool:
+        """
+        Check whether files are still being parsed.
+
+        :return: True if any queued file has not been parsed yet
+        :rtype: bool
+        """
+
+        with self._lock:
+            return self._done < self._total
+
+    def run(self) -> None:
+        """
+        Parse queued files until :meth:`stop` is called.
+
+        :return: nothing
+        :rtype: None
+        """
+
+        from correction import read_clean_datasets, read_library
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            generation, kind, filename = job
+            data, error = None, None
+            try:
+                if kind == "library":
+                    data = read_library(filename)
+                else:
+                    data = read_clean_datasets(filename)
+                    if kind == "glycoforms":
+                        data = data.sort_values(ascending=False)
+            except (OSError, ValueError) as e:
+                error = str(e)
+            except Exception as e:
+                # malformed files may raise anything (e.g., a TypeError
+                # for non-numeric errors), which must not end the thread
+                error = "Could not read {}: {}".format(
+                    filename, str(e) or type(e).__name__)
+            finally:
+                # count the file even if parsing was aborted,
+                # since the loader would otherwise stay busy forever
+                with self._lock:
+                    current = generation == self._generation
+                    if current:
+                        self._done += 1
+                        if error is None:
+                            self._batch.append((kind, filename, data))
+                    done, total = self._done, self._total
+                    batch = None
+                    if current and done == total:
+                        batch, self._batch = self._batch, []
+
+            if not current:
+                continue  # cancelled while parsing
+            if error is not None:
+                self.failed.emit(kind, filename, error)
+            if batch:
+                self.loaded.emit(batch)
+            self.progress.emit(done, total)
 
 
 class MainWindow(QMainWindow, Ui_MainWindow):
@@ -79,12 +253,14 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # instance attributes
         self.glycation = None
         self.glycation_graph = None
+        self.graph_input = None
         self.glycoforms = None
         self.glycoforms_agg = None
         self.last_path = None
         self.library = None
         self.results = None
         self.results_agg = None
+        self.results_edges = None
 
         # actions
         self.cbAggGlycoforms.clicked.connect(self.toggle_agg_glycoforms)
@@ -99,15 +275,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.cvGlycoforms.dropEvent = lambda e: self.drop_file(
             e, self.cvGlycoforms)
 
+        self.btCancelLoading.clicked.connect(self.cancel_loading)
         self.btCorrect.clicked.connect(self.correct_abundances)
         self.btHelp.clicked.connect(open_manual)
         self.btLoadGlycation.clicked.connect(lambda: self.load_glycation())
         self.btLoadGlycoforms.clicked.connect(lambda: self.load_glycoforms())
         self.btLoadLibrary.clicked.connect(lambda: self.load_library())
         self.btQuit.clicked.connect(QApplication.instance().quit)
+        self.btOpenSession.clicked.connect(lambda: self.open_session())
         self.btSampleData.clicked.connect(self.load_sample_data)
         self.btSaveGraph.clicked.connect(self.save_graph)
         self.btSaveResults.clicked.connect(self.save_results)
+        self.btSaveSession.clicked.connect(self.save_session)
 
         self.sbAggGlycoforms.valueChanged.connect(self.agg_glycoforms)
         self.sbAggResults.valueChanged.connect(self.agg_results)
@@ -151,7 +330,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             QHeaderView.Fixed)
         self.twLibrary.verticalHeader().setDefaultSectionSize(22)
         self.twLibrary.setRowCount(2)
-        self.twLibrary.setSpan(0, 0, 2, 2)
+        self.twLibrary.setSpan(0, 0, 2, 3)
         item = QTableWidgetItem(
             self.tr("""Drag and drop glycan library data\n
 or click 'Load ...' (optional)"""))
@@ -163,6 +342,13 @@ or click 'Load ...' (optional)"""))
             0, QHeaderView.Stretch)
         self.twResults.verticalHeader().setDefaultSectionSize(22)
 
+        # file loader
+        self.file_loader = FileLoader(self)
+        self.file_loader.loaded.connect(self.show_input)
+        self.file_loader.failed.connect(self.show_input_error)
+        self.file_loader.progress.connect(self.update_loading_progress)
+        QApplication.instance().aboutToQuit.connect(self.file_loader.stop)
+
         # logger
         handler = TextEditHandler(self.teLog)
         handler.setFormatter(logging.Formatter("[%(levelname)s]  %(message)s"))
@@ -181,18 +367,89 @@ or click 'Load ...' (optional)"""))
         self.load_glycation("sample_data/glycation.csv")
         self.load_library("sample_data/glycan_library.csv")
 
+    def show_input(self,
+                   batch: List[Tuple[str, str, object]]) -> None:
+        """
+        Display a batch of input data parsed by the file loader.
+        If several files of one kind were parsed, only the last one
+        is displayed.
+
+        :param batch: kind (glycation, glycoforms or library),
+                      name and parsed data of each file
+        :type batch: list(tuple(str, str, object))
+        :return: nothing
+        :rtype: None
+        """
+
+        latest = {kind: data for kind, _, data in batch}
+        if "glycation" in latest:
+            self.show_glycation(latest["glycation"])
+        if "glycoforms" in latest:
+            self.show_glycoforms(latest["glycoforms"])
+        if "library" in latest:
+            self.show_library(latest["library"])
+
+    def show_input_error(self,
+                         kind: str,
+                         filename: str,
+                         message: str) -> None:
+        """
+        Report an input file which could not be parsed.
+
+        :param str kind: glycation, glycoforms or library
+        :param str filename: name of the file
+        :param str message: error message
+        :return: nothing
+        :rtype: None
+        """
+
+        logging.error(message)
+        QMessageBox.critical(self, self.tr("Error"), message)
+
+    def update_loading_progress(self,
+                                done: int,
+                                total: int) -> None:
+        """
+        Show the progress of the file loader. The progress bar
+        is hidden and corrections are enabled once all files are parsed.
+
+        :param int done: number of parsed files
+        :param int total: number of queued files
+        :return: nothing
+        :rtype: None
+        """
+
+        loading = done < total
+        self.pbLoading.setMaximum(total)
+        self.pbLoading.setValue(done)
+        self.pbLoading.setFormat(self.tr("loading file {} of {}")
+                                 .format(min(done + 1, total), total))
+        self.pbLoading.setVisible(loading)
+        self.btCancelLoading.setVisible(loading)
+        self.btCorrect.setEnabled(not loading)
+
+    def cancel_loading(self) -> None:
+        """
+        Discard all files which have not been parsed yet.
+
+        :return: nothing
+        :rtype: None
+        """
+
+        if self.file_loader.busy():
+            logging.info(self.tr("Loading cancelled"))
+        self.file_loader.cancel()
+
     def load_glycation(self,
                        filename: Optional[str]=None) -> None:
         """
-        Load glycation data from a CSV file and display it
-        in the corresponding chart view.
+        Load glycation data from a CSV file in the background.
 
         :param str filename: directly load this file
-        :return: nothing, sets self.se_glycation
+        :return: nothing
         :rtype: None
         """
 
-        # load and clean glycation data
         if filename is None:
             filename, self.last_path = get_filename(
                 self, "open", self.tr("Load glycation data ..."),
@@ -202,12 +459,19 @@ or click 'Load ...' (optional)"""))
 
         logging.info(self.tr("Loading glycation data in '{}'")
                      .format(filename))
-        try:
-            self.glycation = read_clean_datasets(filename)
-        except (OSError, ValueError) as e:
-            logging.error(str(e))
-            QMessageBox.critical(self, self.tr("Error"), str(e))
-            return
+        self.file_loader.load("glycation", filename)
+
+    def show_glycation(self,
+                       glycation: "pd.Series") -> None:
+        """
+        Display glycation data in the corresponding chart view.
+
+        :param pd.Series glycation: glycation data
+        :return: nothing, sets self.glycation
+        :rtype: None
+        """
+
+        self.glycation = glycation
 
         # extract x- and y-values from series
         x_values = [str(i) for i in self.glycation.index]
@@ -254,7 +518,9 @@ or click 'Load ...' (optional)"""))
 
         if e.mimeData().hasUrls():
             filename = e.mimeData().urls()[0].toLocalFile()
-            if source == self.cvGlycoforms:
+            if filename.endswith(".npz"):
+                self.open_session(filename)
+            elif source == self.cvGlycoforms:
                 self.load_glycoforms(filename)
             elif source == self.cvGlycation:
                 self.load_glycation(filename)
@@ -292,14 +558,13 @@ or click 'Load ...' (optional)"""))
     def load_glycoforms(self,
                         filename: Optional[str]=None) -> None:
         """
-        Load glycoform data from a CSV file.
+        Load glycoform data from a CSV file in the background.
 
         :param str filename: directly load this file
-        :return: nothing, sets self.se_glycoforms
+        :return: nothing
         :rtype: None
         """
 
-        # load and clean glycoform data
         if filename is None:
             filename, self.last_path = get_filename(
                 self, "open", self.tr("Load glycoform data ..."),
@@ -309,14 +574,20 @@ or click 'Load ...' (optional)"""))
 
         logging.info(self.tr("Loading glycoform data in '{}'")
                      .format(filename))
-        try:
-            self.glycoforms = (read_clean_datasets(filename)
-                               .sort_values(ascending=False))
-        except (OSError, ValueError) as e:
-            logging.error(str(e))
-            QMessageBox.critical(self, self.tr("Error"), str(e))
-            return
+        self.file_loader.load("glycoforms", filename)
+
+    def show_glycoforms(self,
+                        glycoforms: "pd.Series") -> None:
+        """
+        Display glycoform data.
+
+        :param pd.Series glycoforms: glycoform data,
+                                     sorted by decreasing abundance
+        :return: nothing, sets self.glycoforms
+        :rtype: None
+        """
 
+        self.glycoforms = glycoforms
         for widget in (self.cbAggGlycoforms,
                        self.sbAggGlycoforms,
                        self.lbAggGlycoforms):
@@ -372,6 +643,8 @@ or click 'Load ...' (optional)"""))
         :rtype: None
         """
 
+        import pandas as pd
+
         # aggregate "other" abundances
         if self.cbAggGlycoforms.isChecked():
             agg_abundance = (self.glycoforms
@@ -438,10 +711,10 @@ or click 'Load ...' (optional)"""))
     def load_library(self,
                      filename: Optional[str]=None) -> None:
         """
-        Load a glycan library and display in the respective table.
+        Load a glycan library from a CSV file in the background.
 
         :param str filename: directly load this file
-        :return: nothing, changes self.se_library
+        :return: nothing
         :rtype: None
         """
 
@@ -454,24 +727,36 @@ or click 'Load ...' (optional)"""))
 
         logging.info(self.tr("Loading glycan library in '{}'")
                      .format(filename))
-        try:
-            self.library = read_library(filename)
-        except (OSError, ValueError) as e:
-            logging.error(str(e))
-            QMessageBox.critical(self, self.tr("Error"), str(e))
-            return
+        self.file_loader.load("library", filename)
 
-        # fill the table
+    def show_library(self,
+                     library: "pd.DataFrame") -> None:
+        """
+        Display a glycan library in the respective table.
+
+        :param pd.DataFrame library: glycan library
+        :return: nothing, sets self.library
+        :rtype: None
+        """
+
+        self.library = library
+
+        # fill the table without repainting after each item
+        self.twLibrary.setUpdatesEnabled(False)
         self.twLibrary.clearContents()
-        self.twLibrary.setRowCount(0)
+        self.twLibrary.clearSpans()
+        self.twLibrary.setRowCount(len(self.library))
         self.twLibrary.horizontalHeader().setVisible(True)
         self.twLibrary.verticalHeader().setVisible(True)
-        for row_id, row in self.library.fillna("").iterrows():
-            self.twLibrary.insertRow(row_id)
-            for col_id in (0, 1):
-                item = QTableWidgetItem(str(row.iloc[col_id]))
+        for row_id, row in enumerate(self.library.fillna("").itertuples(
+                index=False)):
+            for col_id, value in enumerate(row):
+                if isinstance(value, float) and value.is_integer():
+                    value = int(value)  # sites are read as float
+                item = QTableWidgetItem(str(value))
                 item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
                 self.twLibrary.setItem(row_id, col_id, item)
+        self.twLibrary.setUpdatesEnabled(True)
 
     def correct_abundances(self) -> None:
         """
@@ -495,13 +780,27 @@ or click 'Load ...' (optional)"""))
         logging.info(self.tr("Correcting dataset  ..."))
         QApplication.setOverrideCursor(Qt.WaitCursor)
         QApplication.processEvents()
+        from correction import GlycationGraph
         try:
-            self.glycation_graph = GlycationGraph(glycan_library=self.library,
-                                                  glycoforms=self.glycoforms,
-                                                  glycation=self.glycation)
+            if (self.graph_input is not None
+                    and self.graph_input[0] is self.glycoforms
+                    and self.graph_input[1] is self.glycation
+                    and self.library is not None):
+                # only the library changed: update the graph incrementally
+                self.glycation_graph.update_library(self.library)
+            else:
+                self.graph_input = None
+                self.glycation_graph = GlycationGraph(
+                    glycan_library=self.library,
+                    glycoforms=self.glycoforms,
+                    glycation=self.glycation)
+                if self.library is not None:
+                    self.graph_input = (self.glycoforms, self.glycation)
             self.glycation_graph.correct_abundances()
             self.results = self.glycation_graph.to_dataframe()
+            self.results_edges = None
         except ValueError as e:
+            self.graph_input = None
             QApplication.restoreOverrideCursor()
             logging.error(str(e))
             QMessageBox.critical(self, self.tr("Error"), str(e))
@@ -522,6 +821,7 @@ or click 'Load ...' (optional)"""))
 
         # fill the table
         self.twResults.clearContents()
+        self.twResults.setRowCount(0)
         for row_id, row in self.results.iterrows():
             self.twResults.insertRow(row_id)
 
@@ -548,7 +848,8 @@ or click 'Load ...' (optional)"""))
                        self.sbAggResults,
                        self.lbAggResults,
                        self.btSaveResults,
-                       self.btSaveGraph):
+                       self.btSaveGraph,
+                       self.btSaveSession):
             widget.setEnabled(True)
         self.sbAggResults.setMaximum(len(self.results) - 2)
         self.agg_results()
@@ -614,63 +915,21 @@ or click 'Load ...' (optional)"""))
         :rtype: None
         """
 
+        from report import aggregate_results, results_chart
+
         # aggregate "other" abundances
+        top = None
         if self.cbAggResults.isChecked():
-            agg_abundance = (self.results
-                             .iloc[self.sbAggResults.value():]
-                             .sum())
-            agg_abundance["glycoform"] = self.tr("other")
-            self.results_agg = (
-                self.results
-                    .iloc[:self.sbAggResults.value()]
-                    .append(agg_abundance, ignore_index=True))
-        else:
-            self.results_agg = self.results
-
-        # extract x- and y-values from series
-        x_values = list(self.results_agg["glycoform"].str.split(" or").str[0])
-        y_values_obs = list(self.results_agg["abundance"])
-        y_values_cor = list(self.results_agg["corr_abundance"])
-
-        # assemble the chart
-        bar_set_obs = QBarSet(self.tr("observed"))
-        bar_set_obs.append(y_values_obs)
-        bar_set_obs.setColor(QColor("#225ea8"))
-        bar_set_obs.hovered.connect(self.update_results_label)
-        bar_set_cor = QBarSet(self.tr("corrected"))
-        bar_set_cor.append(y_values_cor)
-        bar_set_cor.setColor(QColor("#41b6c4"))
-        bar_set_cor.hovered.connect(self.update_results_label)
-        bar_series = QBarSeries()
-        bar_series.append([bar_set_obs, bar_set_cor])
-
-        x_axis = QBarCategoryAxis()
-        x_axis.append(x_values)
-        x_axis.setTitleVisible(False)
-        x_axis.setLabelsAngle(270)
-
-        range_min = min(self.results_agg[["abundance", "corr_abundance"]]
-                            .min().min(),
-                        0)
-        range_min = math.floor(range_min / 20) * 20
-        range_max = (self.results_agg[["abundance", "corr_abundance"]]
-                         .max().max())
-        range_max = math.ceil(range_max / 20) * 20
-        tick_count = (range_max - range_min) // 20 + 1
-        y_axis = QValueAxis()
-        y_axis.setRange(range_min, range_max)
-        y_axis.setTickCount(tick_count)
-        y_axis.setTitleText(self.tr("abundance"))
-        y_axis.setLabelFormat("%d")
-
-        chart = QChart()
-        chart.addSeries(bar_series)
-        chart.setAxisX(x_axis, bar_series)
-        chart.setAxisY(y_axis, bar_series)
-        chart.legend().setVisible(False)
-        chart.setBackgroundRoundness(0)
-        chart.layout().setContentsMargins(0, 0, 0, 0)
-        chart.setMargins(QMargins(5, 5, 5, 5))
+            top = self.sbAggResults.value()
+        self.results_agg = aggregate_results(self.results, top,
+                                             self.tr("other"))
+
+        chart = results_chart(self.results_agg,
+                              self.tr("observed"),
+                              self.tr("corrected"),
+                              self.tr("abundance"))
+        for bar_set in chart.series()[0].barSets():
+            bar_set.hovered.connect(self.update_results_label)
         self.cvResults.setChart(chart)
 
     def toggle_agg_results(self) -> None:
@@ -708,6 +967,7 @@ or click 'Load ...' (optional)"""))
             elif filename.endswith("png"):
                 self.cvResults.grab().save(filename)
             elif filename.endswith("svg"):
+                from PyQt5.QtSvg import QSvgGenerator
                 output_rect = QRectF(
                     self.cvResults.chart().scene().sceneRect())
                 output_size = QSize(output_rect.size().toSize())
@@ -745,6 +1005,21 @@ or click 'Load ...' (optional)"""))
         logging.info(self.tr("Saving glycation graph to '{}'")
                      .format(filename))
         try:
+            if self.glycation_graph is None:
+                # sessions do not contain the graph itself
+                from correction import GlycationGraph
+                QApplication.setOverrideCursor(Qt.WaitCursor)
+                try:
+                    self.glycation_graph = GlycationGraph(
+                        glycan_library=self.library,
+                        glycoforms=self.glycoforms,
+                        glycation=self.glycation)
+                    self.glycation_graph.correct_abundances()
+                finally:
+                    QApplication.restoreOverrideCursor()
+            # exporting modifies node attributes, so the graph
+            # cannot be updated incrementally afterwards
+            self.graph_input = None
             if filename.endswith("gv"):
                 self.glycation_graph.to_dot(filename)
             elif filename.endswith("gexf"):
@@ -755,6 +1030,80 @@ or click 'Load ...' (optional)"""))
             return
 
 
+    def save_session(self) -> None:
+        """
+        Save input data, graph topology and results
+        in a session archive.
+
+        :return: nothing
+        :rtype: None
+        """
+
+        filename, self.last_path = get_filename(
+            self, "save", self.tr("Save session ..."),
+            self.last_path, FileTypes(["npz"]))
+        if filename is None:
+            return
+
+        logging.info(self.tr("Saving session to '{}'").format(filename))
+        from session import Session, graph_edges, save_session
+        if self.results_edges is None:
+            self.results_edges = graph_edges(self.glycation_graph,
+                                             self.results)
+        try:
+            save_session(filename, Session(glycoforms=self.glycoforms,
+                                           glycation=self.glycation,
+                                           library=self.library,
+                                           results=self.results,
+                                           edges=self.results_edges))
+        except (OSError, ValueError) as e:
+            logging.error(str(e))
+            QMessageBox.critical(self, self.tr("Error"), str(e))
+            return
+
+    def open_session(self,
+                     filename: Optional[str]=None) -> None:
+        """
+        Open a session archive and show its input data and results
+        without correcting abundances again.
+
+        :param str filename: directly open this file
+        :return: nothing
+        :rtype: None
+        """
+
+        if filename is None:
+            filename, self.last_path = get_filename(
+                self, "open", self.tr("Open session ..."),
+                self.last_path, FileTypes(["npz"]))
+            if filename is None:
+                return
+
+        logging.info(self.tr("Opening session '{}'").format(filename))
+        from session import load_session
+        try:
+            session = load_session(filename)
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(str(e))
+            QMessageBox.critical(self, self.tr("Error"), str(e))
+            return
+
+        self.cancel_loading()
+        self.show_glycoforms(session.glycoforms)
+        self.show_glycation(session.glycation)
+        if session.library is None:
+            self.library = None
+            self.twLibrary.clearContents()
+            self.twLibrary.setRowCount(0)
+        else:
+            self.show_library(session.library)
+        self.glycation_graph = None
+        self.graph_input = None
+        self.results = session.results
+        self.results_edges = session.edges
+        self.show_results()
+
+
 def _main() -> None:
     """
     Execute the main application loop.
@@ -1,30 +1,101 @@
+from collections import Counter, namedtuple
+from contextlib import contextmanager
 import logging
-import re
-from typing import Optional
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from multiset import FrozenMultiset
 import networkx as nx
+import numpy as np
 import pandas as pd
 from PyQt5 import QtCore
 from uncertainties import ufloat
+from uncertainties.core import AffineScalarFunc
 
 from glycan import PTMComposition
-from glycoprotein import Glycoprotein
+from glycoprotein import (CostEstimate, GlycoformIndex, Glycoprotein,
+                          library_rows)
+from hexchains import ENGINES, HexChains
+from memory import MemoryProfile
 
 translate = QtCore.QCoreApplication.translate
 
+_logger = logging.getLogger(__name__)
+
+# threads which currently suppress log messages of this module
+_log_state = threading.local()
+
+
+class _QuietFilter(logging.Filter):
+    """
+    Discard log messages emitted by threads within :func:`_quiet`.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not getattr(_log_state, "quiet", False)
+
+
+_logger.addFilter(_QuietFilter())
+
+
+@contextmanager
+def _quiet() -> Iterator[None]:
+    """
+    Suppress log messages of this module in the current thread.
+
+    :return: a context manager
+    """
+
+    previous = getattr(_log_state, "quiet", False)
+    _log_state.quiet = True
+    try:
+        yield
+    finally:
+        _log_state.quiet = previous
+
+
+#: corrected abundances as returned by :func:`correct_arrays`:
+#: arrays ``glycoform``, ``abundance``, ``abundance_error``,
+#: ``corr_abundance`` and ``corr_abundance_error`` with one item per
+#: glycoform of the glycation graph, and ``rows``, which contains
+#: the item of each input glycoform (-1 if it was ignored)
+CorrectedArrays = namedtuple(
+    "CorrectedArrays",
+    ["glycoform", "abundance", "abundance_error",
+     "corr_abundance", "corr_abundance_error", "rows"])
+
 
 class GlycationGraph(nx.DiGraph):
     """
     A glycation graph.
 
+    :ivar list glycation_fractions: glycation fractions with uncertainties;
+                                    item k-1 is the fraction of glycoforms
+                                    that gain k hexoses
+    :ivar HexChains chains: the nodes arranged in hexose chains
+    :ivar bool errors: True if uncertainties are propagated;
+                      otherwise, abundances and glycation fractions
+                      are plain floats
+    :ivar MemoryProfile memory_profile: memory accounting for the stages
+                                        "enumeration", "graph build"
+                                        and "solve"
+    :ivar float error_bound: upper bound for the sum of absolute errors
+                             of nominal corrected abundances (including
+                             glycoforms dropped from the graph)
+                             introduced by approximate correction;
+                             0 for exact correction
+
     .. automethod:: __init__
     """
 
     def __init__(self,
                  glycan_library: Optional[pd.DataFrame],
                  glycoforms: pd.Series,
-                 glycation: pd.Series) -> None:
+                 glycation: pd.Series,
+                 memory_profile: Optional[MemoryProfile]=None,
+                 errors: bool=True,
+                 max_glycoforms: Optional[int]=None,
+                 epsilon: Optional[float]=None) -> None:
         """
         Assemble the glycoform graph from peptide mapping
         and glycation frequency data.
@@ -32,166 +103,808 @@ class GlycationGraph(nx.DiGraph):
         :param pd.DataFrame glycan_library: a glycan library
         :param pd.Series glycoforms: list of glycoforms with abundances/errors
         :param pd.Series glycation: list of glycations with abundances/errors
+        :param MemoryProfile memory_profile: record the memory usage
+                                             of each stage in this profile
+                                             (default: no accounting)
+        :param bool errors: if False, only nominal values are corrected
+                            and no derivatives are calculated; glycoforms
+                            and glycation may then contain plain floats
+        :param int max_glycoforms: fail before enumerating glycoforms
+                                   if there are more than this number
+                                   (default: no limit)
+        :param float epsilon: approximate correction: drop edges whose
+                              carried abundance (in percent) cannot
+                              exceed epsilon and glycoforms whose observed
+                              abundance and inflow cannot exceed it,
+                              see :meth:`HexChains.prune`; the "fft"
+                              engine cannot solve a pruned graph
+                              (default: exact correction)
         :raises ValueError: if a glycan with unknown monosaccharide
-                            composition is added
+                            composition is added or the number of
+                            glycoforms exceeds max_glycoforms
         :return: nothing
         :rtype: None
         """
 
         super().__init__()
-
-        # regex for extracting the first glycoform from a string like
-        # "A2G0F/A2G1F or A2G1F/A2G0F"
-        re_first_glycoform = re.compile("([^\s]*)")
-
-        # series with a monosaccharide set as index
-        # and abundances as values
-        exp_abundances = glycoforms.reset_index()
-        exp_abundances["sugar_set"] = exp_abundances["index_col"].apply(
-            lambda v: FrozenMultiset(v.split("/")))
-        site_count = exp_abundances["sugar_set"].apply(len).unique()
-        if site_count.size != 1:
-            raise ValueError(
-                translate(
-                    "correction",
-                    "Glycoforms have unequal number of glycosylation sites."))
+        if memory_profile is None:
+            memory_profile = MemoryProfile(enabled=False)
+        self.memory_profile = memory_profile
+        self.errors = errors
+        if errors:
+            zero = ufloat(0, 0)
         else:
-            site_count = int(site_count[0])
-            logging.info(translate("correction", "Glycoprotein has {} sites.")
-                         .format(site_count))
-        exp_abundances = exp_abundances.set_index("sugar_set")["abundance"]
+            zero = 0.0
+            glycoforms = pd.Series(_nominal_values(glycoforms),
+                                   index=glycoforms.index, name="abundance")
+            glycation = pd.Series(_nominal_values(glycation),
+                                  index=glycation.index, name="abundance")
+
+        gp = _assemble_glycoprotein(glycan_library, glycoforms)
+        self._glycoprotein = gp
+        self._glycoform_index = None  # type: Optional[GlycoformIndex]
+        self._library_rows = (None if glycan_library is None
+                              else library_rows(glycan_library))
+        self._observed_glycans = {g for glycoform in glycoforms.index
+                                  for g in glycoform.split("/")}
+        self._zero = zero
+
+        # arrays of node data from the last correction,
+        # discarded whenever nodes or abundances change
+        self._node_data = None  # type: Optional[dict]
+        self._epsilon = epsilon
 
         # dict mapping hexose differences to abundances
-        delta_ptm = {PTMComposition({"Hex": count}): abundance / 100
+        delta_hex = {int(count): abundance / 100
                      for count, abundance in glycation.iteritems()
                      if count > 0}
+        self._delta_hex = delta_hex
+        self.glycation_fractions = [
+            delta_hex.get(k, zero)
+            for k in range(1, int(glycation.index.max()) + 1)]
 
-        gp = Glycoprotein(sites=site_count, library=glycan_library)
-        glycoform_glycans = set()
-        for v in exp_abundances.index.values:
-            glycoform_glycans |= set(v)
-
-        if glycan_library is None:
-            # fill the glycan library from glycans in glycoforms
-            logging.info(translate("correction",
-                                   "No glycan library specified. "
-                                   "Extracting glycans from glycoforms ..."))
-            for g in glycoform_glycans:
-                try:
-                    gp.add_glycan(g)
-                except ValueError as e:
-                    raise e
-        else:
-            # compare monosaccharide set of glycan library and glycoforms;
-            # add glycans that only appear in the list of glycoforms
-            # to the library, but this only works if they have a valid name
-            library_glycans = set([n.name for n in gp.glycan_library])
-
-            glycans_only_in_library = library_glycans - glycoform_glycans
-            if glycans_only_in_library:
-                logging.warning(
-                    translate(
-                        "correction",
-                        "The following glycans only appear "
-                        "in the glycan library, "
-                        "but not in the list of glycoforms: {}.")
-                    .format(", ".join(glycans_only_in_library)))
-
-            glycans_only_in_glycoforms = glycoform_glycans - library_glycans
-            if glycans_only_in_glycoforms:
-                logging.warning(
+        if max_glycoforms is not None:
+            _check_glycoform_count(gp.estimate_cost(delta_hex),
+                                   max_glycoforms)
+
+        # map each observed glycoform to its monosaccharide composition
+        # and assign observed abundances to the glycoforms in one join;
+        # use a default value of 0±0 if unavailable
+        with memory_profile.stage("enumeration"):
+            self._glycan_compositions = {}
+            for g in gp.glycan_library:
+                self._glycan_compositions.setdefault(
+                    g.name, Counter(dict(PTMComposition(g.composition)
+                                         .composition.iteritems())))
+            glycoforms_enumerated = list(gp.unique_glycoforms())
+            self._node_keys = pd.Index(
+                [g.composition_key() for g in glycoforms_enumerated],
+                tupleize_cols=False)
+            node_abundances = np.full(len(glycoforms_enumerated), None)
+            observed = self._observed_nodes(glycoforms.index)
+            node_abundances[observed[observed >= 0]] = (
+                glycoforms.values[observed >= 0])
+            self._observed = dict(zip(self._node_keys[observed[observed >= 0]],
+                                      glycoforms.values[observed >= 0]))
+
+        with memory_profile.stage("graph build"):
+            self.error_bound = 0.0
+            fractions = _nominal_values(self.glycation_fractions)
+            dropped_edges = set()
+            if epsilon is not None:
+                # prune the chains of all glycoforms and keep using them
+                # for the remaining glycoforms
+                self.chains = HexChains(glycoforms_enumerated)
+                pruning = self.chains.prune(
+                    fractions,
+                    _nominal_values([0.0 if a is None else a
+                                     for a in node_abundances]),
+                    epsilon)
+                dropped_edges = {
+                    (glycoforms_enumerated[i], glycoforms_enumerated[j])
+                    for i, j in zip(pruning.sources, pruning.sinks)}
+                self.chains.update(removed=[
+                    g for g, keep in zip(glycoforms_enumerated, pruning.keep)
+                    if not keep])
+                glycoforms_enumerated = [
+                    g for g, keep in zip(glycoforms_enumerated, pruning.keep)
+                    if keep]
+                node_abundances = node_abundances[pruning.keep]
+                self._node_keys = self._node_keys[pruning.keep]
+
+            for glycoform, abundance in zip(glycoforms_enumerated,
+                                            node_abundances):
+                if abundance is None:
+                    abundance = zero
+                self._add_glycoform(glycoform, abundance)
+
+            # generate an edge from each glycoform to all glycoforms
+            # which differ by a number of hexoses described
+            # in the dict of hexose differences;
+            # the latter are looked up by their composition keys
+            self._nodes_by_key = dict(zip(self._node_keys,
+                                          glycoforms_enumerated))
+            for source, key in zip(glycoforms_enumerated, self._node_keys):
+                for sink, count in self._neighbors(key, 1):
+                    if (source, sink) not in dropped_edges:
+                        self._add_hex_edge(source, sink, count)
+
+            if epsilon is None:
+                self.chains = HexChains(self)
+            else:
+                index = {n: i for i, n in enumerate(self.chains.nodes)}
+                self.chains.drop_edges(
+                    [index[source] for source, _ in dropped_edges],
+                    [index[sink] for _, sink in dropped_edges])
+                self.error_bound = pruning.omitted + self.chains.error_bound(
+                    fractions, pruning.residuals[pruning.keep])
+                _logger.info(
                     translate(
                         "correction",
-                        "The following glycans only appear in the list of "
-                        "glycoforms, but not in the glycan library: {}. "
-                        "They will be added to the library.")
-                    .format(", ".join(glycans_only_in_glycoforms)))
-                for g in glycans_only_in_glycoforms:
-                    try:
-                        gp.add_glycan(g)
-                    except ValueError as e:
-                        raise e
-
-        for glycoform in gp.unique_glycoforms():
-            # get the experimental abundance of a glycoform
-            # use a default value of 0±0 if unavailable
-            abundance = ufloat(0, 0)
-            for name in glycoform.name.split(" or "):
-                try:
-                    abundance = exp_abundances[FrozenMultiset(name.split("/"))]
-                    break
-                except KeyError:
-                    continue
-            glycoform.abundance = abundance
-
-            # add the current glycoform as a node to the graph;
-            # generate an edge to previous nodes if the difference is described
-            # in the dict of PTM differences
-            self.add_node(
-                glycoform,
-                abundance=abundance,
-                label=re_first_glycoform.match(glycoform.name).group())
-            for n in self:
-                d = glycoform - n
+                        "Approximate correction dropped {} glycoforms and "
+                        "{} edges. The total error of corrected abundances "
+                        "is at most {:.3g}.")
+                    .format(int((~pruning.keep).sum()),
+                            len(dropped_edges), self.error_bound))
+
+    def _add_glycoform(self,
+                       glycoform: PTMComposition,
+                       abundance: Any) -> None:
+        """
+        Add a glycoform to the graph.
+
+        :param PTMComposition glycoform: the glycoform
+        :param abundance: its observed abundance
+        :return: nothing
+        :rtype: None
+        """
+
+        glycoform.abundance = abundance
+        self.add_node(glycoform,
+                      abundance=abundance,
+                      label=glycoform.first_alias)
+
+    def _add_hex_edge(self,
+                      source: PTMComposition,
+                      sink: PTMComposition,
+                      count: int) -> None:
+        """
+        Add an edge from a glycoform to a glycoform with more hexoses.
+
+        :param PTMComposition source: the source
+        :param PTMComposition sink: the sink
+        :param int count: number of hexoses gained
+        :return: nothing
+        :rtype: None
+        """
+
+        self.add_edge(source, sink, label="{:d} Hex".format(count),
+                      c=self._delta_hex[count])
+
+    def _neighbors(self,
+                   key: tuple,
+                   direction: int) -> Iterator[Tuple[PTMComposition, int]]:
+        """
+        Find the glycoforms which differ from a composition
+        by a number of hexoses gained by glycation.
+
+        :param tuple key: composition key
+        :param int direction: 1 for glycoforms with more hexoses
+                              (sinks), -1 for glycoforms with fewer
+                              hexoses (sources)
+        :return: a generator of glycoforms and hexose differences
+        :rtype: Iterator(tuple(PTMComposition, int))
+        """
+
+        composition = dict(key)
+        hexoses = composition.get("Hex", 0)
+        for count in self._delta_hex:
+            composition["Hex"] = hexoses + direction * count
+            neighbor = self._nodes_by_key.get(
+                tuple(sorted((m, c) for m, c in composition.items() if c)))
+            if neighbor is not None:
+                yield neighbor, count
+
+    def add_glycan(self,
+                   name: str,
+                   composition: Optional[str]=None,
+                   site: Optional[int]=None) -> None:
+        """
+        Add a glycan to the library of the graph. Only glycoforms
+        that contain the glycan are enumerated, and only their nodes
+        and edges and the affected hexose chains are updated.
+        Corrected abundances must be recalculated afterwards.
+
+        :param str name: name of the glycan
+        :param str composition: monosaccharide composition
+                                (default: derived from the name)
+        :param int site: glycosylation site to which the glycan
+                         is restricted (default: any site)
+        :return: nothing
+        :rtype: None
+        :raises ValueError: if the graph was pruned by approximate
+                            correction, the composition is unknown
+                            or the site does not exist
+        """
+
+        index = self._index()
+        self._update_glycoforms(index.add_glycan(name, composition, site))
+        glycan = self._glycoprotein.glycan_library[-1]
+        self._glycan_compositions.setdefault(
+            name, Counter(dict(PTMComposition(glycan.composition)
+                               .composition.iteritems())))
+
+    def remove_glycan(self,
+                      name: str) -> None:
+        """
+        Remove all glycans with the given name from the library of
+        the graph. Only glycoforms that contain the glycan are retracted,
+        and only their nodes and edges and the affected hexose chains
+        are updated. Corrected abundances must be recalculated afterwards.
+
+        :param str name: name of the glycan
+        :return: nothing
+        :rtype: None
+        :raises ValueError: if the graph was pruned by approximate
+                            correction or the library does not contain
+                            the glycan
+        """
+
+        self._update_glycoforms(self._index().remove_glycan(name))
+
+    def update_library(self,
+                       glycan_library: pd.DataFrame) -> None:
+        """
+        Replace the glycan library of the graph by adding and removing
+        only the glycans that differ, see :meth:`add_glycan`.
+        Glycans of observed glycoforms remain part of the library
+        (as when assembling the graph). Corrected abundances must be
+        recalculated afterwards.
+
+        :param pd.DataFrame glycan_library: the new glycan library
+        :return: nothing
+        :rtype: None
+        :raises ValueError: if the graph was assembled without a library
+                            or pruned by approximate correction,
+                            or a glycan is invalid
+        """
+
+        if self._library_rows is None:
+            raise ValueError(
+                translate("correction",
+                          "The glycation graph was assembled without "
+                          "a glycan library."))
+        old_rows = Counter(self._library_rows)
+        new_rows = library_rows(glycan_library)
+        changed = {row[0] for row in
+                   (old_rows - Counter(new_rows))
+                   + (Counter(new_rows) - old_rows)}
+        library_names = {g.name for g in self._glycoprotein.glycan_library}
+        for name in sorted(changed & library_names):
+            self.remove_glycan(name)
+
+        # add glycans in the order of the new library, such that aliases
+        # are listed as after assembling a graph from the new library
+        new_names = {row[0] for row in new_rows}
+        for row in new_rows:
+            if row[0] in changed:
+                self.add_glycan(*row)
+        for name in sorted(changed - new_names):
+            if name in self._observed_glycans:
+                self.add_glycan(name)
+        self._library_rows = new_rows
+        self._sort_library(new_rows)
+
+    def _sort_library(self,
+                      rows: List[Tuple[str, Optional[str],
+                                       Optional[int]]]) -> None:
+        """
+        Arrange the glycan library in the order of the given rows,
+        followed by glycans that only occur in observed glycoforms.
+        If the order changes, the aliases of all glycoforms are listed
+        again in the new order.
+
+        :param rows: name, composition and site of each glycan
+                     of the library, see :func:`library_rows`
+        :type rows: list(tuple(str, str, int))
+        :return: nothing
+        :rtype: None
+        """
+
+        positions = {}  # type: Dict[tuple, List[int]]
+        for i, (name, _, site) in enumerate(rows):
+            positions.setdefault((name, site), []).append(i)
+        library = self._glycoprotein.glycan_library
+        order = []
+        for i, glycan in enumerate(library):
+            position = positions.get((glycan.name, glycan.site))
+            order.append(position.pop(0) if position else len(rows) + i)
+        if order == sorted(order):
+            return
+
+        self._glycoprotein.glycan_library = [
+            library[i] for i in np.argsort(order, kind="mergesort")]
+        index = self._index()
+        for key, node in self._nodes_by_key.items():
+            node.aliases = index.glycoform(key).aliases
+            self.nodes[node]["label"] = node.first_alias
+
+    def _index(self) -> GlycoformIndex:
+        """
+        Provide the glycoform index for incremental updates,
+        which is created on first use.
+
+        :return: the glycoform index
+        :rtype: GlycoformIndex
+        :raises ValueError: if the graph was pruned
+        """
+
+        if self._epsilon is not None:
+            raise ValueError(
+                translate("correction",
+                          "A glycation graph for approximate correction "
+                          "cannot be updated incrementally."))
+        if self._glycoform_index is None:
+            self._glycoform_index = GlycoformIndex(self._glycoprotein)
+        return self._glycoform_index
+
+    def _update_glycoforms(self,
+                           keys: Iterable[tuple]) -> None:
+        """
+        Update nodes, edges and hexose chains of the graph
+        after the aliases of the given glycoforms have changed.
+
+        :param keys: composition keys of changed glycoforms
+        :type keys: Iterable(tuple)
+        :return: nothing
+        :rtype: None
+        """
+
+        index = self._glycoform_index
+        added, removed = [], []
+        for key in keys:
+            node = self._nodes_by_key.get(key)
+            if key not in index.aliases:
+                if node is not None:
+                    removed.append(node)
+                    self.remove_node(node)
+                    del self._nodes_by_key[key]
+            elif node is None:
+                glycoform = index.glycoform(key)
+                self._add_glycoform(glycoform,
+                                    self._observed.get(key, self._zero))
+                self._nodes_by_key[key] = glycoform
+                added.append((key, glycoform))
+            else:
+                node.aliases = index.glycoform(key).aliases
+                self.nodes[node]["label"] = node.first_alias
+
+        for key, glycoform in added:
+            for sink, count in self._neighbors(key, 1):
+                self._add_hex_edge(glycoform, sink, count)
+            for source, count in self._neighbors(key, -1):
+                self._add_hex_edge(source, glycoform, count)
+
+        self._node_keys = pd.Index(list(self._nodes_by_key),
+                                   tupleize_cols=False)
+        self.chains.update(added=[g for _, g in added], removed=removed)
+        self._node_data = None
+
+    def set_abundances(self,
+                       glycoforms: pd.Series) -> None:
+        """
+        Replace the observed abundances of all glycoforms, such that
+        another sample with the same glycans and glycation profile
+        can be corrected without assembling the graph again.
+        Corrected abundances must be recalculated afterwards.
+
+        :param pd.Series glycoforms: list of glycoforms with
+                                     abundances/errors
+        :return: nothing
+        :rtype: None
+        :raises ValueError: if the graph was pruned by approximate
+                            correction or a glycoform contains
+                            an unknown glycan
+        """
+
+        if self._epsilon is not None:
+            raise ValueError(
+                translate("correction",
+                          "The abundances of a glycation graph for "
+                          "approximate correction cannot be replaced."))
+        if not self.errors:
+            glycoforms = pd.Series(_nominal_values(glycoforms),
+                                   index=glycoforms.index, name="abundance")
+        observed = self._observed_nodes(glycoforms.index)
+
+        for n, data in self.nodes(data=True):
+            n.abundance = self._zero
+            data["abundance"] = self._zero
+        self._observed = {}
+        for i, abundance in zip(observed[observed >= 0],
+                                glycoforms.values[observed >= 0]):
+            key = self._node_keys[i]
+            node = self._nodes_by_key[key]
+            node.abundance = abundance
+            self.nodes[node]["abundance"] = abundance
+            self._observed[key] = abundance
+        self._observed_glycans = {g for glycoform in glycoforms.index
+                                  for g in glycoform.split("/")}
+        self._node_data = None
+
+    def _observed_nodes(self,
+                        glycoforms: Iterable[str]) -> np.ndarray:
+        """
+        Map observed glycoforms to the nodes with equal
+        monosaccharide composition. Glycoforms that match no node
+        or share their composition with a previous glycoform
+        are reported and mapped to -1.
+
+        :param glycoforms: names of observed glycoforms
+                           (e.g., "A2G0F/A2G1F")
+        :type glycoforms: Iterable(str)
+        :return: index of the matching node for each glycoform
+        :rtype: np.ndarray
+        :raises ValueError: if a glycoform contains an unknown glycan
+        """
+
+        glycoforms = list(glycoforms)
+        keys = []
+        for glycoform in glycoforms:
+            counts = Counter()
+            for glycan in glycoform.split("/"):
                 try:
-                    c = delta_ptm[d]
-                    source = n
-                    sink = glycoform
+                    counts.update(self._glycan_compositions[glycan])
                 except KeyError:
-                    try:
-                        d = -d
-                        c = delta_ptm[d]
-                        source = glycoform
-                        sink = n
-                    except KeyError:
-                        continue
-                self.add_edge(source, sink, label=d.composition_str(), c=c)
+                    raise ValueError(
+                        translate("correction",
+                                  "Glycoform '{}' contains unknown glycan "
+                                  "'{}'.").format(glycoform, glycan))
+            keys.append(tuple(sorted((m, int(c))
+                                     for m, c in counts.items() if c)))
+        keys = pd.Index(keys, tupleize_cols=False)
+
+        duplicates = keys.duplicated()
+        if duplicates.any():
+            _logger.warning(
+                translate(
+                    "correction",
+                    "The following glycoforms have the same "
+                    "monosaccharide composition as a previous glycoform "
+                    "and will be ignored: {}.")
+                .format(", ".join(np.array(glycoforms)[duplicates])))
+
+        nodes = self._node_keys.get_indexer(keys)
+        unmatched = (nodes < 0) & ~duplicates
+        if unmatched.any():
+            _logger.warning(
+                translate(
+                    "correction",
+                    "The following glycoforms do not match any "
+                    "glycoform derived from the glycan library "
+                    "and will be ignored: {}.")
+                .format(", ".join(np.array(glycoforms)[unmatched])))
+        nodes[duplicates] = -1
+        return nodes
 
-    def correct_abundances(self) -> None:
+    def correct_abundances(self,
+                           engine: str="dense") -> None:
         """
         Correct abundances in the glycoform graph.
 
+        :param str engine: engine for solving the correction system,
+                           see :data:`hexchains.ENGINES`
         :return: nothing
         :rtype: None
+        :raises ValueError: if the engine is unknown
         """
 
-        # calculate corrected abundance for each node from source to sink
-        for n in nx.topological_sort(self):
-            in_abundance = 0.0
-            for pred in self.predecessors(n):
-                in_abundance += (self.nodes[pred]["corr_abundance"]
-                                 * self[pred][n]["c"])
-            out_c = 0.0
-            for succ in self.successors(n):
-                out_c += self[n][succ]["c"]
-            corr_abundance = (n.abundance - in_abundance) / (1 - out_c)
-            self.nodes[n]["corr_abundance"] = corr_abundance
+        if engine not in ENGINES:
+            raise ValueError(
+                translate("correction", "Unknown correction engine: '{}'.")
+                .format(engine))
+
+        with self.memory_profile.stage("solve"):
+            chains = self.chains
+            abundances = [self.nodes[n]["abundance"] for n in chains.nodes]
+            if not self.errors:
+                # nominal values only
+                abundances = np.array(abundances, dtype=float)
+                corr = chains.solve(
+                    np.array(self.glycation_fractions, dtype=float),
+                    abundances, engine)
+                for n, a in zip(chains.nodes, corr):
+                    self.nodes[n]["corr_abundance"] = float(a)
+                self._node_data = {"abundance": abundances,
+                                   "corr_abundance": corr}
+                return
 
-    def to_dataframe(self) -> pd.DataFrame:
+            # correct all hexose chains at once and propagate uncertainties
+            # of observed abundances and glycation fractions
+            corr, d_abundances, d_c = chains.jacobian(
+                _nominal_values(self.glycation_fractions),
+                _nominal_values(abundances),
+                engine)
+            abundance_errors = np.array([a.std_dev for a in abundances])
+            corr_errors = self._propagate_errors(
+                d_abundances[..., None],
+                d_c[..., None],
+                abundance_errors[:, None],
+                np.array([f.std_dev for f in self.glycation_fractions])
+                [:, None])[:, 0]
+            for n, a, e in zip(chains.nodes, corr, corr_errors):
+                self.nodes[n]["corr_abundance"] = ufloat(a, e)
+            self._node_data = {
+                "abundance": _nominal_values(abundances),
+                "abundance_error": abundance_errors,
+                "corr_abundance": corr,
+                "corr_abundance_error": corr_errors}
+
+    def correct_samples(
+            self,
+            abundances: pd.DataFrame,
+            errors: Optional[pd.DataFrame]=None,
+            engine: str="dense",
+            glycation: Optional[pd.DataFrame]=None,
+            glycation_errors: Optional[pd.DataFrame]=None
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Correct abundances of many samples that share the glycan library
+        and the topology of this graph. By default, all samples share
+        the glycation profile of this graph and are corrected
+        by a single multi-column solve. If each sample has its own
+        glycation profile, one system per sample is assembled from
+        arrays and all of them are solved together.
+        Errors are propagated for all samples at once.
+
+        :param pd.DataFrame abundances: observed abundances with
+                                        glycoforms (e.g., "A2G0F/A2G1F")
+                                        as index and samples as columns
+        :param pd.DataFrame errors: errors of observed abundances
+                                    with the same shape as abundances
+                                    (default: no errors)
+        :param str engine: engine for solving the correction system,
+                           see :data:`hexchains.ENGINES`
+        :param pd.DataFrame glycation: glycation abundances (in percent)
+                                       with glycation counts as index
+                                       and the samples of abundances
+                                       as columns (default: use the
+                                       glycation profile of this graph)
+        :param pd.DataFrame glycation_errors: errors of glycation abundances
+                                              with the same shape as
+                                              glycation (default: no errors)
+        :return: corrected abundances and their errors, each with
+                 the glycoforms of the graph as index and samples as columns
+        :rtype: tuple(pd.DataFrame, pd.DataFrame)
+        :raises ValueError: if the engine is unknown or a glycoform
+                            contains an unknown glycan
+        """
+
+        if engine not in ENGINES:
+            raise ValueError(
+                translate("correction", "Unknown correction engine: '{}'.")
+                .format(engine))
+        if errors is None:
+            errors = pd.DataFrame(0.0, index=abundances.index,
+                                  columns=abundances.columns)
+
+        # observed abundances and errors of all nodes
+        chains = self.chains
+        observed = self._observed_nodes(abundances.index)
+        y = np.zeros((len(chains.nodes), abundances.shape[1]))
+        y[observed[observed >= 0]] = abundances.values[observed >= 0]
+        y_err = np.zeros(y.shape)
+        y_err[observed[observed >= 0]] = (
+            errors.reindex_like(abundances).values[observed >= 0])
+
+        # glycation fractions, either shared or of shape (samples × k)
+        if glycation is None:
+            c = _nominal_values(self.glycation_fractions)
+            c_err = np.array([getattr(f, "std_dev", 0.0)
+                              for f in self.glycation_fractions])
+            c_err = np.broadcast_to(c_err[:, None],
+                                    (len(c_err), abundances.shape[1]))
+        else:
+            if glycation_errors is None:
+                glycation_errors = pd.DataFrame(0.0, index=glycation.index,
+                                                columns=glycation.columns)
+            counts = range(1, int(glycation.index.max()) + 1)
+            c = (glycation[abundances.columns]
+                 .reindex(counts).fillna(0).values.T / 100)
+            c_err = (glycation_errors[abundances.columns]
+                     .reindex(counts).fillna(0).values / 100)
+
+        with self.memory_profile.stage("solve"):
+            corr, d_abundances, d_c = chains.jacobian(c, y, engine)
+            if d_abundances.ndim == 2:
+                d_abundances = d_abundances[..., None]
+            corr_errors = self._propagate_errors(
+                d_abundances, d_c, y_err, c_err)
+
+        names = [n.name for n in chains.nodes]
+        return (pd.DataFrame(corr, index=names, columns=abundances.columns),
+                pd.DataFrame(corr_errors, index=names,
+                             columns=abundances.columns))
+
+    def _propagate_errors(self,
+                          d_abundances: np.ndarray,
+                          d_c: np.ndarray,
+                          abundance_errors: np.ndarray,
+                          c_errors: np.ndarray) -> np.ndarray:
+        """
+        Propagate errors of uncorrelated inputs
+        to the corrected abundances of several samples.
+
+        :param np.ndarray d_abundances: derivatives with respect to
+                                        observed abundances
+                                        (nodes × length × samples),
+                                        see :meth:`HexChains.jacobian`
+        :param np.ndarray d_c: derivatives with respect to glycation
+                               fractions (nodes × k × samples)
+        :param np.ndarray abundance_errors: errors of observed abundances
+                                            (nodes × samples)
+        :param np.ndarray c_errors: errors of glycation fractions
+                                    (k × samples)
+        :return: errors of corrected abundances (nodes × samples)
+        :rtype: np.ndarray
+        """
+
+        chains = self.chains
+        variance = (
+            np.einsum("ils,ils->is",
+                      d_abundances ** 2,
+                      chains.to_padded(abundance_errors)[chains.chain] ** 2)
+            + np.einsum("iks,ks->is", d_c ** 2, c_errors ** 2))
+        return np.sqrt(variance)
+
+    def sensitivities(
+            self,
+            glycoforms: Optional[Iterable[str]]=None,
+            engine: str="dense"
+    ) -> Tuple[pd.Series, pd.Series]:
+        """
+        Calculate the sensitivity (Jacobian) matrices of corrected
+        abundances with respect to observed abundances and glycation
+        abundances (both in percent), see :meth:`HexChains.sensitivities`.
+
+        Each matrix is returned as a sparse series in coordinate format,
+        i.e., only nonzero entries are included, indexed by the corrected
+        glycoform and the input. :meth:`pd.Series.unstack` converts it
+        to a dense matrix.
+
+        :param glycoforms: glycoforms (e.g., "A2G0F/A2G1F") whose
+                           sensitivities are calculated
+                           (default: all glycoforms of the graph)
+        :type glycoforms: Iterable(str)
+        :param str engine: engine for correcting abundances,
+                           see :data:`hexchains.ENGINES`
+        :return: derivatives with respect to observed abundances,
+                 indexed by "glycoform" and "observed", and
+                 derivatives with respect to glycation abundances,
+                 indexed by "glycoform" and "glycation"
+        :rtype: tuple(pd.Series, pd.Series)
+        :raises ValueError: if the engine is unknown or a glycoform
+                            contains an unknown glycan or does not match
+                            any glycoform of the graph
+        """
+
+        if engine not in ENGINES:
+            raise ValueError(
+                translate("correction", "Unknown correction engine: '{}'.")
+                .format(engine))
+
+        chains = self.chains
+        if glycoforms is None:
+            nodes = np.arange(len(chains.nodes))
+        else:
+            glycoforms = list(glycoforms)
+            nodes = self._observed_nodes(glycoforms)
+            if (nodes < 0).any():
+                raise ValueError(
+                    translate(
+                        "correction",
+                        "The following glycoforms are not part of "
+                        "the glycation graph: {}.")
+                    .format(", ".join(np.array(glycoforms)[nodes < 0])))
+
+        abundances = _nominal_values(
+            [self.nodes[n]["abundance"] for n in chains.nodes])
+        d_abundances, d_c = chains.sensitivities(
+            _nominal_values(self.glycation_fractions),
+            abundances, nodes, engine)
+        names = np.array([n.name for n in chains.nodes], dtype=object)
+
+        # coordinate format: nonzero derivatives of existing nodes only
+        inputs = chains.index[chains.chain[nodes]]
+        rows, positions = np.nonzero((inputs >= 0) & (d_abundances != 0))
+        d_abundances = pd.Series(
+            d_abundances[rows, positions],
+            index=pd.MultiIndex.from_arrays(
+                [names[nodes[rows]], names[inputs[rows, positions]]],
+                names=["glycoform", "observed"]),
+            name="derivative")
+
+        # glycation fractions are given in percent
+        rows, counts = np.nonzero(d_c)
+        d_glycation = pd.Series(
+            d_c[rows, counts] / 100,
+            index=pd.MultiIndex.from_arrays(
+                [names[nodes[rows]], counts + 1],
+                names=["glycoform", "glycation"]),
+            name="derivative")
+        return d_abundances, d_glycation
+
+    def to_dataframe(self,
+                     aliases: bool=True) -> pd.DataFrame:
         """
         Convert the glycoform graph to a dataframe.
 
+        :param bool aliases: name each glycoform after all its aliases
+                             (e.g., "A2G0F/A2G1F or A2G1F/A2G0F")
+                             if True, and after its first alias otherwise
+                             (see :meth:`alias_table`)
         :return: a dataframe containing all glycoforms with abundances
+                 and their monosaccharide composition, sorted by
+                 decreasing corrected abundance
         :rtype: pd.DataFrame
+        :raises ValueError: if abundances have not been corrected
+                            since the graph or its abundances changed
         """
 
-        glycoforms = []
-        composition = []
-        for n in self:
-            glycoforms.append((n.name,
-                               self.nodes[n]["abundance"].nominal_value,
-                               self.nodes[n]["abundance"].std_dev,
-                               self.nodes[n]["corr_abundance"].nominal_value,
-                               self.nodes[n]["corr_abundance"].std_dev))
-            composition.append(n.composition)
-        composition = pd.concat(composition, axis=1)  # type: pd.DataFrame
-        return (pd.DataFrame(glycoforms,
-                             columns=["glycoform", "abundance",
-                                      "abundance_error", "corr_abundance",
-                                      "corr_abundance_error"])
-                  .join(composition.T)
-                  .sort_values("corr_abundance", ascending=False)
-                  .reset_index(drop=True))
+        # composition matrix with one column per monosaccharide
+        monosaccharides = sorted({m for key in self._node_keys
+                                  for m, _ in key})
+        column = {m: i for i, m in enumerate(monosaccharides)}
+        composition = np.zeros((len(self._node_keys), len(monosaccharides)),
+                               dtype=np.int16)
+        for i, key in enumerate(self._node_keys):
+            for m, c in key:
+                composition[i, column[m]] = c
+
+        if self._node_data is None:
+            raise ValueError(
+                translate("correction",
+                          "No corrected abundances available; "
+                          "call correct_abundances first."))
+        df = pd.DataFrame(self._node_data)
+        df.insert(0, "glycoform",
+                  [n.name if aliases else n.first_alias
+                   for n in self.chains.nodes])
+        for m, values in zip(monosaccharides, composition.T):
+            df[m] = values
+
+        # sort by corrected abundance and break ties by the library
+        # positions of the glycans of the first alias, such that the order
+        # does not depend on the order in which nodes were added
+        position = {}  # type: Dict[int, int]
+        for i, g in enumerate(self._glycoprotein.glycan_library):
+            position.setdefault(self._glycoprotein.glycan_id(g.name), i)
+        first_alias = np.array([[position[i] for i in n.aliases[0]]
+                                for n in self.chains.nodes],
+                               dtype=int).reshape(len(df), -1)
+        order = np.lexsort(tuple(first_alias.T[::-1])
+                           + (-df["corr_abundance"].values,))
+        return df.iloc[order].reset_index(drop=True)
+
+    def alias_table(self) -> pd.DataFrame:
+        """
+        List the aliases of all glycoforms.
+        Alias names are only built here (and in :meth:`to_dataframe`),
+        since glycoforms merely store glycan ids.
+
+        :return: a dataframe with one row per alias, which contains
+                 the glycoform (named after its first alias, as by
+                 ``to_dataframe(aliases=False)``) and the alias
+        :rtype: pd.DataFrame
+        """
+
+        glycoforms, aliases = [], []
+        for n in self.chains.nodes:
+            names = n.alias_names()
+            glycoforms.extend([names[0]] * len(names))
+            aliases.extend(names)
+        return pd.DataFrame({"glycoform": glycoforms, "alias": aliases},
+                            columns=["glycoform", "alias"])
 
     def to_dot(self,
                filename: str) -> None:
@@ -224,6 +937,10 @@ class GlycationGraph(nx.DiGraph):
         :rtype: None
         """
 
+        if not self.errors:
+            nx.write_gexf(self, filename)
+            return
+
         # split each ufloat attribute into two float attributes
         for n in self:
             self.nodes[n]["abundance_error"] = float(
@@ -242,14 +959,286 @@ class GlycationGraph(nx.DiGraph):
         nx.write_gexf(self, filename)
 
 
-def read_clean_datasets(filename: str) -> pd.Series:
+def _assemble_glycoprotein(glycan_library: Optional[pd.DataFrame],
+                           glycoforms: pd.Series) -> Glycoprotein:
+    """
+    Create a glycoprotein whose glycan library contains the given library
+    as well as all glycans that occur in the observed glycoforms.
+
+    :param pd.DataFrame glycan_library: a glycan library
+    :param pd.Series glycoforms: list of glycoforms with abundances/errors
+    :return: the glycoprotein
+    :rtype: Glycoprotein
+    :raises ValueError: if glycoforms have unequal numbers of sites
+                        or a glycan with unknown monosaccharide
+                        composition is added
+    """
+
+    # series with a monosaccharide set as index
+    # and abundances as values
+    exp_abundances = glycoforms.reset_index()
+    exp_abundances["sugar_set"] = exp_abundances["index_col"].apply(
+        lambda v: FrozenMultiset(v.split("/")))
+    site_count = exp_abundances["sugar_set"].apply(len).unique()
+    if site_count.size != 1:
+        raise ValueError(
+            translate(
+                "correction",
+                "Glycoforms have unequal number of glycosylation sites."))
+    else:
+        site_count = int(site_count[0])
+        _logger.info(translate("correction", "Glycoprotein has {} sites.")
+                     .format(site_count))
+    exp_abundances = exp_abundances.set_index("sugar_set")["abundance"]
+
+    gp = Glycoprotein(sites=site_count, library=glycan_library)
+    glycoform_glycans = set()
+    for v in exp_abundances.index.values:
+        glycoform_glycans |= set(v)
+
+    if glycan_library is None:
+        # fill the glycan library from glycans in glycoforms
+        _logger.info(translate("correction",
+                               "No glycan library specified. "
+                               "Extracting glycans from glycoforms ..."))
+        for g in glycoform_glycans:
+            try:
+                gp.add_glycan(g)
+            except ValueError as e:
+                raise e
+    else:
+        # compare monosaccharide set of glycan library and glycoforms;
+        # add glycans that only appear in the list of glycoforms
+        # to the library, but this only works if they have a valid name
+        library_glycans = set([n.name for n in gp.glycan_library])
+
+        glycans_only_in_library = library_glycans - glycoform_glycans
+        if glycans_only_in_library:
+            _logger.warning(
+                translate(
+                    "correction",
+                    "The following glycans only appear "
+                    "in the glycan library, "
+                    "but not in the list of glycoforms: {}.")
+                .format(", ".join(glycans_only_in_library)))
+
+        glycans_only_in_glycoforms = glycoform_glycans - library_glycans
+        if glycans_only_in_glycoforms:
+            _logger.warning(
+                translate(
+                    "correction",
+                    "The following glycans only appear in the list of "
+                    "glycoforms, but not in the glycan library: {}. "
+                    "They will be added to the library.")
+                .format(", ".join(glycans_only_in_glycoforms)))
+            for g in glycans_only_in_glycoforms:
+                try:
+                    gp.add_glycan(g)
+                except ValueError as e:
+                    raise e
+    return gp
+
+
+def estimate_cost(glycan_library: Optional[pd.DataFrame],
+                  glycoforms: pd.Series,
+                  glycation: pd.Series) -> CostEstimate:
+    """
+    Estimate the cost of assembling and correcting the glycation graph
+    for the given input data without enumerating glycoforms,
+    see :meth:`Glycoprotein.estimate_cost`.
+
+    :param pd.DataFrame glycan_library: a glycan library
+    :param pd.Series glycoforms: list of glycoforms with abundances/errors
+    :param pd.Series glycation: list of glycations with abundances/errors
+    :return: the estimated cost
+    :rtype: CostEstimate
+    :raises ValueError: if a glycan with unknown monosaccharide
+                        composition is added
+    """
+
+    gp = _assemble_glycoprotein(glycan_library, glycoforms)
+    return gp.estimate_cost(count for count in glycation.index if count > 0)
+
+
+def _to_numpy(values: Any,
+              dtype: Any=float) -> np.ndarray:
+    """
+    Convert a NumPy array, pandas object, Arrow array or sequence
+    to a NumPy array, without copying if possible.
+
+    :param values: the values
+    :param dtype: dtype of the result
+    :return: the array
+    :rtype: np.ndarray
+    """
+
+    if isinstance(values, (pd.Series, pd.Index)):
+        values = values.to_numpy()
+    elif hasattr(values, "to_numpy"):  # Arrow (chunked) arrays
+        values = values.to_numpy(zero_copy_only=False)
+    return np.asarray(values, dtype=dtype)
+
+
+def correct_arrays(glycoforms: Any,
+                   abundances: Any,
+                   glycation_counts: Any,
+                   glycation_abundances: Any,
+                   errors: Any=None,
+                   glycation_errors: Any=None,
+                   library: Any=None,
+                   engine: str="dense",
+                   graph: Optional[GlycationGraph]=None) -> CorrectedArrays:
+    """
+    Correct abundances given in memory, i.e., without reading files.
+    All arrays may be NumPy arrays, pandas series or Arrow arrays.
+    No messages are logged; glycoforms which are ignored
+    have a row of -1 in the result.
+
+    Uncertainties are propagated by array operations
+    (see :meth:`GlycationGraph.correct_samples`) instead of
+    per-value arithmetic, so that the numeric part runs in NumPy
+    and releases the GIL while solving.
+
+    :param glycoforms: glycoform names (e.g., "A2G0F/A2G1F")
+    :param abundances: observed abundances (in percent)
+    :param glycation_counts: glycation counts (numbers of hexoses)
+    :param glycation_abundances: abundances of glycation counts
+                                 (in percent)
+    :param errors: errors of observed abundances (default: zero)
+    :param glycation_errors: errors of glycation abundances
+                             (default: zero)
+    :param library: glycan library as a pandas dataframe or Arrow table
+                    with the columns described in :func:`read_library`
+                    (default: derive it from the glycoforms)
+    :param str engine: engine for solving the correction system,
+                       see :data:`hexchains.ENGINES`
+    :param GlycationGraph graph: reuse a graph returned by
+                                 :func:`assemble_topology` for the same
+                                 glycans, glycation counts and library
+                                 (default: assemble a new graph)
+    :return: the corrected abundances
+    :rtype: CorrectedArrays
+    :raises ValueError: if the engine is unknown or the correction fails
+    """
+
+    names = pd.Index(_to_numpy(glycoforms, dtype=object).astype(str),
+                     name="index_col")
+    abundances = _to_numpy(abundances)
+    counts = pd.Index(_to_numpy(glycation_counts, dtype=int),
+                      name="index_col")
+    glycation = _to_numpy(glycation_abundances)
+    if errors is None:
+        errors = np.zeros(len(abundances))
+    if glycation_errors is None:
+        glycation_errors = np.zeros(len(glycation))
+
+    with _quiet():
+        if graph is None:
+            graph = assemble_topology(names, counts, library)
+        G = graph
+        corr, corr_errors = G.correct_samples(
+            pd.DataFrame({0: abundances}, index=names),
+            pd.DataFrame({0: _to_numpy(errors)}, index=names),
+            engine,
+            pd.DataFrame({0: glycation}, index=counts),
+            pd.DataFrame({0: _to_numpy(glycation_errors)}, index=counts))
+        rows = G._observed_nodes(names)
+
+    chains = G.chains
+    node_abundances = np.zeros(len(chains.nodes))
+    node_abundances[rows[rows >= 0]] = abundances[rows >= 0]
+    abundance_errors = np.zeros(len(chains.nodes))
+    abundance_errors[rows[rows >= 0]] = _to_numpy(errors)[rows >= 0]
+    return CorrectedArrays(
+        glycoform=corr.index.values,
+        abundance=node_abundances,
+        abundance_error=abundance_errors,
+        corr_abundance=corr[0].values,
+        corr_abundance_error=corr_errors[0].values,
+        rows=rows)
+
+
+def assemble_topology(glycoforms: Any,
+                      glycation_counts: Any,
+                      library: Any=None) -> GlycationGraph:
+    """
+    Assemble a glycation graph for :func:`correct_arrays`.
+    Its topology only depends on the glycans (and number of sites)
+    of the glycoforms, the glycation counts and the library,
+    such that it can be reused for any abundances
+    and glycation abundances. No messages are logged.
+
+    :param glycoforms: glycoform names (e.g., "A2G0F/A2G1F")
+    :param glycation_counts: glycation counts (numbers of hexoses)
+    :param library: glycan library as a pandas dataframe or Arrow table
+                    with the columns described in :func:`read_library`
+                    (default: derive it from the glycoforms)
+    :return: the glycation graph, which does not hold abundances
+    :rtype: GlycationGraph
+    :raises ValueError: if the graph cannot be assembled
+    """
+
+    names = pd.Index(_to_numpy(glycoforms, dtype=object).astype(str),
+                     name="index_col")
+    counts = pd.Index(_to_numpy(glycation_counts, dtype=int),
+                      name="index_col")
+    if library is not None and not isinstance(library, pd.DataFrame):
+        library = library.to_pandas()  # Arrow table
+    with _quiet():
+        return GlycationGraph(
+            library,
+            pd.Series(0.0, index=names, name="abundance"),
+            pd.Series(0.0, index=counts, name="abundance"),
+            errors=False)
+
+
+def _check_glycoform_count(estimate: CostEstimate,
+                           max_glycoforms: int) -> None:
+    """
+    Ensure that the number of glycoforms does not exceed a limit.
+
+    :param CostEstimate estimate: estimated cost of the correction
+    :param int max_glycoforms: maximum number of glycoforms
+    :return: nothing
+    :rtype: None
+    :raises ValueError: if there are more glycoforms than max_glycoforms
+    """
+
+    if estimate.compositions > max_glycoforms:
+        raise ValueError(
+            translate("correction",
+                      "The glycan library yields {} glycoforms "
+                      "({} combinations, about {:.1f} MiB), which exceeds "
+                      "the limit of {} glycoforms.")
+            .format(estimate.compositions, estimate.combinations,
+                    estimate.memory / 2**20, max_glycoforms))
+
+
+def _nominal_values(values: Iterable[AffineScalarFunc]) -> np.ndarray:
+    """
+    Extract nominal values from a list of values with uncertainties.
+    Plain numbers are passed through.
+
+    :param values: values with uncertainties
+    :type values: Iterable(AffineScalarFunc)
+    :return: an array of nominal values
+    :rtype: np.ndarray
+    """
+
+    return np.array([getattr(v, "nominal_value", v) for v in values],
+                    dtype=float)
+
+
+def read_clean_datasets(filename: str,
+                        errors: bool=True) -> pd.Series:
     """
     Read input datasets (glycoforms, glycations) and prepare for analysis,
     i.e., generate a single column containing abundances with uncertainties.
 
     :param str filename: name of the file containing the dataset
+    :param bool errors: if False, ignore errors and return plain floats
     :return: a series called "abundance" containing a value with uncertainty
-             and an index named "index_col"
+             (or a float) and an index named "index_col"
     :rtype: pd.Series
     :raises ValueError: if the input dataset contains too few columns
     """
@@ -261,21 +1250,23 @@ def read_clean_datasets(filename: str) -> pd.Series:
         raise ValueError(
             translate("correction",
                       "{} contains too few columns.").format(filename))
-    elif col_count == 1:  # add error column
-        logging.warning(
+    elif col_count == 1 and errors:  # add error column
+        _logger.warning(
             translate("correction",
                       "{} lacks a column containing errors. "
                       "Assuming errors of zero.")
             .format(filename))
         df["auto_error_column"] = 0
     elif col_count > 2:  # remove surplus columns
-        logging.warning(
+        _logger.warning(
             translate("correction",
                       "{} contains {} additional columns, "
                       "which will be ignored.")
             .format(filename, col_count-2))
         df = df.iloc[:, :3]
     df.index.name = "index_col"
+    if not errors:
+        return df.iloc[:, 0].astype(float).rename("abundance")
     df["abundance"] = df.apply(lambda r: ufloat(r.iloc[0], r.iloc[1]), axis=1)
     return df["abundance"]
 
@@ -285,8 +1276,10 @@ def read_library(filename: str=None) -> pd.DataFrame:
     Read glycan library and prepare for analysis.
 
     :param str filename: name of the file containing the glycan library
-    :return: a dataframe twith wo columns
-            containing glycan names and compositions, respectively
+    :return: a dataframe with two columns
+            containing glycan names and compositions, respectively,
+            and an optional third column containing the glycosylation site
+            to which a glycan is restricted
     :rtype: pd.DataFrame
     :raises ValueError: if the input dataset contains too few columns
     """
@@ -298,11 +1291,11 @@ def read_library(filename: str=None) -> pd.DataFrame:
         raise ValueError(
             translate("correction",
                       "{} contains too few columns.").format(filename))
-    elif col_count > 2:  # remove surplus columns
-        logging.warning(
+    elif col_count > 3:  # remove surplus columns
+        _logger.warning(
             translate("correction",
                       "{} contains {} additional columns, "
                       "which will be ignored.")
-            .format(filename, col_count-2))
+            .format(filename, col_count-3))
         df = df.iloc[:, :3]
     return df
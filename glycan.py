@@ -1,6 +1,7 @@
 import re
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 import pandas.core.series
 
@@ -12,6 +13,7 @@ class Glycan:
     :ivar name
     :ivar composition
     :ivar abundance
+    :ivar site
 
     .. automethod:: __init__
     .. automethod:: __str__
@@ -20,7 +22,8 @@ class Glycan:
     def __init__(self,
                  name: Optional[str]=None,
                  composition: Optional[str]=None,
-                 abundance: float=0.0) -> None:
+                 abundance: float=0.0,
+                 site: Optional[int]=None) -> None:
         """
         Create a new glycan.
 
@@ -28,6 +31,9 @@ class Glycan:
         :param str composition: comma-separated list of monosaccharides;
                                 if None, calculated from the name
         :param float abundance: relative abundance
+        :param int site: glycosylation site (starting at 1)
+                         to which the glycan is restricted;
+                         if None, the glycan may occupy any site
         :return: nothing
         :rtype: None
         """
@@ -39,6 +45,7 @@ class Glycan:
         self.composition = composition
 
         self.abundance = abundance
+        self.site = site
 
     @staticmethod
     def extract_composition(glycan: str) -> str:
@@ -196,6 +203,18 @@ class PTMComposition:
 
         return pd.Series(composition)
 
+    def composition_key(self) -> Tuple[Tuple[str, int], ...]:
+        """
+        Returns a hashable key for the composition of self,
+        i.e., a sorted tuple of (PTM, count) tuples.
+
+        :return: composition key
+        :rtype: tuple(tuple(str, int))
+        """
+
+        return tuple(sorted((m, int(c))
+                            for m, c in self.composition.iteritems()))
+
     def composition_str(self) -> str:
         """
         Returns a string representing the composition of self
@@ -281,14 +300,16 @@ class PTMComposition:
 
     def __hash__(self) -> int:
         """
-        Calculates the hash value, which is the hash of the tuple of tuples
-        describing self's composition.
+        Calculates the hash value, which is the hash of the sorted tuple
+        of tuples describing self's composition. Sorting ensures that
+        equal compositions have equal hashes irrespective of the order
+        of their monosaccharides.
 
         :return: hash value
         :rtype: int
         """
 
-        return hash(tuple(self.composition.iteritems()))
+        return hash(tuple(sorted(self.composition.items())))
 
     def __eq__(self,
                other: "PTMComposition") -> bool:
@@ -330,3 +351,95 @@ class PTMComposition:
             mods=-self.composition,
             name="-" + self.name,
             abundance=-self.abundance)
+
+
+class Glycoform(PTMComposition):
+    """
+    A glycoform that stands for several combinations of glycans (aliases)
+    with equal monosaccharide composition. Aliases are stored as glycan ids,
+    which refer to a list of glycan names shared by all glycoforms
+    of a glycoprotein; the name (e.g., "A2G0F/A2G1F or A2G1F/A2G0F")
+    is only built when it is accessed.
+
+    :ivar np.ndarray aliases: array of shape (aliases × sites)
+                              containing glycan ids
+    :ivar list glycan_names: shared list of glycan names indexed by id
+
+    .. automethod:: __init__
+    .. automethod:: __hash__
+    """
+
+    def __init__(self,
+                 mods: Union[pd.Series, dict, str, None],
+                 aliases: np.ndarray,
+                 glycan_names: List[str],
+                 abundance: Optional[float]=None) -> None:
+        """
+        Create a new glycoform.
+
+        :param mods: monosaccharide composition, see :class:`PTMComposition`
+        :param np.ndarray aliases: glycan ids of all aliases
+        :param list glycan_names: shared list of glycan names
+        :param float abundance: abundance of the glycoform
+                                (default: 0.0)
+        :return: nothing
+        :rtype: None
+        """
+
+        super().__init__(mods, abundance=abundance)
+        self._name = None  # type: Optional[str]
+        self._hash = None  # type: Optional[int]
+        self.aliases = aliases
+        self.glycan_names = glycan_names
+
+    def __hash__(self) -> int:
+        """
+        Calculates the hash value (see :meth:`PTMComposition.__hash__`)
+        only once, since glycoforms are looked up as graph nodes
+        for every correction and their composition does not change.
+
+        :return: hash value
+        :rtype: int
+        """
+
+        if self._hash is None:
+            self._hash = super().__hash__()
+        return self._hash
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the glycoform, which lists all aliases
+        (unless a name was assigned explicitly).
+
+        :rtype: str
+        """
+
+        if self._name is not None:
+            return self._name
+        return " or ".join(self.alias_names())
+
+    @name.setter
+    def name(self, name: str) -> None:
+        self._name = name or None
+
+    @property
+    def first_alias(self) -> str:
+        """
+        Name of the first alias (e.g., "A2G0F/A2G1F").
+
+        :rtype: str
+        """
+
+        return "/".join(self.glycan_names[i] for i in self.aliases[0])
+
+    def alias_names(self) -> List[str]:
+        """
+        Build the names of all aliases.
+
+        :return: the names
+        :rtype: list(str)
+        """
+
+        names = self.glycan_names
+        return ["/".join(names[i] for i in alias) for alias in self.aliases]
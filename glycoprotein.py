@@ -1,10 +1,68 @@
-from itertools import product
-from typing import Iterator, Optional
+from array import array
+from collections import Counter, namedtuple
+from itertools import chain, product
+from math import factorial
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import numpy as np
 import pandas as pd
 
-from glycan import Glycan, PTMComposition
+from glycan import Glycan, Glycoform, PTMComposition
+
+#: cost of enumerating and correcting all glycoforms of a glycoprotein,
+#: see :meth:`Glycoprotein.estimate_cost`:
+#: numbers of ``combinations`` of glycans on the sites,
+#: distinct ``multisets`` of glycans (an upper bound if sites
+#: have different, overlapping glycan libraries),
+#: distinct ``compositions`` (i.e., glycoforms),
+#: hexose ``chains`` and their maximum ``chain_length``,
+#: glycation graph ``edges``, and expected peak ``memory`` in bytes
+CostEstimate = namedtuple(
+    "CostEstimate",
+    ["combinations", "multisets", "compositions",
+     "chains", "chain_length", "edges", "memory"])
+
+# approximate memory (in bytes) per enumerated combination,
+# per glycoform and per graph edge, calibrated with tracemalloc
+_COMBINATION_BYTES = 8
+_GLYCOFORM_BYTES = 2500
+_EDGE_BYTES = 300
+
+
+def library_rows(
+        library: pd.DataFrame) -> List[Tuple[str, Optional[str],
+                                             Optional[int]]]:
+    """
+    Extract the glycans of a glycan library.
+
+    :param pd.DataFrame library: dataframe describing a glycan library,
+                                 see :class:`Glycoprotein`
+    :return: name, composition (or None) and site (or None) of each glycan
+    :rtype: list(tuple(str, str, int))
+    :raises ValueError: if the library contains an invalid
+                        (e.g., non-integral) site
+    """
+
+    rows = []
+    for _, row in library.iterrows():
+        if pd.isnull(row.iloc[1]):
+            composition = None
+        else:
+            composition = row.iloc[1]
+        if len(row) < 3 or pd.isnull(row.iloc[2]):
+            site = None
+        else:
+            try:
+                site = float(row.iloc[2])
+                if not site.is_integer():
+                    raise ValueError
+                site = int(site)
+            except ValueError:
+                raise ValueError(
+                    "Invalid glycosylation site for glycan '{}': {}"
+                    .format(row.iloc[0], row.iloc[2]))
+        rows.append((row.iloc[0], composition, site))
+    return rows
 
 
 class Glycoprotein:
@@ -13,6 +71,9 @@ class Glycoprotein:
 
     :ivar dict glycosylation_sites: glycosylation sites
     :ivar int sites: number of glycosylation sites
+    :ivar list glycan_names: distinct names of all glycans ever added
+                             to the library; glycoforms refer to glycans
+                             by their index in this list (glycan id)
 
     .. automethod:: __init__
     .. automethod:: __str__
@@ -26,21 +87,24 @@ class Glycoprotein:
 
         :param int sites: number of glycosylation sites
         :param pd.DataFrame library: dataframe describing a glycan library;
-                            mus contain two columns (name and composition)
+                            must contain two columns (name and composition)
+                            and may contain a third column that restricts
+                            glycans to a glycosylation site
         :return: nothing
         :rtype: None
+        :raises ValueError: if the library contains an invalid site
         """
 
         self.sites = sites
         self.glycan_library = []
+        self.glycan_names = []  # type: List[str]
+        self._glycan_ids = {}  # type: Dict[str, int]
 
         if library is not None:
-            for _, row in library.iterrows():
-                if pd.isnull(row.iloc[1]):
-                    composition = None
-                else:
-                    composition = row.iloc[1]
-                self.add_glycan(name=row.iloc[0], composition=composition)
+            for name, composition, site in library_rows(library):
+                self.add_glycan(name=name,
+                                composition=composition,
+                                site=site)
 
     def __str__(self) -> str:
         """
@@ -57,17 +121,183 @@ class Glycoprotein:
 
     def add_glycan(self,
                    name: str,
-                   composition: Optional[str]=None) -> None:
+                   composition: Optional[str]=None,
+                   site: Optional[int]=None) -> None:
         """
         Add a glycan to the library.
 
         :param str name: name of the glycan
         :param str composition: monosaccharide composition
+        :param int site: glycosylation site (starting at 1)
+                         to which the glycan is restricted;
+                         if None, the glycan may occupy any site
         :return: nothing
         :rtype: None
+        :raises ValueError: if the site does not exist
+        """
+
+        if site is not None and not 1 <= site <= self.sites:
+            raise ValueError(
+                "Invalid glycosylation site for glycan '{}': {}"
+                .format(name, site))
+        self.glycan_library.append(
+            Glycan(name=name, composition=composition, site=site))
+        self.glycan_id(name)
+
+    def glycan_id(self,
+                  name: str) -> int:
+        """
+        Intern the name of a glycan.
+
+        :param str name: name of the glycan
+        :return: the glycan id, which remains unchanged
+                 if the glycan is removed from the library
+        :rtype: int
+        """
+
+        try:
+            return self._glycan_ids[name]
+        except KeyError:
+            self._glycan_ids[name] = len(self.glycan_names)
+            self.glycan_names.append(name)
+            return self._glycan_ids[name]
+
+    def site_library(self,
+                     site: int) -> List[Glycan]:
+        """
+        Determine the glycans that may occupy a glycosylation site.
+
+        :param int site: glycosylation site (starting at 1)
+        :return: all glycans that are either restricted to this site
+                 or may occupy any site
+        :rtype: list(Glycan)
+        """
+
+        return [g for g in self.glycan_library
+                if g.site is None or g.site == site]
+
+    def collapsed_site_library(
+            self,
+            site: int) -> List[Tuple[PTMComposition, List[Glycan]]]:
+        """
+        Group the glycans that may occupy a glycosylation site
+        by their monosaccharide composition.
+
+        :param int site: glycosylation site (starting at 1)
+        :return: a list of (composition, glycans) tuples in the order
+                 of the first glycan with the respective composition
+        :rtype: list(tuple(PTMComposition, list(Glycan)))
+        """
+
+        groups = {}
+        for glycan in self.site_library(site):
+            groups.setdefault(PTMComposition(glycan.composition),
+                              []).append(glycan)
+        return list(groups.items())
+
+    def estimate_cost(self,
+                      hexose_differences: Iterable[int]=()) -> CostEstimate:
+        """
+        Estimate the cost of :meth:`unique_glycoforms` and of correcting
+        the resulting glycation graph without enumerating combinations.
+        Distinct compositions are counted exactly by iteratively adding
+        the compositions of each site (i.e., a sumset of integer vectors),
+        such that runtime and memory scale with the number of compositions.
+
+        :param hexose_differences: numbers of hexoses that may be gained
+                                   by glycation, which determine
+                                   the edges of the glycation graph
+        :type hexose_differences: Iterable(int)
+        :return: the estimated cost
+        :rtype: CostEstimate
+        :raises ValueError: if no glycans may occupy a site
         """
 
-        self.glycan_library.append(Glycan(name=name, composition=composition))
+        site_libraries = []
+        for site in range(1, self.sites + 1):
+            site_library = self.collapsed_site_library(site)
+            if not site_library:
+                raise ValueError(
+                    "No glycans for glycosylation site {}.".format(site))
+            site_libraries.append(site_library)
+
+        # combinations and multisets: sites with equal glycan libraries
+        # contribute multisets with repetition
+        combinations = 1
+        sites_per_library = Counter()  # type: Counter
+        for site in range(1, self.sites + 1):
+            glycans = self.site_library(site)
+            combinations *= len(glycans)
+            sites_per_library[tuple(id(g) for g in glycans)] += 1
+        multisets = 1
+        for glycans, sites in sites_per_library.items():
+            multisets *= (factorial(len(glycans) + sites - 1)
+                          // factorial(sites)
+                          // factorial(len(glycans) - 1))
+
+        # encode each composition as a single integer (mixed radix);
+        # hexoses come first and have room for the hexose differences,
+        # such that gaining hexoses never carries into other digits
+        hexose_differences = sorted({int(d) for d in hexose_differences
+                                     if d > 0})
+        site_counts = [[dict(c.composition.iteritems()) for c, _ in library]
+                       for library in site_libraries]
+        monosaccharides = sorted({m for counts in site_counts
+                                  for c in counts for m in c},
+                                 key=lambda m: (m != "Hex", m))
+        radix = []
+        for m in monosaccharides:
+            max_count = sum(max(c.get(m, 0) for c in counts)
+                            for counts in site_counts)
+            if m == "Hex":
+                max_count += max(hexose_differences, default=0)
+            radix.append(int(max_count) + 1)
+        weights = np.cumprod([1] + radix[:-1]).tolist()
+        dtype = np.int64 if np.prod(radix, dtype=float) < 2**62 else object
+
+        compositions = np.zeros(1, dtype=dtype)
+        for counts in site_counts:
+            codes = np.array([sum(int(c.get(m, 0)) * w
+                                  for m, w in zip(monosaccharides, weights))
+                              for c in counts], dtype=dtype)
+            compositions = np.unique(
+                (compositions[:, None] + codes[None, :]).ravel())
+
+        # hexose chains and glycation graph edges
+        if monosaccharides and monosaccharides[0] == "Hex":
+            hexoses = compositions % radix[0]
+        else:
+            hexoses = np.zeros(len(compositions), dtype=dtype)
+        chain_keys, chain = np.unique(compositions - hexoses,
+                                      return_inverse=True)
+        chain = chain.ravel()
+        max_hexoses = np.zeros(len(chain_keys), dtype=dtype)
+        min_hexoses = np.full(len(chain_keys), 2**62, dtype=dtype)
+        np.maximum.at(max_hexoses, chain, hexoses)
+        np.minimum.at(min_hexoses, chain, hexoses)
+        chain_length = int((max_hexoses - min_hexoses).max()) + 1
+        edges = sum(int(np.isin(compositions + d, compositions).sum())
+                    for d in hexose_differences)
+
+        # enumeration keeps one int64 per combination, and the yielded
+        # glycoforms keep the glycan ids of all aliases; the correction
+        # computes the (length × length) inverse of each chain
+        # and the derivatives of all glycation fractions
+        id_bytes = np.min_scalar_type(len(self.glycan_library)).itemsize
+        memory = int(
+            combinations * (_COMBINATION_BYTES + (8 + id_bytes) * self.sites)
+            + len(compositions) * _GLYCOFORM_BYTES
+            + edges * _EDGE_BYTES
+            + len(chain_keys) * chain_length ** 2 * 8
+            * (3 + len(hexose_differences)))
+
+        return CostEstimate(combinations=combinations,
+                            multisets=multisets,
+                            compositions=len(compositions),
+                            chains=len(chain_keys),
+                            chain_length=chain_length,
+                            edges=edges,
+                            memory=memory)
 
     def unique_glycoforms(self) -> Iterator[PTMComposition]:
         """
@@ -77,39 +307,282 @@ class Glycoprotein:
         :return: a generator that yields all unique
                  monosaccharide compositions
         :rtype: Iterator(PTMComposition)
+        :raises ValueError: if no glycans may occupy a site
         """
 
+        # glycans with equal composition are collapsed before enumeration,
+        # so that they do not enlarge the cartesian product
+        site_libraries = []
+        for site in range(1, self.sites + 1):
+            site_library = self.collapsed_site_library(site)
+            if not site_library:
+                raise ValueError(
+                    "No glycans for glycosylation site {}.".format(site))
+            site_libraries.append(site_library)
+
         # determine all glycoforms by calculating the cartesian product
-        glycoforms = []
-        for combination in product(self.glycan_library, repeat=self.sites):
-            composition = sum([PTMComposition(ptm.composition)
-                               for ptm in combination],
-                              PTMComposition())
-            name = "/".join([ptm.name for ptm in combination])
-            abundance = np.prod([ptm.abundance for ptm in combination])
-            glycoforms.append((composition, name, abundance))
-
-        # eliminate glycoforms with equal monosaccharide composition
-        glycoforms = pd.DataFrame(
-            glycoforms, columns=["composition", "name", "abundance"])
-        glycoforms["group_key"] = glycoforms.apply(
-            lambda p: hash(p.composition), axis=1)
-        glycoforms_agg = (
-            glycoforms
-            .groupby("group_key")
-            .agg({"composition": lambda x: x.iloc[0],
-                  "name": lambda n: " or ".join(n),
-                  "abundance": sum})
-            .reset_index(drop=True)
-        )
-        # noinspection PyUnresolvedReferences
-        glycoforms_agg.abundance = (glycoforms_agg.abundance
-                                    / glycoforms_agg.abundance.max()
-                                    * 100)
-
-        # annotate each representative glycoform by name
-        # and relative abundance and create the generator
-        for _, row in glycoforms_agg.iterrows():
-            row.composition.name = row["name"]
-            row.composition.abundance = row.abundance
-            yield row.composition
+        # of the compositions that may occupy each site;
+        # glycoforms with equal monosaccharide composition are merged
+        # as they are produced; each combination is only kept as its
+        # position in the cartesian product (a single int64),
+        # from which its aliases are restored below
+        site_counts = [[Counter(dict(c.composition)) for c, _ in library]
+                       for library in site_libraries]
+        site_abundances = [[sum(g.abundance for g in glycans)
+                            for _, glycans in library]
+                           for library in site_libraries]
+        shape = [len(library) for library in site_libraries]
+        glycoforms = {}  # type: Dict[tuple, List]
+        for code, combination in enumerate(
+                product(*[range(groups) for groups in shape])):
+            counts = Counter()
+            abundance = 1.0
+            for site, group in enumerate(combination):
+                counts.update(site_counts[site][group])
+                abundance *= site_abundances[site][group]
+            key = tuple(sorted(counts.items()))
+            try:
+                glycoform = glycoforms[key]
+                glycoform[0].append(code)
+                glycoform[1] += abundance
+            except KeyError:
+                glycoforms[key] = [array("q", [code]), abundance]
+        max_abundance = max(a for _, a in glycoforms.values())
+        scale = 100 / max_abundance if max_abundance else 0.0
+
+        # annotate each representative glycoform by its aliases
+        # and relative abundance and create the generator;
+        # each combination stands for all combinations of its aliases,
+        # which are listed in the order of the glycan library
+        library_index = {id(g): i for i, g in enumerate(self.glycan_library)}
+        site_indices = [[np.array([library_index[id(g)] for g in glycans])
+                         for _, glycans in library]
+                        for library in site_libraries]
+        glycan_ids = _glycan_ids(self)
+        for key, (codes, abundance) in glycoforms.items():
+            combinations = np.stack(
+                np.unravel_index(np.frombuffer(codes, dtype=np.int64),
+                                 shape), axis=1)
+            aliases = np.concatenate([
+                _product([site_indices[site][group]
+                          for site, group in enumerate(combination)])
+                for combination in combinations])
+            aliases = aliases[np.lexsort(aliases.T[::-1])]
+            yield Glycoform(dict(key) if key else None,
+                            aliases=glycan_ids[aliases],
+                            glycan_names=self.glycan_names,
+                            abundance=abundance * scale)
+
+
+def _glycan_ids(glycoprotein: Glycoprotein) -> np.ndarray:
+    """
+    Map the glycans of a library to their glycan ids.
+
+    :param Glycoprotein glycoprotein: the glycoprotein
+    :return: the glycan id of each glycan in the library,
+             using the smallest sufficient integer type
+    :rtype: np.ndarray
+    """
+
+    return np.array([glycoprotein.glycan_id(g.name)
+                     for g in glycoprotein.glycan_library],
+                    dtype=np.min_scalar_type(len(glycoprotein.glycan_names)))
+
+
+def _product(arrays: List[np.ndarray]) -> np.ndarray:
+    """
+    Calculate the cartesian product of arrays in lexicographic order.
+
+    :param list(np.ndarray) arrays: one-dimensional arrays
+    :return: array of shape (product × arrays)
+    :rtype: np.ndarray
+    """
+
+    if not arrays:
+        return np.zeros((1, 0), dtype=np.int64)
+    grids = np.meshgrid(*arrays, indexing="ij")
+    return np.stack([g.ravel() for g in grids], axis=1)
+
+
+class GlycoformIndex:
+    """
+    The unique glycoforms of a glycoprotein, which are updated
+    incrementally when glycans are added to or removed from its library.
+
+    Each glycoform keeps the combinations of glycans (its aliases)
+    that yield its composition. Adding a glycan only enumerates the
+    combinations in which it occupies at least one site, and removing
+    a glycan only retracts these combinations, such that the cost
+    of a change is proportional to the number of affected combinations.
+
+    :ivar Glycoprotein glycoprotein: the glycoprotein, whose library
+                                     is modified by this index
+    :ivar dict aliases: maps composition keys (see
+                        :meth:`PTMComposition.composition_key`) to a dict
+                        which maps each alias (a tuple of glycans,
+                        one per site) to its abundance
+
+    .. automethod:: __init__
+    """
+
+    def __init__(self,
+                 glycoprotein: Glycoprotein) -> None:
+        """
+        Enumerate all glycoforms of a glycoprotein
+        by adding its glycans one after another.
+
+        :param Glycoprotein glycoprotein: the glycoprotein
+        :return: nothing
+        :rtype: None
+        """
+
+        self.glycoprotein = glycoprotein
+        self.aliases = {}  # type: Dict[tuple, Dict[tuple, float]]
+        self._counts = {}  # type: Dict[int, Counter]
+        library = glycoprotein.glycan_library
+        glycoprotein.glycan_library = []
+        for glycan in library:
+            glycoprotein.glycan_library.append(glycan)
+            self._insert(glycan)
+
+    def _combinations(self,
+                      glycan: Glycan) -> Iterator[Tuple[Glycan, ...]]:
+        """
+        Enumerate all combinations of the current library
+        in which a glycan occupies at least one site.
+        Each combination is produced once by distinguishing
+        the first site occupied by the glycan.
+
+        :param Glycan glycan: a glycan of the library
+        :return: a generator of combinations
+        :rtype: Iterator(tuple(Glycan))
+        """
+
+        site_libraries = [self.glycoprotein.site_library(site)
+                          for site in range(1, self.glycoprotein.sites + 1)]
+        for first, library in enumerate(site_libraries):
+            if not any(g is glycan for g in library):
+                continue
+            yield from product(*(
+                [g for g in library if g is not glycan] if site < first
+                else [glycan] if site == first
+                else library
+                for site, library in enumerate(site_libraries)))
+
+    def _key(self,
+             combination: Tuple[Glycan, ...]) -> tuple:
+        """
+        Determine the composition key of a combination.
+
+        :param tuple(Glycan) combination: glycans, one per site
+        :return: the composition key
+        :rtype: tuple
+        """
+
+        counts = Counter()  # type: Counter
+        for g in combination:
+            if id(g) not in self._counts:
+                self._counts[id(g)] = Counter(
+                    {m: int(c) for m, c in PTMComposition(g.composition)
+                     .composition.iteritems()})
+            counts.update(self._counts[id(g)])
+        return tuple(sorted((m, c) for m, c in counts.items() if c))
+
+    def _insert(self,
+                glycan: Glycan) -> Set[tuple]:
+        """
+        Add the combinations of a glycan which is already
+        part of the library.
+
+        :param Glycan glycan: the glycan
+        :return: keys of all glycoforms whose aliases changed
+        :rtype: set(tuple)
+        """
+
+        changed = set()
+        for combination in self._combinations(glycan):
+            key = self._key(combination)
+            abundance = 1.0
+            for g in combination:
+                abundance *= g.abundance
+            self.aliases.setdefault(key, {})[combination] = abundance
+            changed.add(key)
+        return changed
+
+    def add_glycan(self,
+                   name: str,
+                   composition: Optional[str]=None,
+                   site: Optional[int]=None) -> Set[tuple]:
+        """
+        Add a glycan to the library and enumerate its combinations.
+
+        :param str name: name of the glycan
+        :param str composition: monosaccharide composition
+        :param int site: glycosylation site to which the glycan
+                         is restricted (default: any site)
+        :return: keys of all glycoforms whose aliases changed,
+                 including new glycoforms
+        :rtype: set(tuple)
+        :raises ValueError: if the site does not exist
+        """
+
+        self.glycoprotein.add_glycan(name, composition, site)
+        return self._insert(self.glycoprotein.glycan_library[-1])
+
+    def remove_glycan(self,
+                      name: str) -> Set[tuple]:
+        """
+        Remove all glycans with the given name from the library
+        and retract their combinations.
+
+        :param str name: name of the glycan
+        :return: keys of all glycoforms whose aliases changed,
+                 including glycoforms without remaining aliases,
+                 which are removed
+        :rtype: set(tuple)
+        :raises ValueError: if the library does not contain the glycan
+        """
+
+        glycans = [g for g in self.glycoprotein.glycan_library
+                   if g.name == name]
+        if not glycans:
+            raise ValueError(
+                "Glycan '{}' is not part of the library.".format(name))
+        changed = set()
+        for glycan in glycans:
+            for combination in self._combinations(glycan):
+                key = self._key(combination)
+                del self.aliases[key][combination]
+                if not self.aliases[key]:
+                    del self.aliases[key]
+                changed.add(key)
+            self.glycoprotein.glycan_library = [
+                g for g in self.glycoprotein.glycan_library
+                if g is not glycan]
+            self._counts.pop(id(glycan), None)
+        return changed
+
+    def glycoform(self,
+                  key: tuple) -> Glycoform:
+        """
+        Create a glycoform from all its aliases,
+        which are listed in the order of the glycan library
+        (as by :meth:`Glycoprotein.unique_glycoforms`).
+
+        :param tuple key: composition key of the glycoform
+        :return: the glycoform; its abundance is the sum of the
+                 (unscaled) abundances of its aliases
+        :rtype: Glycoform
+        """
+
+        library_index = {id(g): i for i, g in
+                         enumerate(self.glycoprotein.glycan_library)}
+        aliases = self.aliases[key]
+        indices = np.array([[library_index[id(g)] for g in a]
+                            for a in aliases], dtype=np.int64)
+        indices = indices.reshape(len(aliases), self.glycoprotein.sites)
+        indices = indices[np.lexsort(indices.T[::-1])]
+        return Glycoform(dict(key) if key else None,
+                         aliases=_glycan_ids(self.glycoprotein)[indices],
+                         glycan_names=self.glycoprotein.glycan_names,
+                         abundance=sum(aliases.values()))
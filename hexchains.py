@@ -0,0 +1,709 @@
+from collections import namedtuple
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from glycan import PTMComposition
+
+#: engines for solving the correction system:
+#: ``"dense"`` solves all chains by batched forward substitution
+#: over the diagonals of the banded system (see :meth:`HexChains.bands`),
+#: ``"fft"`` deconvolves all chains by the glycation profile
+#: (see :meth:`HexChains.deconvolve`)
+ENGINES = ("dense", "fft")
+
+#: result of :meth:`HexChains.prune`: boolean array ``keep``, which is True
+#: for nodes to be kept, arrays ``sources`` and ``sinks`` of the node indices
+#: of dropped edges between kept nodes, an array ``residuals`` bounding
+#: the change of each row of the correction system caused by dropped edges,
+#: and ``omitted``, a bound for the sum of the absolute corrected
+#: abundances of dropped nodes
+Pruning = namedtuple(
+    "Pruning", ["keep", "sources", "sinks", "residuals", "omitted"])
+
+
+class HexChains:
+    """
+    Glycoforms arranged in chains of increasing hexose count.
+
+    Glycation only adds hexoses to a glycoform. Hence, only glycoforms
+    that share all monosaccharides except hexoses are connected
+    in the glycation graph, and each such chain can be corrected
+    independently. Within a chain, the weight of an edge only depends
+    on the difference in hexoses, so the correction amounts to
+    a banded lower-triangular (Toeplitz-like) linear system.
+    All chains are padded to a common length and solved at once.
+
+    :ivar list nodes: glycoforms in their original order
+    :ivar np.ndarray chain: chain index of each node
+    :ivar np.ndarray position: position of each node within its chain
+    :ivar int length: length of the padded chains
+    :ivar np.ndarray mask: boolean array of shape (chains × length),
+                           which is True wherever a node exists
+    :ivar np.ndarray index: array of shape (chains × length)
+                            containing node indices (-1 for missing nodes)
+    :ivar dict dropped: maps a hexose difference k to a boolean array
+                        of shape (chains × length-k), which is True
+                        for edges removed by :meth:`drop_edges`
+                        (indexed by the position of their source)
+
+    .. automethod:: __init__
+    """
+
+    def __init__(self,
+                 nodes: Iterable[PTMComposition]) -> None:
+        """
+        Group glycoforms into hexose chains.
+
+        :param nodes: glycoforms
+        :type nodes: Iterable(PTMComposition)
+        :return: nothing
+        :rtype: None
+        """
+
+        self.nodes = []  # type: List[PTMComposition]
+        self.chain = np.zeros(0, dtype=int)
+        self._hexoses = np.zeros(0, dtype=int)
+        self._chain_keys = {}  # type: Dict[tuple, int]
+        self.update(added=nodes)
+
+    def update(self,
+               added: Iterable[PTMComposition]=(),
+               removed: Iterable[PTMComposition]=()) -> None:
+        """
+        Remove and add glycoforms. Removed glycoforms are dropped
+        from their chains and added glycoforms are appended,
+        such that the remaining nodes keep their order; only the
+        compositions of added glycoforms are inspected.
+        Edges dropped by :meth:`drop_edges` are restored.
+
+        :param added: glycoforms to add
+        :type added: Iterable(PTMComposition)
+        :param removed: glycoforms to remove (the same objects
+                        as passed earlier)
+        :type removed: Iterable(PTMComposition)
+        :return: nothing
+        :rtype: None
+        """
+
+        removed_ids = {id(n) for n in removed}
+        if removed_ids:
+            keep = np.array([id(n) not in removed_ids for n in self.nodes],
+                            dtype=bool)
+            self.nodes = [n for n, k in zip(self.nodes, keep) if k]
+            self.chain = self.chain[keep]
+            self._hexoses = self._hexoses[keep]
+
+            # renumber the remaining chains
+            used, chain = np.unique(self.chain, return_inverse=True)
+            self.chain = chain.ravel()
+            keys = {i: key for key, i in self._chain_keys.items()}
+            self._chain_keys = {keys[i]: j for j, i in enumerate(used)}
+
+        chain = []
+        hexoses = []
+        for n in added:
+            self.nodes.append(n)
+            hexoses.append(int(n.composition.get("Hex", 0)))
+            key = tuple(sorted((m, int(c))
+                               for m, c in n.composition.items()
+                               if m != "Hex"))
+            chain.append(self._chain_keys.setdefault(key,
+                                                     len(self._chain_keys)))
+        self.chain = np.concatenate(
+            (self.chain, np.array(chain, dtype=int))).astype(int)
+        self._hexoses = np.concatenate(
+            (self._hexoses, np.array(hexoses, dtype=int))).astype(int)
+
+        # the first position of each chain holds its smallest hexose count
+        offset = np.full(len(self._chain_keys), np.iinfo(int).max)
+        np.minimum.at(offset, self.chain, self._hexoses)
+        self.position = self._hexoses - offset[self.chain]
+        self.length = int(self.position.max(initial=-1)) + 1
+        self.mask = np.zeros((len(self._chain_keys), self.length), dtype=bool)
+        self.mask[self.chain, self.position] = True
+        self.index = np.full(self.mask.shape, -1)
+        self.index[self.chain, self.position] = np.arange(len(self.nodes))
+        self.dropped = {}  # type: Dict[int, np.ndarray]
+
+    def edge_mask(self,
+                  k: int) -> np.ndarray:
+        """
+        Determine the edges which add k hexoses.
+
+        :param int k: hexose difference
+        :return: boolean array of shape (chains × length-k), which is True
+                 wherever an edge starts (i.e., source and sink exist
+                 and the edge was not dropped)
+        :rtype: np.ndarray
+        """
+
+        edges = self.mask[:, k:] & self.mask[:, :-k]
+        if k in self.dropped:
+            edges &= ~self.dropped[k]
+        return edges
+
+    def drop_edges(self,
+                   sources: np.ndarray,
+                   sinks: np.ndarray) -> None:
+        """
+        Remove edges from the correction system,
+        e.g., edges pruned by :meth:`prune`.
+        The fft engine does not support dropped edges.
+
+        :param np.ndarray sources: node indices of the sources
+        :param np.ndarray sinks: node indices of the sinks
+        :return: nothing
+        :rtype: None
+        :raises ValueError: if an edge does not connect
+                            two nodes of the same chain
+        """
+
+        sources = np.asarray(sources, dtype=int)
+        sinks = np.asarray(sinks, dtype=int)
+        k = self.position[sinks] - self.position[sources]
+        if ((self.chain[sources] != self.chain[sinks]) | (k <= 0)).any():
+            raise ValueError("Edges must connect nodes of the same chain "
+                             "in order of increasing hexose count.")
+        for k_edge in np.unique(k):
+            edges = k == k_edge
+            dropped = self.dropped.setdefault(
+                int(k_edge),
+                np.zeros((len(self.mask), self.length - k_edge), dtype=bool))
+            dropped[self.chain[sources[edges]],
+                    self.position[sources[edges]]] = True
+
+    def to_padded(self,
+                  values: np.ndarray) -> np.ndarray:
+        """
+        Distribute per-node values to the padded chain array.
+
+        :param np.ndarray values: array whose first axis corresponds to nodes
+        :return: array of shape (chains × length × …),
+                 zero at missing nodes
+        :rtype: np.ndarray
+        """
+
+        values = np.asarray(values, dtype=float)
+        padded = np.zeros(self.mask.shape + values.shape[1:])
+        padded[self.chain, self.position] = values
+        return padded
+
+    def from_padded(self,
+                    padded: np.ndarray) -> np.ndarray:
+        """
+        Collect per-node values from the padded chain array.
+
+        :param np.ndarray padded: array of shape (chains × length × …)
+        :return: array whose first axis corresponds to nodes
+        :rtype: np.ndarray
+        """
+
+        return padded[self.chain, self.position]
+
+    def operator(self,
+                 c: np.ndarray) -> np.ndarray:
+        """
+        Assemble the correction operator A of all chains,
+        such that A · corrected abundances = observed abundances.
+
+        Row i of a chain contains 1 - (sum of fractions transferred
+        to existing successors) on its diagonal and the fraction
+        c[k-1] transferred from an existing node i-k below the diagonal.
+        Rows of missing nodes are unit rows.
+        The engines only use the diagonals of A (see :meth:`bands`);
+        the full matrix serves as a reference.
+
+        :param np.ndarray c: glycation fractions; c[k-1] is the fraction
+                             that gains k hexoses; an array of shape
+                             (samples × k) yields one operator per sample
+        :return: array of shape (chains × length × length)
+                 or (samples × chains × length × length)
+        :rtype: np.ndarray
+        """
+
+        c = np.asarray(c, dtype=float)
+        batch = c.shape[:-1]
+        chains, length = self.mask.shape
+        a = np.zeros(batch + (chains, length, length))
+        out_c = np.zeros(batch + (chains, length))
+        for k in range(1, min(c.shape[-1], length - 1) + 1):
+            c_k = c[..., k - 1, None, None]
+            edges = self.edge_mask(k)
+            rows = np.arange(k, length)
+            a[..., rows, rows - k] = c_k * edges
+            out_c[..., :-k] += c_k * edges
+        diagonal = np.arange(length)
+        a[..., diagonal, diagonal] = np.where(self.mask, 1 - out_c, 1)
+        return a
+
+    def bands(self,
+              c: np.ndarray) -> Tuple[np.ndarray, Dict[int, np.ndarray]]:
+        """
+        Extract the nonzero diagonals of the correction operator A
+        (see :meth:`operator`) without assembling it.
+
+        :param np.ndarray c: glycation fractions of shape (k)
+                             or (samples × k)
+        :return: the diagonal of shape (chains × length) and a dict
+                 which maps each hexose difference k to the k-th
+                 subdiagonal of shape (chains × length-k), i.e.,
+                 A[i+k, i] at position i (both with a leading
+                 samples axis for glycation fractions of shape
+                 (samples × k))
+        :rtype: tuple(np.ndarray, dict)
+        """
+
+        c = np.asarray(c, dtype=float)
+        out_c = np.zeros(c.shape[:-1] + self.mask.shape)
+        lower = {}
+        for k in range(1, min(c.shape[-1], self.length - 1) + 1):
+            lower[k] = c[..., k - 1, None, None] * self.edge_mask(k)
+            out_c[..., :-k] += lower[k]
+        return np.where(self.mask, 1 - out_c, 1.0), lower
+
+    @staticmethod
+    def substitute(diagonal: np.ndarray,
+                   lower: Dict[int, np.ndarray],
+                   rhs: np.ndarray,
+                   transpose: bool=False) -> np.ndarray:
+        """
+        Solve the banded lower-triangular systems A·x = rhs
+        (or Aᵀ·x = rhs) of all chains by forward (or back) substitution,
+        which takes O(length · k) operations per chain and column.
+
+        :param np.ndarray diagonal: diagonal of A, see :meth:`bands`
+        :param dict lower: subdiagonals of A, see :meth:`bands`
+        :param np.ndarray rhs: right-hand sides of shape
+                               (… × chains × length × columns),
+                               where the leading axes broadcast
+                               against those of the bands
+        :param bool transpose: solve Aᵀ·x = rhs if True
+        :return: the solution, of the same shape as rhs
+        :rtype: np.ndarray
+        """
+
+        length = diagonal.shape[-1]
+        x = np.zeros(np.broadcast_shapes(diagonal.shape + (1,), rhs.shape))
+        positions = range(length - 1, -1, -1) if transpose else range(length)
+        for p in positions:
+            value = rhs[..., p, :].astype(float)
+            for k, band in lower.items():
+                if transpose and p + k < length:
+                    value = value - band[..., p, None] * x[..., p + k, :]
+                elif not transpose and p >= k:
+                    value = value - band[..., p - k, None] * x[..., p - k, :]
+            x[..., p, :] = value / diagonal[..., p, None]
+        return x
+
+    def operator_derivative(self,
+                            k: int,
+                            corr_abundances: np.ndarray) -> np.ndarray:
+        """
+        Calculate the product of the derivative of the correction operator
+        with respect to c[k-1] and the padded corrected abundances.
+
+        :param int k: hexose difference
+        :param np.ndarray corr_abundances: padded corrected abundances
+                                           of shape (chains × length × …)
+        :return: array of the same shape as corr_abundances
+        :rtype: np.ndarray
+        """
+
+        result = np.zeros(corr_abundances.shape)
+        if k < self.length:
+            edges = self.edge_mask(k)
+            edges = edges.reshape(edges.shape
+                                  + (1,) * (corr_abundances.ndim - 2))
+            result[:, k:] += edges * corr_abundances[:, :-k]
+            result[:, :-k] -= edges * corr_abundances[:, :-k]
+        return result
+
+    def deconvolve(self,
+                   c: np.ndarray,
+                   rhs: np.ndarray) -> np.ndarray:
+        """
+        Solve the correction system of all chains by deconvolution.
+
+        Apart from a few rows, the correction operator is the
+        lower-triangular Toeplitz matrix T whose first column is
+        h = (1 - sum(c), c[0], c[1], …). Its inverse is again
+        lower-triangular Toeplitz with the power series 1/h as first
+        column, so T⁻¹ is applied to all chains at once by a single
+        FFT convolution. The remaining rows (missing nodes and nodes
+        lacking some successors) are taken into account by solving
+        a small system per chain whose size equals the number of such rows.
+
+        This requires a total glycation fraction below 0.5,
+        otherwise the power series 1/h diverges.
+
+        :param np.ndarray c: glycation fractions
+        :param np.ndarray rhs: padded right-hand sides
+                               of shape (chains × length × columns)
+        :return: padded solution of shape (chains × length × columns)
+        :rtype: np.ndarray
+        :raises ValueError: if the sum of absolute glycation fractions
+                            is 0.5 or more
+        """
+
+        chains, length = self.mask.shape
+        c = np.asarray(c, dtype=float)[:max(length - 1, 0)]
+        if np.abs(c).sum() >= 0.5:
+            raise ValueError(
+                "The fft engine requires a total glycation fraction "
+                "below 0.5 (found {:.3g}); use the dense engine instead."
+                .format(np.abs(c).sum()))
+
+        # first column of T⁻¹ via power series inversion of h
+        h = np.concatenate(([1 - c.sum()], c))
+        g = np.zeros(length)
+        if length:
+            g[0] = 1 / h[0]
+        for n in range(1, length):
+            k = min(n, len(c))
+            g[n] = -np.dot(h[1:k + 1], g[n - 1::-1][:k]) / h[0]
+
+        # z = T⁻¹ · rhs for all chains and columns via FFT
+        size = 1 << max(2 * length - 2, 0).bit_length()
+        z = np.fft.irfft(np.fft.rfft(rhs, size, axis=1)
+                         * np.fft.rfft(g, size)[None, :, None],
+                         size, axis=1)[:, :length]
+
+        # rows of A that differ from T: missing nodes below the last node
+        # of a chain and nodes that lack some of their successors
+        out_c = np.zeros((chains, length))
+        for k, c_k in enumerate(c, start=1):
+            out_c[:, :-k] += c_k * self.edge_mask(k)
+        defect = np.where(self.mask, c.sum() - out_c, 0.0)
+        last = length - 1 - np.argmax(self.mask[:, ::-1], axis=1)
+        special = ((defect > 0) & self.mask) | (
+            ~self.mask & (np.arange(length) < last[:, None]))
+        count = special.sum(axis=1)
+        q = int(count.max(initial=0))
+        if q == 0:
+            return z * self.mask[..., None]
+
+        # positions of special rows, padded with the first row
+        rows = np.zeros((chains, q), dtype=int)
+        valid = np.arange(q) < count[:, None]
+        rows[valid] = np.nonzero(special)[1]
+
+        # W = T⁻¹[:, rows] for each chain
+        t_inv = np.tril(g[np.subtract.outer(np.arange(length),
+                                            np.arange(length))
+                          .clip(0)])
+        w = t_inv[:, rows].transpose(1, 0, 2)
+        w_rows = np.take_along_axis(w, rows[:, :, None], axis=1)
+        z_rows = np.take_along_axis(z, rows[:, :, None], axis=1)
+
+        # defect rows: r + δ·(z + W·r) = 0; missing rows: z + W·r = 0
+        d = np.take_along_axis(defect, rows, axis=1)[:, :, None]
+        exists = np.take_along_axis(self.mask, rows, axis=1)[:, :, None]
+        eye = np.broadcast_to(np.eye(q), (chains, q, q))
+        m = np.where(exists, eye + d * w_rows, w_rows)
+        b = -np.where(exists, d * z_rows, z_rows)
+        m = np.where(valid[:, :, None], m, eye)
+        b = np.where(valid[:, :, None], b, 0.0)
+        r = np.linalg.solve(m, b)
+        return (z + w @ r) * self.mask[..., None]
+
+    def _solve_padded(self,
+                      c: np.ndarray,
+                      rhs: np.ndarray,
+                      engine: str) -> np.ndarray:
+        """
+        Solve the correction system of all chains
+        with the chosen engine.
+
+        :param np.ndarray c: glycation fractions, either of shape (k)
+                             or (samples × k)
+        :param np.ndarray rhs: padded right-hand sides
+                               of shape (chains × length × columns)
+                               or (samples × chains × length × columns)
+        :param str engine: see :data:`ENGINES`
+        :return: padded solution of the same shape as rhs
+        :rtype: np.ndarray
+        :raises ValueError: if the engine is unknown
+        """
+
+        if engine == "dense":
+            diagonal, lower = self.bands(c)
+            return self.substitute(diagonal, lower, rhs)
+        elif engine == "fft":
+            if any(d.any() for d in self.dropped.values()):
+                raise ValueError("The fft engine does not support "
+                                 "dropped edges.")
+            if np.ndim(c) > 1:
+                return np.stack([self.deconvolve(c_s, rhs_s)
+                                 for c_s, rhs_s in zip(c, rhs)])
+            return self.deconvolve(c, rhs)
+        else:
+            raise ValueError("Unknown correction engine: '{}'".format(engine))
+
+    def solve(self,
+              c: np.ndarray,
+              abundances: np.ndarray,
+              engine: str="dense") -> np.ndarray:
+        """
+        Correct abundances of all chains at once.
+
+        :param np.ndarray c: glycation fractions, either of shape (k)
+                             or, for one glycation profile per sample,
+                             of shape (samples × k)
+        :param np.ndarray abundances: observed abundances of all nodes,
+                                      either of shape (nodes)
+                                      or (nodes × samples)
+        :param str engine: see :data:`ENGINES`
+        :return: corrected abundances of the same shape as abundances
+        :rtype: np.ndarray
+        """
+
+        abundances = np.asarray(abundances, dtype=float)
+        rhs = self.to_padded(abundances.reshape(len(abundances), -1))
+        if np.ndim(c) > 1:
+            # one system with a single column per sample
+            rhs = np.moveaxis(rhs, -1, 0)[..., None]
+            corr = np.moveaxis(self._solve_padded(c, rhs, engine)[..., 0],
+                               0, -1)
+        else:
+            corr = self._solve_padded(c, rhs, engine)
+        return self.from_padded(corr).reshape(abundances.shape)
+
+    def jacobian(self,
+                 c: np.ndarray,
+                 abundances: np.ndarray,
+                 engine: str="dense") -> Tuple[np.ndarray,
+                                               np.ndarray,
+                                               np.ndarray]:
+        """
+        Correct abundances and calculate the derivatives
+        of corrected abundances with respect to the inputs.
+
+        Only the corrected abundances are obtained with the chosen engine.
+        The derivatives require the full inverse of each chain's operator,
+        which is always calculated by substitution (as by the dense
+        engine), since deconvolving an identity matrix is slower.
+
+        :param np.ndarray c: glycation fractions, either of shape (k)
+                             or, for one glycation profile per sample,
+                             of shape (samples × k)
+        :param np.ndarray abundances: observed abundances of all nodes,
+                                      either of shape (nodes)
+                                      or (nodes × samples)
+        :param str engine: see :data:`ENGINES`
+        :return: a tuple of
+
+                 * corrected abundances of the same shape as abundances,
+                 * an array of shape (nodes × length) containing
+                   the derivatives with respect to observed abundances
+                   of the nodes in the same chain
+                   (positions correspond to :attr:`index`);
+                   for one glycation profile per sample, the shape is
+                   (nodes × length × samples),
+                 * an array of shape (nodes × k) or
+                   (nodes × k × samples) containing
+                   the derivatives with respect to glycation fractions
+                   (of the respective sample)
+        :rtype: tuple(np.ndarray, np.ndarray, np.ndarray)
+        """
+
+        abundances = np.asarray(abundances, dtype=float)
+        columns = abundances.reshape(len(abundances), -1)
+        k_max = np.shape(c)[-1]
+
+        # A⁻¹y is obtained exactly as by solve(), such that corrected
+        # abundances do not depend on whether derivatives are needed;
+        # A⁻¹ is calculated per sample for individual glycation profiles,
+        # and the sample axis is moved to the end afterwards
+        corr = self.to_padded(self.solve(c, columns, engine))
+        diagonal, lower = self.bands(c)
+        inverse = self.substitute(diagonal, lower, np.eye(self.length))
+        if np.ndim(c) > 1:
+            inverse = np.moveaxis(inverse, 0, -1)
+
+        # d(A⁻¹y)/dc = -A⁻¹ · dA/dc · A⁻¹y
+        d_c = np.zeros((len(self.nodes), k_max, columns.shape[1]))
+        for k in range(1, k_max + 1):
+            d_corr = self.operator_derivative(k, corr)
+            if np.ndim(c) > 1:
+                d_corr = np.einsum("cijs,cjs->cis", inverse, d_corr)
+            else:
+                d_corr = inverse @ d_corr
+            d_c[:, k - 1] = -self.from_padded(d_corr)
+        return (self.from_padded(corr).reshape(abundances.shape),
+                self.from_padded(inverse),
+                d_c.reshape((len(self.nodes), k_max) + abundances.shape[1:]))
+
+    def sensitivities(self,
+                      c: np.ndarray,
+                      abundances: np.ndarray,
+                      nodes: np.ndarray=None,
+                      engine: str="dense") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate the derivatives of selected corrected abundances
+        with respect to the inputs by adjoint solves.
+
+        Row i of A⁻¹ solves the transposed (upper-triangular) system
+        Aᵀx = eᵢ, so the derivatives of a corrected abundance with respect
+        to all observed abundances of its chain are obtained by a single
+        back substitution. The substitutions of all selected nodes are
+        batched, and their cost only grows with the number of selected
+        nodes. The derivatives with respect to glycation fractions
+        follow as -xᵀ · dA/dc · A⁻¹y.
+
+        :param np.ndarray c: glycation fractions of shape (k)
+        :param np.ndarray abundances: observed abundances of all nodes
+        :param np.ndarray nodes: indices of the selected nodes
+                                 (default: all nodes)
+        :param str engine: engine for correcting abundances,
+                           see :data:`ENGINES`
+        :return: a tuple of
+
+                 * an array of shape (selected nodes × length) containing
+                   the derivatives with respect to observed abundances
+                   of the nodes in the same chain
+                   (positions correspond to :attr:`index`),
+                 * an array of shape (selected nodes × k) containing
+                   the derivatives with respect to glycation fractions
+        :rtype: tuple(np.ndarray, np.ndarray)
+        """
+
+        c = np.asarray(c, dtype=float)
+        if nodes is None:
+            nodes = np.arange(len(self.nodes))
+        nodes = np.asarray(nodes, dtype=int)
+        chain = self.chain[nodes]
+        diagonal, lower = self.bands(c)
+
+        # back substitution for Aᵀx = e, batched over the selected nodes
+        e = np.zeros((len(nodes), self.length, 1))
+        e[np.arange(len(nodes)), self.position[nodes]] = 1.0
+        x = self.substitute(diagonal[chain],
+                            {k: band[chain] for k, band in lower.items()},
+                            e, transpose=True)[..., 0]
+
+        corr = self.to_padded(self.solve(c, abundances, engine))
+        d_c = np.zeros((len(nodes), len(c)))
+        for k in range(1, len(c) + 1):
+            d_corr = self.operator_derivative(k, corr)[chain]
+            d_c[:, k - 1] = -np.einsum("bq,bq->b", x, d_corr)
+        return x, d_c
+
+    def magnitude_bound(self,
+                        c: np.ndarray,
+                        abundances: np.ndarray) -> Tuple[np.ndarray,
+                                                         np.ndarray]:
+        """
+        Bound the magnitude of corrected abundances without solving.
+
+        Row i of the correction system reads
+        A[i,i]·x[i] + Σ c[k-1]·x[i-k] = y[i], hence
+        abs(x[i]) ≤ (abs(y[i]) + Σ abs(c[k-1]·x[i-k])) / abs(A[i,i]),
+        which yields a bound for each node from the bounds
+        of its predecessors.
+
+        :param np.ndarray c: glycation fractions of shape (k)
+        :param np.ndarray abundances: observed abundances of all nodes
+        :return: padded arrays of shape (chains × length) containing
+                 a bound for the absolute corrected abundance
+                 and for the absolute inflow of each node
+                 (infinite if the system is singular)
+        :rtype: tuple(np.ndarray, np.ndarray)
+        """
+
+        diagonal, lower = self.bands(c)
+        diagonal = np.abs(diagonal)
+        y = np.abs(self.to_padded(abundances))
+        bound = np.zeros(self.mask.shape)
+        inflow = np.zeros(self.mask.shape)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for p in range(self.length):
+                for k, band in lower.items():
+                    if p >= k:
+                        band = np.abs(band[:, p - k])
+                        inflow[:, p] += np.where(
+                            band > 0, band * bound[:, p - k], 0.0)
+                bound[:, p] = np.where(
+                    diagonal[:, p] > 0,
+                    (y[:, p] + inflow[:, p]) / diagonal[:, p],
+                    np.inf)
+        return bound * self.mask, inflow * self.mask
+
+    def prune(self,
+              c: np.ndarray,
+              abundances: np.ndarray,
+              epsilon: float) -> Pruning:
+        """
+        Select edges and nodes whose removal changes corrected abundances
+        by a small, bounded amount. An edge is dropped if the abundance
+        it carries (corrected abundance of its source times the glycation
+        fraction) cannot exceed epsilon. A node is dropped, together with
+        all its edges, if both its observed abundance and its inflow
+        cannot exceed epsilon.
+
+        :param np.ndarray c: glycation fractions of shape (k)
+        :param np.ndarray abundances: observed abundances of all nodes
+        :param float epsilon: threshold for carried abundances
+        :return: the nodes and edges to drop and the bounds required
+                 by :meth:`error_bound`
+        :rtype: Pruning
+        """
+
+        bound, inflow = self.magnitude_bound(c, abundances)
+        c = np.abs(np.asarray(c, dtype=float))
+        y = np.abs(self.to_padded(abundances))
+        drop_node = (self.mask & np.isfinite(bound)
+                     & (y <= epsilon) & (inflow <= epsilon))
+
+        residuals = np.zeros(self.mask.shape)
+        sources, sinks = [], []
+        for k in range(1, min(len(c), self.length - 1) + 1):
+            edges = self.edge_mask(k)
+            carried = c[k - 1] * bound[:, :-k]
+            dropped = edges & ((carried <= epsilon)
+                               | drop_node[:, :-k] | drop_node[:, k:])
+            carried = np.where(dropped, carried, 0.0)
+            residuals[:, :-k] += carried
+            residuals[:, k:] += carried
+
+            # dropped edges between kept nodes
+            between = dropped & ~drop_node[:, :-k] & ~drop_node[:, k:]
+            chain, position = np.nonzero(between)
+            sources.append(self.index[chain, position])
+            sinks.append(self.index[chain, position + k])
+
+        return Pruning(
+            keep=~self.from_padded(drop_node),
+            sources=np.concatenate(sources or [np.zeros(0, dtype=int)]),
+            sinks=np.concatenate(sinks or [np.zeros(0, dtype=int)]),
+            residuals=self.from_padded(residuals),
+            omitted=float(bound[drop_node].sum()))
+
+    def error_bound(self,
+                    c: np.ndarray,
+                    residuals: np.ndarray) -> float:
+        """
+        Bound the total absolute change of corrected abundances
+        caused by perturbing each row of the correction system
+        by at most the given residuals.
+
+        The change e solves A·e = r with abs(r) ≤ residuals.
+        Since A is lower-triangular, abs(A⁻¹) ≤ M⁻¹ elementwise
+        for M = abs(diag(A)) - abs(offdiag(A)), so that
+        Σ abs(e) ≤ wᵀ·residuals with Mᵀw = 1.
+
+        :param np.ndarray c: glycation fractions of shape (k)
+        :param np.ndarray residuals: bounds of the row perturbations
+                                     of all nodes
+        :return: bound for the sum of absolute changes
+        :rtype: float
+        """
+
+        diagonal, lower = self.bands(c)
+        if (diagonal == 0).any():
+            return np.inf
+        w = self.substitute(np.abs(diagonal),
+                            {k: -np.abs(band) for k, band in lower.items()},
+                            self.mask[..., None].astype(float),
+                            transpose=True)[..., 0]
+        return float(np.dot(self.from_padded(w), residuals))
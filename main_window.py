@@ -91,12 +91,14 @@ class Ui_MainWindow(object):
         self.twLibrary = QtWidgets.QTableWidget(self.groupBox_3)
         self.twLibrary.setAcceptDrops(True)
         self.twLibrary.setObjectName("twLibrary")
-        self.twLibrary.setColumnCount(2)
+        self.twLibrary.setColumnCount(3)
         self.twLibrary.setRowCount(0)
         item = QtWidgets.QTableWidgetItem()
         self.twLibrary.setHorizontalHeaderItem(0, item)
         item = QtWidgets.QTableWidgetItem()
         self.twLibrary.setHorizontalHeaderItem(1, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.twLibrary.setHorizontalHeaderItem(2, item)
         self.twLibrary.horizontalHeader().setStretchLastSection(True)
         self.verticalLayout_3.addWidget(self.twLibrary)
         self.horizontalLayout_5 = QtWidgets.QHBoxLayout()
@@ -181,6 +183,10 @@ class Ui_MainWindow(object):
         self.btSaveGraph.setEnabled(False)
         self.btSaveGraph.setObjectName("btSaveGraph")
         self.horizontalLayout_8.addWidget(self.btSaveGraph)
+        self.btSaveSession = QtWidgets.QPushButton(self.groupBox_4)
+        self.btSaveSession.setEnabled(False)
+        self.btSaveSession.setObjectName("btSaveSession")
+        self.horizontalLayout_8.addWidget(self.btSaveSession)
         self.verticalLayout_5.addLayout(self.horizontalLayout_8)
         self.verticalLayout_7.addWidget(self.groupBox_4)
         self.groupBox_5 = QtWidgets.QGroupBox(self.centralwidget)
@@ -203,8 +209,20 @@ class Ui_MainWindow(object):
         self.btCorrect = QtWidgets.QPushButton(self.centralwidget)
         self.btCorrect.setObjectName("btCorrect")
         self.horizontalLayout_6.addWidget(self.btCorrect)
+        self.pbLoading = QtWidgets.QProgressBar(self.centralwidget)
+        self.pbLoading.setVisible(False)
+        self.pbLoading.setProperty("value", 0)
+        self.pbLoading.setObjectName("pbLoading")
+        self.horizontalLayout_6.addWidget(self.pbLoading)
+        self.btCancelLoading = QtWidgets.QPushButton(self.centralwidget)
+        self.btCancelLoading.setVisible(False)
+        self.btCancelLoading.setObjectName("btCancelLoading")
+        self.horizontalLayout_6.addWidget(self.btCancelLoading)
         spacerItem5 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
         self.horizontalLayout_6.addItem(spacerItem5)
+        self.btOpenSession = QtWidgets.QPushButton(self.centralwidget)
+        self.btOpenSession.setObjectName("btOpenSession")
+        self.horizontalLayout_6.addWidget(self.btOpenSession)
         self.btSampleData = QtWidgets.QPushButton(self.centralwidget)
         self.btSampleData.setObjectName("btSampleData")
         self.horizontalLayout_6.addWidget(self.btSampleData)
@@ -238,6 +256,8 @@ class Ui_MainWindow(object):
         item.setText(_translate("MainWindow", "Glycan"))
         item = self.twLibrary.horizontalHeaderItem(1)
         item.setText(_translate("MainWindow", "Composition"))
+        item = self.twLibrary.horizontalHeaderItem(2)
+        item.setText(_translate("MainWindow", "Site"))
         self.btLoadLibrary.setText(_translate("MainWindow", "Load ..."))
         self.groupBox_4.setTitle(_translate("MainWindow", "Results"))
         self.lbResults.setText(_translate("MainWindow", "(results)"))
@@ -258,8 +278,11 @@ class Ui_MainWindow(object):
         self.lbAggResults.setText(_translate("MainWindow", "most abundant glycoforms"))
         self.btSaveResults.setText(_translate("MainWindow", "Save results ..."))
         self.btSaveGraph.setText(_translate("MainWindow", "Save glycation graph ..."))
+        self.btSaveSession.setText(_translate("MainWindow", "Save session ..."))
         self.groupBox_5.setTitle(_translate("MainWindow", "Log"))
         self.btCorrect.setText(_translate("MainWindow", "Correct abundances"))
+        self.btCancelLoading.setText(_translate("MainWindow", "Cancel loading"))
+        self.btOpenSession.setText(_translate("MainWindow", "Open session ..."))
         self.btSampleData.setText(_translate("MainWindow", "Load sample data"))
         self.btHelp.setText(_translate("MainWindow", "Help"))
         self.btHelp.setShortcut(_translate("MainWindow", "F1"))
@@ -0,0 +1,259 @@
+from collections import namedtuple
+from contextlib import contextmanager
+import threading
+import time
+import tracemalloc
+from typing import Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+#: memory usage of a single stage; all sizes in bytes.
+#: ``traced_peak`` is the peak of memory allocated by Python during the stage,
+#: ``traced_delta`` the part of it that is still alive at the end of the stage,
+#: ``rss_start``, ``rss_end`` and ``rss_peak`` are the resident set size
+#: of the process at the start, end and the maximum sampled during the stage
+#: (None if unavailable), and ``top_allocators`` is a list of
+#: :class:`tracemalloc.Statistic` for the source lines that allocated
+#: most of ``traced_delta``
+StageMemory = namedtuple(
+    "StageMemory",
+    ["name", "time", "traced_peak", "traced_delta",
+     "rss_start", "rss_end", "rss_peak", "top_allocators"])
+
+
+def _format_size(size: Optional[int]) -> str:
+    """
+    Format a size in bytes with a binary prefix.
+
+    :param int size: size in bytes (or None)
+    :return: the formatted size
+    :rtype: str
+    """
+
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return "{:.1f} {}".format(size, unit)
+        size /= 1024
+    return "{:.1f} GiB".format(size)
+
+
+def current_rss() -> Optional[int]:
+    """
+    Determine the resident set size of the current process.
+    Falls back to the maximum resident set size on systems
+    without a proc filesystem.
+
+    :return: resident set size in bytes or None if unavailable
+    :rtype: int
+    """
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, AttributeError, IndexError, ValueError):
+        pass
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if max_rss > 2**32:  # macOS reports bytes, Linux kibibytes
+        return max_rss
+    return max_rss * 1024
+
+
+class _RSSSampler(threading.Thread):
+    """
+    A thread which periodically samples the resident set size.
+
+    .. automethod:: __init__
+    """
+
+    def __init__(self,
+                 interval: float) -> None:
+        """
+        Initialize the sampler.
+
+        :param float interval: sampling interval in seconds
+        :return: nothing
+        :rtype: None
+        """
+
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        """
+        Sample until :meth:`stop` is called.
+
+        :return: nothing
+        :rtype: None
+        """
+
+        while not self._stopped.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def stop(self) -> None:
+        """
+        Stop sampling and wait for the thread.
+
+        :return: nothing
+        :rtype: None
+        """
+
+        self._stopped.set()
+        self.join()
+
+
+class MemoryProfile:
+    """
+    Memory accounting for the stages of a correction
+    (e.g., parsing, enumeration, graph build, solve and export).
+    Each stage is measured by tracemalloc and by sampling
+    the resident set size. A disabled profile measures nothing,
+    such that instrumented code need not check whether profiling is on.
+
+    Example::
+
+        with MemoryProfile() as profile:
+            with profile.stage("parsing"):
+                glycoforms = read_clean_datasets("glycoforms.csv")
+        print(profile.report())
+
+    :ivar list stages: a :data:`StageMemory` for each completed stage
+
+    .. automethod:: __init__
+    """
+
+    def __init__(self,
+                 enabled: bool=True,
+                 top: int=10,
+                 interval: float=0.01) -> None:
+        """
+        Initialize the profile.
+
+        :param bool enabled: measure stages if True
+        :param int top: number of top allocators recorded per stage
+        :param float interval: RSS sampling interval in seconds
+        :return: nothing
+        :rtype: None
+        """
+
+        self.enabled = enabled
+        self.top = top
+        self.interval = interval
+        self.stages = []  # type: List[StageMemory]
+        self._started_tracing = False
+
+    def __enter__(self) -> "MemoryProfile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stop(self) -> None:
+        """
+        Stop tracing memory allocations if this profile started it.
+
+        :return: nothing
+        :rtype: None
+        """
+
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self,
+              name: str) -> Iterator[None]:
+        """
+        Measure the memory used by the enclosed code.
+
+        :param str name: name of the stage
+        :return: a context manager
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.clear_traces()  # only trace allocations of this stage
+        rss_start = current_rss()
+        sampler = _RSSSampler(self.interval)
+        sampler.start()
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            traced, traced_peak = tracemalloc.get_traced_memory()
+            end_snapshot = tracemalloc.take_snapshot()
+            sampler.stop()
+            rss_end = current_rss()
+            peak = sampler.peak
+            if rss_end is not None and (peak is None or rss_end > peak):
+                peak = rss_end
+            top_allocators = (
+                end_snapshot
+                .filter_traces([tracemalloc.Filter(False, __file__)])
+                .statistics("lineno")[:self.top])
+            self.stages.append(StageMemory(
+                name=name,
+                time=elapsed,
+                traced_peak=traced_peak,
+                traced_delta=traced,
+                rss_start=rss_start,
+                rss_end=rss_end,
+                rss_peak=peak,
+                top_allocators=top_allocators))
+
+    def worst_stage(self) -> Optional[StageMemory]:
+        """
+        Find the stage with the highest traced peak.
+
+        :return: the worst stage or None if no stage was measured
+        :rtype: StageMemory
+        """
+
+        if not self.stages:
+            return None
+        return max(self.stages, key=lambda s: s.traced_peak)
+
+    def report(self) -> str:
+        """
+        Summarize the measured stages in a table,
+        followed by the top allocators of the worst stage.
+
+        :return: the report
+        :rtype: str
+        """
+
+        lines = ["{:<14} {:>8} {:>11} {:>11} {:>11} {:>11}".format(
+            "stage", "time [s]", "peak", "delta", "RSS end", "RSS peak")]
+        for s in self.stages:
+            lines.append("{:<14} {:>8.2f} {:>11} {:>11} {:>11} {:>11}".format(
+                s.name, s.time,
+                _format_size(s.traced_peak), _format_size(s.traced_delta),
+                _format_size(s.rss_end), _format_size(s.rss_peak)))
+
+        worst = self.worst_stage()
+        if worst is not None:
+            lines.append("")
+            lines.append("top allocators in stage '{}' (still allocated "
+                         "at the end of the stage):".format(worst.name))
+            for stat in worst.top_allocators:
+                frame = stat.traceback[0]
+                lines.append("{:>11} {:>9} blocks  {}:{}".format(
+                    _format_size(stat.size), stat.count,
+                    frame.filename, frame.lineno))
+        return "\n".join(lines)
@@ -0,0 +1,362 @@
+from concurrent.futures import ProcessPoolExecutor
+import html
+import logging
+import math
+import multiprocessing
+import os
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from PyQt5.QtChart import (QBarCategoryAxis, QBarSeries, QBarSet,
+                           QChart, QValueAxis)
+from PyQt5.QtCore import QCoreApplication, QMargins, QRectF, QSize, Qt
+from PyQt5.QtGui import QColor, QImage, QPainter
+
+translate = QCoreApplication.translate
+
+#: default number of glycoforms shown individually in a report;
+#: the remaining glycoforms are aggregated as "other"
+TOP_GLYCOFORMS = 7
+
+#: size of rendered charts in pixels
+CHART_SIZE = (900, 500)
+
+#: colors of observed and corrected abundances
+OBSERVED_COLOR = "#225ea8"
+CORRECTED_COLOR = "#41b6c4"
+
+# the application of a worker process
+_app = None
+
+
+def aggregate_results(results: pd.DataFrame,
+                      top: Optional[int]=None,
+                      other: str="other") -> pd.DataFrame:
+    """
+    Aggregate all but the most abundant glycoforms.
+
+    :param pd.DataFrame results: results as returned by
+                                 :meth:`GlycationGraph.to_dataframe`,
+                                 i.e., sorted by corrected abundance
+    :param int top: number of glycoforms to keep; the abundances
+                    (and errors) of the remaining glycoforms are summed
+                    in a single row (default: keep all glycoforms);
+                    summing errors is conservative, since glycoforms
+                    sharing glycation fractions have correlated errors
+    :param str other: name of the aggregated row
+    :return: the aggregated results
+    :rtype: pd.DataFrame
+    """
+
+    if top is None:
+        return results
+    agg_abundance = results.iloc[top:].sum(numeric_only=True)
+    agg_abundance["glycoform"] = other
+    return (pd.concat([results.iloc[:top], agg_abundance.to_frame().T],
+                      ignore_index=True)[results.columns]
+            .infer_objects())
+
+
+def results_chart(results: pd.DataFrame,
+                  observed: str="observed",
+                  corrected: str="corrected",
+                  abundance: str="abundance") -> QChart:
+    """
+    Create a bar chart of observed and corrected abundances.
+
+    :param pd.DataFrame results: (aggregated) results,
+                                 see :func:`aggregate_results`
+    :param str observed: label of observed abundances
+    :param str corrected: label of corrected abundances
+    :param str abundance: title of the y-axis
+    :return: the chart, whose only series contains one bar set
+             of observed and one of corrected abundances
+    :rtype: QChart
+    """
+
+    # extract x- and y-values from series
+    x_values = list(results["glycoform"].str.split(" or").str[0])
+    y_values_obs = [float(v) for v in results["abundance"]]
+    y_values_cor = [float(v) for v in results["corr_abundance"]]
+
+    # assemble the chart
+    bar_set_obs = QBarSet(observed)
+    bar_set_obs.append(y_values_obs)
+    bar_set_obs.setColor(QColor(OBSERVED_COLOR))
+    bar_set_cor = QBarSet(corrected)
+    bar_set_cor.append(y_values_cor)
+    bar_set_cor.setColor(QColor(CORRECTED_COLOR))
+    bar_series = QBarSeries()
+    bar_series.append([bar_set_obs, bar_set_cor])
+
+    x_axis = QBarCategoryAxis()
+    x_axis.append(x_values)
+    x_axis.setTitleVisible(False)
+    x_axis.setLabelsAngle(270)
+
+    range_min = min(min(y_values_obs + y_values_cor), 0)
+    range_min = math.floor(range_min / 20) * 20
+    range_max = max(y_values_obs + y_values_cor)
+    range_max = math.ceil(range_max / 20) * 20
+    tick_count = (range_max - range_min) // 20 + 1
+    y_axis = QValueAxis()
+    y_axis.setRange(range_min, range_max)
+    y_axis.setTickCount(tick_count)
+    y_axis.setTitleText(abundance)
+    y_axis.setLabelFormat("%d")
+
+    chart = QChart()
+    chart.addSeries(bar_series)
+    chart.setAxisX(x_axis, bar_series)
+    chart.setAxisY(y_axis, bar_series)
+    chart.legend().setVisible(False)
+    chart.setBackgroundRoundness(0)
+    chart.layout().setContentsMargins(0, 0, 0, 0)
+    chart.setMargins(QMargins(5, 5, 5, 5))
+    return chart
+
+
+def render_chart(chart: QChart,
+                 filename: str,
+                 size: Tuple[int, int]=CHART_SIZE) -> None:
+    """
+    Render a chart without showing it.
+
+    :param QChart chart: the chart
+    :param str filename: name of the output file;
+                         its extension selects PNG or SVG format
+    :param tuple(int, int) size: width and height in pixels
+    :return: nothing
+    :rtype: None
+    :raises OSError: if the file cannot be written
+    """
+
+    from PyQt5.QtWidgets import QGraphicsScene
+
+    scene = QGraphicsScene()
+    scene.addItem(chart)
+    chart.resize(*size)
+    rect = QRectF(0, 0, *size)
+    if filename.endswith("svg"):
+        from PyQt5.QtSvg import QSvgGenerator
+        device = QSvgGenerator()
+        device.setFileName(filename)
+        device.setSize(QSize(*size))
+        device.setViewBox(rect)
+    else:
+        device = QImage(QSize(*size), QImage.Format_ARGB32)
+        device.fill(Qt.white)
+    painter = QPainter()
+    painter.begin(device)
+    painter.setRenderHint(QPainter.Antialiasing)
+    scene.render(painter, target=rect, source=rect,
+                 mode=Qt.IgnoreAspectRatio)
+    painter.end()
+    if isinstance(device, QImage) and not device.save(filename):
+        raise OSError("Cannot write '{}'.".format(filename))
+
+
+def _html_page(name: str,
+               results: pd.DataFrame,
+               chart: str,
+               top: Optional[int]) -> str:
+    """
+    Create the HTML report of a sample.
+
+    :param str name: name of the sample
+    :param pd.DataFrame results: aggregated results
+    :param str chart: name of the chart image (relative to the page)
+    :param int top: number of glycoforms shown individually (or None)
+    :return: the HTML page
+    :rtype: str
+    """
+
+    errors = "abundance_error" in results
+    header = ["glycoform", translate("report", "observed"),
+              translate("report", "corrected"), translate("report", "change")]
+    rows = []
+    for _, row in results.iterrows():
+        cells = [html.escape(str(row["glycoform"]).split(" or ", 1)[0])]
+        for column in ("abundance", "corr_abundance"):
+            if errors:
+                cells.append("{:.2f} ± {:.2f}".format(
+                    row[column], row[column + "_error"]))
+            else:
+                cells.append("{:.2f}".format(row[column]))
+        cells.append("{:+.2f}".format(row["corr_abundance"]
+                                      - row["abundance"]))
+        rows.append("<tr>{}</tr>".format(
+            "".join("<td>{}</td>".format(c) for c in cells)))
+    caption = ""
+    if top is not None:
+        caption = translate(
+            "report",
+            "<p>The {} most abundant glycoforms (after correction) "
+            "are shown individually.</p>").format(top)
+    return """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; }}
+th, td {{ padding: 0.2em 0.8em; text-align: right; }}
+th:first-child, td:first-child {{ text-align: left; }}
+tr:nth-child(even) {{ background: #f0f0f0; }}
+.observed {{ color: {observed_color}; }}
+.corrected {{ color: {corrected_color}; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p><span class="observed">&#x25A0;</span> {observed}
+&nbsp;&nbsp;<span class="corrected">&#x25A0;</span> {corrected}</p>
+<img src="{chart}" alt="{title}">
+{caption}
+<table>
+<tr>{header}</tr>
+{rows}
+</table>
+</body>
+</html>
+""".format(title=html.escape(name),
+           observed_color=OBSERVED_COLOR,
+           corrected_color=CORRECTED_COLOR,
+           observed=translate("report", "observed"),
+           corrected=translate("report", "corrected"),
+           chart=html.escape(chart),
+           caption=caption,
+           header="".join("<th>{}</th>".format(h) for h in header),
+           rows="\n".join(rows))
+
+
+def _init_worker() -> None:
+    """
+    Create the (offscreen) Qt application of a worker process,
+    which is required to render charts.
+
+    :return: nothing
+    :rtype: None
+    """
+
+    global _app
+    from PyQt5.QtWidgets import QApplication
+
+    # override an inherited platform (e.g., xcb on a headless node)
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    _app = QApplication.instance() or QApplication(["cafog-report"])
+
+
+def render_report(filename: str,
+                  output_dir: str,
+                  top: Optional[int]=TOP_GLYCOFORMS,
+                  formats: Tuple[str, ...]=("png", "svg")) -> str:
+    """
+    Render the report of a sample: charts of its aggregated results
+    in the given formats and an HTML page that shows the first chart
+    and a table of the aggregated results.
+    A Qt application must exist (see :func:`render_reports`).
+
+    :param str filename: results of the sample as written by cafog.py
+                         (e.g., ``<sample>_corr.csv``)
+    :param str output_dir: directory for the report
+    :param int top: number of glycoforms shown individually
+                    (default: 7; None shows all glycoforms)
+    :param tuple(str) formats: chart formats ("png" and/or "svg")
+    :return: name of the HTML page
+    :rtype: str
+    :raises OSError: if a file cannot be read or written
+    :raises ValueError: if the results are invalid
+    """
+
+    name = os.path.splitext(os.path.basename(filename))[0]
+    if name.endswith("_corr"):
+        name = name[:-len("_corr")]
+    results = pd.read_csv(filename)
+    for column in ("glycoform", "abundance", "corr_abundance"):
+        if column not in results:
+            raise ValueError("{} lacks the column '{}'."
+                             .format(filename, column))
+    results = aggregate_results(results, top,
+                                translate("report", "other"))
+
+    charts = []
+    for extension in formats:
+        chart = os.path.join(output_dir, "{}.{}".format(name, extension))
+        render_chart(results_chart(results,
+                                   translate("report", "observed"),
+                                   translate("report", "corrected"),
+                                   translate("report", "abundance")),
+                     chart)
+        charts.append(os.path.basename(chart))
+
+    page = os.path.join(output_dir, name + ".html")
+    with open(page, "w", encoding="utf-8") as f:
+        f.write(_html_page(name, results, charts[0] if charts else "", top))
+    return page
+
+
+def _render(arguments: Tuple) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Render a report in a worker process.
+
+    :param tuple arguments: arguments of :func:`render_report`
+    :return: name of the result file, name of the HTML page
+             (None if failed) and error message (None if successful)
+    :rtype: tuple(str, str, str)
+    """
+
+    try:
+        return arguments[0], render_report(*arguments), None
+    except (OSError, ValueError) as e:
+        return arguments[0], None, str(e)
+    except Exception as e:
+        # any other failure must not abort the reports of other samples
+        return arguments[0], None, "{}: {}".format(type(e).__name__, e)
+
+
+def render_reports(filenames: List[str],
+                   output_dir: str,
+                   top: Optional[int]=TOP_GLYCOFORMS,
+                   formats: Tuple[str, ...]=("png", "svg"),
+                   workers: Optional[int]=None) -> Dict[str, Optional[str]]:
+    """
+    Render the reports of many samples in parallel worker processes,
+    which use the offscreen Qt platform, such that no display is needed.
+    An index page ``index.html`` links all reports.
+
+    :param list(str) filenames: results of the samples,
+                                see :func:`render_report`
+    :param str output_dir: directory for the reports,
+                           which is created if it does not exist
+    :param int top: number of glycoforms shown individually
+    :param tuple(str) formats: chart formats ("png" and/or "svg")
+    :param int workers: number of worker processes
+                        (default: number of processors)
+    :return: maps each result file to its HTML page (None if failed)
+    :rtype: dict
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+    pages = {}  # type: Dict[str, Optional[str]]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker) as executor:
+        for filename, page, error in executor.map(
+                _render, [(f, output_dir, top, formats) for f in filenames]):
+            if error is not None:
+                logging.error("Report of '{}' failed: {}"
+                              .format(filename, error))
+            pages[filename] = page
+
+    links = ["<li><a href=\"{0}\">{1}</a></li>".format(
+        html.escape(os.path.basename(page)),
+        html.escape(os.path.splitext(os.path.basename(page))[0]))
+        for page in sorted(p for p in pages.values() if p is not None)]
+    with open(os.path.join(output_dir, "index.html"), "w",
+              encoding="utf-8") as f:
+        f.write("<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+                "<title>cafog</title>\n</head>\n<body>\n<ul>\n{}\n</ul>\n"
+                "</body>\n</html>\n".format("\n".join(links)))
+    return pages
@@ -0,0 +1,432 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import logging
+import os
+import socketserver
+import stat
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from correction import (CorrectedArrays, GlycationGraph, assemble_topology,
+                        correct_arrays, read_library)
+from glycoprotein import library_rows
+
+#: default port of the HTTP server, which only listens on localhost
+DEFAULT_PORT = 8765
+
+#: default maximum number of glycation graphs in the topology cache
+CACHE_SIZE = 32
+
+#: maximum size of a request body in bytes
+MAX_REQUEST_SIZE = 2**26
+
+
+class TopologyCache:
+    """
+    A thread-safe cache of glycation graphs for :func:`correct_arrays`,
+    which are keyed by the glycan library, the glycans and number of sites
+    of the observed glycoforms and the glycation counts.
+    The least recently used graph is evicted if the cache is full.
+    Concurrent requests for a graph that is not cached yet
+    wait for a single thread to assemble it.
+
+    :ivar int size: maximum number of graphs
+    :ivar int hits: number of requests answered by a cached graph
+                    (or by a graph assembled for a concurrent request)
+    :ivar int misses: number of graphs assembled
+    :ivar int evictions: number of graphs evicted
+
+    .. automethod:: __init__
+    """
+
+    def __init__(self,
+                 size: int=CACHE_SIZE) -> None:
+        """
+        Create an empty cache.
+
+        :param int size: maximum number of graphs
+        :return: nothing
+        :rtype: None
+        """
+
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._graphs = OrderedDict()  # type: OrderedDict
+        self._pending = {}  # type: Dict[tuple, Future]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(glycoforms: np.ndarray,
+            glycation_counts: np.ndarray,
+            library: Optional[pd.DataFrame]) -> tuple:
+        """
+        Determine the key of the graph for a request.
+
+        :param np.ndarray glycoforms: glycoform names
+        :param np.ndarray glycation_counts: glycation counts
+        :param pd.DataFrame library: glycan library (or None)
+        :return: the key
+        :rtype: tuple
+        :raises ValueError: if the library contains an invalid site
+        """
+
+        names = [str(name).split("/") for name in glycoforms]
+        return (None if library is None else tuple(library_rows(library)),
+                frozenset(g for glycans in names for g in glycans),
+                frozenset(len(glycans) for glycans in names),
+                frozenset(int(count) for count in glycation_counts))
+
+    def get(self,
+            glycoforms: np.ndarray,
+            glycation_counts: np.ndarray,
+            library: Optional[pd.DataFrame]) -> Tuple[GlycationGraph, bool]:
+        """
+        Provide the graph for a request, which is assembled
+        (outside the lock, such that other requests proceed) if necessary.
+        Requests for a graph that is being assembled wait for it
+        instead of assembling it again.
+
+        :param np.ndarray glycoforms: glycoform names
+        :param np.ndarray glycation_counts: glycation counts
+        :param pd.DataFrame library: glycan library (or None)
+        :return: the graph and True if it was cached
+        :rtype: tuple(GlycationGraph, bool)
+        :raises ValueError: if the graph cannot be assembled
+        """
+
+        key = self.key(glycoforms, glycation_counts, library)
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+                self.hits += 1
+                return graph, True
+            pending = self._pending.get(key)
+            if pending is None:
+                future = self._pending[key] = Future()  # type: Future
+
+        if pending is not None:
+            # raises the error of the assembling thread, if any
+            graph = pending.result()
+            with self._lock:
+                self.hits += 1
+            return graph, True
+
+        try:
+            graph = assemble_topology(glycoforms, glycation_counts, library)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._pending[key]
+            self.misses += 1
+            self._graphs[key] = graph
+            while len(self._graphs) > self.size:
+                self._graphs.popitem(last=False)
+                self.evictions += 1
+        future.set_result(graph)
+        return graph, False
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report the usage of the cache.
+
+        :return: number of cached ``graphs``, their ``nodes``
+                 and the cache ``size``, ``hits``, ``misses``
+                 and ``evictions``
+        :rtype: dict
+        """
+
+        with self._lock:
+            return {"graphs": len(self._graphs),
+                    "nodes": sum(len(g) for g in self._graphs.values()),
+                    "size": self.size,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions}
+
+
+def _table(value: Any,
+           columns: int) -> pd.DataFrame:
+    """
+    Read a table of a request, which is either a list of rows
+    or a string in the CSV format of the input files.
+
+    :param value: the table
+    :param int columns: number of columns to keep
+    :return: the table
+    :rtype: pd.DataFrame
+    :raises ValueError: if the table is invalid
+    """
+
+    if isinstance(value, str):
+        df = pd.read_csv(io.StringIO(value), comment="#", header=None)
+    elif isinstance(value, list) and value:
+        df = pd.DataFrame(value)
+    else:
+        raise ValueError("A table must be a non-empty list of rows "
+                         "or a string in CSV format.")
+    return df.iloc[:, :columns]
+
+
+def parse_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a correction request into arguments of
+    :func:`correct_arrays`. A request contains the tables
+    ``glycoforms`` (names, abundances and optional errors),
+    ``glycation`` (counts, abundances and optional errors)
+    and, optionally, ``library`` (see :func:`correction.read_library`),
+    each given as a list of rows or as CSV text,
+    and an optional ``engine``.
+
+    :param dict payload: the request
+    :return: keyword arguments of :func:`correct_arrays`
+             (without ``graph``)
+    :rtype: dict
+    :raises ValueError: if the request is invalid
+    """
+
+    if not isinstance(payload, dict):
+        raise ValueError("The request must be a JSON object.")
+    for name in ("glycoforms", "glycation"):
+        if name not in payload:
+            raise ValueError("The request lacks '{}'.".format(name))
+    arguments = {}  # type: Dict[str, Any]
+    for name, prefix in (("glycoforms", ""), ("glycation", "glycation_")):
+        df = _table(payload[name], 3)
+        if df.shape[1] < 2:
+            raise ValueError("'{}' contains too few columns.".format(name))
+        if prefix:
+            arguments["glycation_counts"] = df.iloc[:, 0].values.astype(int)
+        else:
+            arguments["glycoforms"] = df.iloc[:, 0].values.astype(str)
+        arguments[prefix + "abundances"] = (
+            df.iloc[:, 1].values.astype(float))
+        if df.shape[1] > 2:
+            arguments[prefix + "errors"] = (
+                df.iloc[:, 2].fillna(0).values.astype(float))
+    library = payload.get("library")
+    if library is not None:
+        if isinstance(library, str):
+            library = read_library(io.StringIO(library))
+        else:
+            library = _table(library, 3)
+            if library.shape[1] < 2:
+                raise ValueError("'library' contains too few columns.")
+    arguments["library"] = library
+    if "engine" in payload:
+        arguments["engine"] = str(payload["engine"])
+    return arguments
+
+
+def results_dataframe(results: CorrectedArrays) -> pd.DataFrame:
+    """
+    Convert corrected arrays into a table like the output of
+    :meth:`GlycationGraph.to_dataframe` (without compositions).
+
+    :param CorrectedArrays results: the corrected abundances
+    :return: one row per glycoform, sorted by corrected abundance
+    :rtype: pd.DataFrame
+    """
+
+    df = pd.DataFrame({f: getattr(results, f)
+                       for f in CorrectedArrays._fields if f != "rows"},
+                      columns=[f for f in CorrectedArrays._fields
+                               if f != "rows"])
+    order = np.argsort(-df["corr_abundance"].values, kind="mergesort")
+    return df.iloc[order].reset_index(drop=True)
+
+
+class CorrectionHandler(BaseHTTPRequestHandler):
+    """
+    Handle requests to a correction server:
+
+    - ``POST /correct`` corrects the abundances given as a JSON object
+      (see :func:`parse_request`) and returns the fields of
+      :data:`correction.CorrectedArrays` as a JSON object,
+      or a CSV table (see :func:`results_dataframe`)
+      if the request accepts ``text/csv``
+    - ``GET /stats`` returns statistics of the server and its cache
+    """
+
+    server_version = "cafog/1.0"
+
+    def address_string(self) -> str:
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+    def log_message(self,
+                    format: str,
+                    *args: Any) -> None:
+        logging.info("{} {}".format(self.address_string(), format % args))
+
+    def _send(self,
+              status: int,
+              body: bytes,
+              content_type: str="application/json") -> None:
+        """
+        Send a response.
+
+        :param int status: HTTP status code
+        :param bytes body: body of the response
+        :param str content_type: content type of the body
+        :return: nothing
+        :rtype: None
+        """
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self,
+                   status: int,
+                   data: Any) -> None:
+        self._send(status, json.dumps(data).encode())
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") != "/stats":
+            self._send_json(404, {"error": "Unknown path."})
+            return
+        self._send_json(200, self.server.stats())
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/correct":
+            self._send_json(404, {"error": "Unknown path."})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_REQUEST_SIZE:
+            self._send_json(413, {"error": "The request is too large."})
+            return
+
+        start = time.perf_counter()
+        try:
+            arguments = parse_request(json.loads(
+                self.rfile.read(length).decode("utf-8")))
+            arguments.setdefault("engine", self.server.engine)
+            graph, cached = self.server.cache.get(
+                arguments["glycoforms"], arguments["glycation_counts"],
+                arguments["library"])
+            results = correct_arrays(graph=graph, **arguments)
+        except (KeyError, TypeError, ValueError) as e:  # e.g., invalid JSON
+            self.server.count("failures")
+            self._send_json(400, {"error": str(e)})
+            return
+        self.server.count("requests")
+        elapsed = time.perf_counter() - start
+
+        if "text/csv" in self.headers.get("Accept", ""):
+            self._send(200,
+                       results_dataframe(results)
+                       .to_csv(index=False).encode(),
+                       "text/csv")
+            return
+        response = {f: getattr(results, f).tolist()
+                    for f in CorrectedArrays._fields}
+        response["cached"] = cached
+        response["time"] = elapsed
+        self._send_json(200, response)
+
+
+class _ServerMixin:
+    """
+    State shared by the request handlers of a correction server.
+    """
+
+    daemon_threads = True
+
+    def setup_state(self,
+                    engine: str,
+                    cache_size: int) -> None:
+        """
+        Initialize the state of the server.
+
+        :param str engine: default engine for solving correction systems
+        :param int cache_size: maximum number of cached graphs
+        :return: nothing
+        :rtype: None
+        """
+
+        self.engine = engine
+        self.cache = TopologyCache(cache_size)
+        self.started = time.time()
+        self._counts = {"requests": 0, "failures": 0}
+        self._counts_lock = threading.Lock()
+
+    def count(self,
+              name: str) -> None:
+        with self._counts_lock:
+            self._counts[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report statistics of the server and its cache.
+
+        :return: numbers of answered ``requests`` and ``failures``,
+                 the ``uptime`` in seconds and the ``cache`` statistics
+                 (see :meth:`TopologyCache.stats`)
+        :rtype: dict
+        """
+
+        with self._counts_lock:
+            stats = dict(self._counts)  # type: Dict[str, Any]
+        stats["uptime"] = time.time() - self.started
+        stats["cache"] = self.cache.stats()
+        return stats
+
+
+class CorrectionServer(_ServerMixin, ThreadingHTTPServer):
+    """
+    A correction server that listens on a TCP port of localhost
+    and handles each request in a separate thread.
+    """
+
+
+class UnixCorrectionServer(_ServerMixin, socketserver.ThreadingMixIn,
+                           socketserver.UnixStreamServer):
+    """
+    A correction server that listens on a Unix socket
+    and handles each request in a separate thread.
+    """
+
+
+def create_server(port: int=DEFAULT_PORT,
+                  socket_path: Optional[str]=None,
+                  engine: str="dense",
+                  cache_size: int=CACHE_SIZE) -> socketserver.BaseServer:
+    """
+    Create a correction server, which is started
+    by its method ``serve_forever()``.
+
+    :param int port: TCP port on localhost
+    :param str socket_path: listen on this Unix socket instead of a port;
+                            a stale socket file is replaced
+    :param str engine: default engine for solving correction systems
+    :param int cache_size: maximum number of cached graphs
+    :return: the server
+    :rtype: socketserver.BaseServer
+    :raises OSError: if the port or socket is not available
+    """
+
+    if socket_path is None:
+        server = CorrectionServer(("127.0.0.1", port), CorrectionHandler)
+    else:
+        if (os.path.exists(socket_path)
+                and stat.S_ISSOCK(os.stat(socket_path).st_mode)):
+            os.unlink(socket_path)
+        server = UnixCorrectionServer(socket_path, CorrectionHandler)
+    server.setup_state(engine, cache_size)
+    return server
@@ -0,0 +1,152 @@
+from collections import namedtuple
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from uncertainties import ufloat
+
+from correction import GlycationGraph
+
+#: version of the session archive format
+FORMAT_VERSION = 1
+
+#: a correction session: input data (``glycoforms``, ``glycation``
+#: and ``library``, which may be None) as returned by
+#: :func:`correction.read_clean_datasets` and :func:`correction.read_library`,
+#: ``results`` as returned by :meth:`GlycationGraph.to_dataframe`,
+#: and the ``edges`` of the glycation graph as an array of shape (edges × 3)
+#: containing the rows of source and sink in results
+#: and the number of hexoses gained (or None if unknown)
+Session = namedtuple(
+    "Session", ["glycoforms", "glycation", "library", "results", "edges"])
+
+
+def _split_uncertainties(values: pd.Series) -> np.ndarray:
+    """
+    Split values with uncertainties into nominal values and errors.
+
+    :param pd.Series values: values with uncertainties
+    :return: array of shape (2 × values)
+    :rtype: np.ndarray
+    """
+
+    return np.array([[v.nominal_value for v in values],
+                     [v.std_dev for v in values]], dtype=float).reshape(2, -1)
+
+
+def _join_uncertainties(index: pd.Index,
+                        values: np.ndarray) -> pd.Series:
+    """
+    Create a series of values with uncertainties,
+    as returned by :func:`correction.read_clean_datasets`.
+
+    :param pd.Index index: index of the series
+    :param np.ndarray values: nominal values and errors,
+                              see :func:`_split_uncertainties`
+    :return: the series
+    :rtype: pd.Series
+    """
+
+    index = pd.Index(index, name="index_col")
+    return pd.Series([ufloat(n, s) for n, s in values.T],
+                     index=index, name="abundance", dtype=object)
+
+
+def graph_edges(graph: GlycationGraph,
+                results: pd.DataFrame) -> np.ndarray:
+    """
+    Extract the edges of a glycation graph.
+
+    :param GlycationGraph graph: the glycation graph
+    :param pd.DataFrame results: results of the graph
+    :return: array of shape (edges × 3) containing the rows of source
+             and sink in results and the number of hexoses gained
+    :rtype: np.ndarray
+    """
+
+    row = {name: i for i, name in enumerate(results["glycoform"])}
+    return np.array(
+        [(row[source.name], row[sink.name],
+          int(sink.composition.get("Hex", 0))
+          - int(source.composition.get("Hex", 0)))
+         for source, sink in graph.edges],
+        dtype=np.int64).reshape(-1, 3)
+
+
+def save_session(filename: str,
+                 session: Session) -> None:
+    """
+    Save a session in a compressed numpy archive.
+    All arrays are stored as plain numbers or strings,
+    so that loading does not require pickle.
+
+    :param str filename: name of the archive
+    :param Session session: the session
+    :return: nothing
+    :rtype: None
+    """
+
+    arrays = {
+        "version": np.array(FORMAT_VERSION),
+        "glycoforms_index": np.array(session.glycoforms.index, dtype=str),
+        "glycoforms": _split_uncertainties(session.glycoforms),
+        "glycation_index": np.array(session.glycation.index, dtype=np.int64),
+        "glycation": _split_uncertainties(session.glycation),
+        "results_columns": np.array(session.results.columns, dtype=str)}
+    for column in session.results:
+        values = session.results[column].values
+        if values.dtype == object:
+            values = values.astype(str)
+        arrays["results_" + column] = values
+    if session.library is not None:
+        library = session.library.iloc[:, :3]
+        arrays["library"] = np.array(library.fillna("").astype(str),
+                                     dtype=str)
+        arrays["library_numeric"] = np.array(
+            [pd.api.types.is_numeric_dtype(t) for t in library.dtypes])
+    if session.edges is not None:
+        arrays["edges"] = session.edges
+    np.savez_compressed(filename, **arrays)
+
+
+def load_session(filename: str) -> Session:
+    """
+    Load a session saved by :func:`save_session`.
+
+    :param str filename: name of the archive
+    :return: the session
+    :rtype: Session
+    :raises ValueError: if the file is not a session archive
+                        or has an unsupported version
+    """
+
+    with np.load(filename, allow_pickle=False) as archive:
+        if "version" not in archive or "results_columns" not in archive:
+            raise ValueError(
+                "{} is not a cafog session.".format(filename))
+        if int(archive["version"]) > FORMAT_VERSION:
+            raise ValueError(
+                "{} was saved by a newer version of cafog."
+                .format(filename))
+
+        results = pd.DataFrame(
+            {c: archive["results_" + c] for c in archive["results_columns"]},
+            columns=list(archive["results_columns"]))
+        if "glycoform" in results:
+            results["glycoform"] = results["glycoform"].astype(object)
+
+        library = None  # type: Optional[pd.DataFrame]
+        if "library" in archive:
+            library = pd.DataFrame(archive["library"]).replace("", np.nan)
+            for column, numeric in enumerate(archive["library_numeric"]):
+                if numeric:
+                    library[column] = library[column].astype(float)
+
+        return Session(
+            glycoforms=_join_uncertainties(archive["glycoforms_index"],
+                                           archive["glycoforms"]),
+            glycation=_join_uncertainties(archive["glycation_index"],
+                                          archive["glycation"]),
+            library=library,
+            results=results,
+            edges=archive["edges"] if "edges" in archive else None)
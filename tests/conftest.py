@@ -0,0 +1,39 @@
+import logging
+import os
+import sys
+
+import pytest
+
+# the modules of cafog live in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from correction import read_clean_datasets, read_library  # noqa: E402
+
+SAMPLE_DATA = os.path.join(ROOT, "sample_data")
+
+logging.getLogger("correction").setLevel(logging.ERROR)
+
+
+@pytest.fixture(scope="session")
+def sample_files():
+    """
+    Names of the glycoform, glycation and glycan library files
+    of the sample data.
+    """
+
+    return (os.path.join(SAMPLE_DATA, "glycoforms.csv"),
+            os.path.join(SAMPLE_DATA, "glycation.csv"),
+            os.path.join(SAMPLE_DATA, "glycan_library.csv"))
+
+
+@pytest.fixture(scope="session")
+def sample_data(sample_files):
+    """
+    Glycoforms, glycation and glycan library of the sample data.
+    """
+
+    glycoforms, glycation, library = sample_files
+    return (read_clean_datasets(glycoforms),
+            read_clean_datasets(glycation),
+            read_library(library))
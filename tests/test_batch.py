@@ -0,0 +1,142 @@
+from collections import Counter
+import os
+
+import pandas as pd
+import pytest
+
+from batch import (JOURNAL_NAME, MAX_ATTEMPTS, QUARANTINE_NAME,
+                   SHARD_JOURNAL_NAME, SHARD_PART_NAME, Journal, input_hash,
+                   merge_parts, read_manifest, run_batch, shard_samples)
+
+
+def test_read_manifest_names_samples(tmp_path):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("# glycoforms,glycation,library\n"
+                        "plate1/A01.csv,glycation.csv,\n"
+                        "plate2/A01.csv, glycation.csv, library.csv\n")
+    samples = read_manifest(str(manifest))
+    assert [s.name for s in samples] == ["plate1_A01", "plate2_A01"]
+    assert samples[0].library is None
+    assert samples[1].library == os.path.join(str(tmp_path), "library.csv")
+
+
+@pytest.mark.parametrize("line, missing", [(",glycation.csv", "glycoform"),
+                                           ("A01.csv,", "glycation")])
+def test_read_manifest_missing_file(tmp_path, line, missing):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("A00.csv,glycation.csv\n" + line + "\n")
+    with pytest.raises(ValueError,
+                       match="Sample 2 .* lacks a {} file".format(missing)):
+        read_manifest(str(manifest))
+
+
+@pytest.fixture
+def manifest(tmp_path, sample_files):
+    """
+    A manifest of four copies of the sample data (with scaled
+    abundances) and a sample whose glycoform file is invalid.
+    """
+
+    glycoforms, glycation, library = sample_files
+    with open(glycoforms) as f:
+        lines = f.read().splitlines()
+    rows = []
+    for i in range(1, 5):
+        sample = tmp_path / "plate" / "A0{}.csv".format(i)
+        sample.parent.mkdir(exist_ok=True)
+        sample.write_text("\n".join(
+            line if line.startswith("#") else
+            "{},{:.2f},{}".format(line.split(",")[0],
+                                  float(line.split(",")[1]) * i,
+                                  line.split(",")[2])
+            for line in lines) + "\n")
+        rows.append("plate/A0{}.csv,{},{}".format(i, glycation, library))
+    (tmp_path / "plate" / "B01.csv").write_text("A2G0F\n")
+    rows.append("plate/B01.csv,{},{}".format(glycation, library))
+    filename = tmp_path / "manifest.csv"
+    filename.write_text("\n".join(rows) + "\n")
+    return str(filename)
+
+
+def test_run_batch_resumes_and_quarantines(manifest, tmp_path):
+    samples = read_manifest(manifest)
+    output_dir = str(tmp_path / "results")
+
+    outcomes = run_batch(samples, output_dir)
+    assert outcomes == Counter(done=4, failed=1)
+    assert os.path.exists(
+        os.path.join(output_dir, QUARANTINE_NAME, "plate_B01.txt"))
+    results = pd.read_csv(os.path.join(output_dir, "plate_A01_corr.csv"))
+
+    # a restarted run skips finished and quarantined samples
+    outcomes = run_batch(samples, output_dir)
+    assert outcomes == Counter(skipped=4, quarantined=1)
+    outcomes = run_batch(samples, output_dir, retry_failed=True)
+    assert outcomes == Counter(skipped=4, failed=1)
+
+    # changed input is corrected again
+    with open(samples[0].glycoforms, "a") as f:
+        f.write("# changed\n")
+    outcomes = run_batch(samples, output_dir)
+    assert outcomes == Counter(done=1, skipped=3, quarantined=1)
+    pd.testing.assert_frame_equal(
+        pd.read_csv(os.path.join(output_dir, "plate_A01_corr.csv")),
+        results)
+
+
+def test_run_batch_quarantines_aborted_samples(manifest, tmp_path):
+    samples = read_manifest(manifest)[:2]
+    output_dir = tmp_path / "results"
+    output_dir.mkdir()
+    journal = Journal(str(output_dir / JOURNAL_NAME))
+    digest = input_hash(samples[0], {})
+    for _ in range(MAX_ATTEMPTS):
+        journal.record(samples[0].name, "started", digest)
+
+    # a truncated last record (of a killed run) is ignored
+    with open(journal.filename, "a") as f:
+        f.write('{"sample": "plate_A0')
+    outcomes = run_batch(samples, str(output_dir))
+    assert outcomes == Counter(done=1, failed=1)
+    state = Journal(journal.filename).state(samples[0].name, digest)
+    assert state["status"] == "failed"
+    assert "aborted" in state["error"]
+
+
+def test_shard_samples_are_stable(manifest):
+    samples = read_manifest(manifest)
+    shards = [shard_samples(samples, i, 3) for i in range(1, 4)]
+    assert sorted(s.name for shard in shards for s in shard) == \
+        sorted(s.name for s in samples)
+
+    # the assignment depends neither on the order of samples
+    # nor on the other samples of the manifest
+    for i, shard in enumerate(shards, 1):
+        assert shard_samples(samples[::-1], i, 3) == shard[::-1]
+        assert shard_samples(samples[:2], i, 3) == \
+            [s for s in shard if s in samples[:2]]
+
+
+def test_merge_parts_matches_single_run(manifest, tmp_path):
+    samples = read_manifest(manifest)[:4]
+    sharded = str(tmp_path / "sharded")
+    for i in (2, 1, 3):
+        run_batch(shard_samples(samples, i, 3), sharded,
+                  journal_name=SHARD_JOURNAL_NAME.format(i, 3),
+                  part_name=SHARD_PART_NAME.format(i, 3))
+    single = str(tmp_path / "single")
+    run_batch(samples[::-1], single,
+              part_name=SHARD_PART_NAME.format(1, 1))
+
+    merged = merge_parts(sharded)
+    assert list(merged["sample"].unique()) == sorted(s.name for s in samples)
+    pd.testing.assert_frame_equal(merged, merge_parts(single))
+
+
+def test_merge_parts_requires_all_shards(manifest, tmp_path):
+    samples = read_manifest(manifest)[:4]
+    output_dir = str(tmp_path / "results")
+    run_batch(shard_samples(samples, 1, 2), output_dir,
+              part_name=SHARD_PART_NAME.format(1, 2))
+    with pytest.raises(ValueError, match="shards 2 \\(of 2\\) are missing"):
+        merge_parts(output_dir)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correction import GlycationGraph
+
+
+def test_correct_samples_without_errors(sample_data):
+    glycoforms, glycation, library = sample_data
+    G = GlycationGraph(library, glycoforms, glycation, errors=False)
+    G.correct_abundances()
+    expected = G.to_dataframe().set_index("glycoform")["corr_abundance"]
+
+    abundances = pd.DataFrame(
+        {"a": [g.nominal_value for g in glycoforms]},
+        index=glycoforms.index)
+    corr, corr_errors = G.correct_samples(abundances)
+    assert np.allclose(corr["a"].reindex(expected.index), expected)
+    assert (corr_errors.values == 0).all()
+
+
+@pytest.mark.parametrize("errors", [True, False])
+def test_set_abundances_matches_new_graph(sample_data, errors):
+    glycoforms, glycation, library = sample_data
+    if not errors:
+        glycoforms = glycoforms.map(lambda a: a.nominal_value)
+    expected = GlycationGraph(library, glycoforms, glycation, errors=errors)
+    expected.correct_abundances()
+
+    G = GlycationGraph(library, glycoforms * 0.5, glycation, errors=errors)
+    G.correct_abundances()
+    G.set_abundances(glycoforms)
+    G.correct_abundances()
+    pd.testing.assert_frame_equal(G.to_dataframe(), expected.to_dataframe())
+
+
+def _library_variants(library):
+    names = library.iloc[:, 0]
+    reduced = library[~names.isin(["A2G1F", "GnF"])]
+    rotated = pd.concat([library.iloc[5:], library.iloc[:5]])
+    return {"remove": (library, reduced),
+            "add": (reduced, library),
+            "rotate": (library, rotated),
+            "reverse": (library, library.iloc[::-1]),
+            "restore": (rotated, library)}
+
+
+@pytest.mark.parametrize("case", ["remove", "add", "rotate", "reverse",
+                                  "restore"])
+def test_update_library_matches_new_graph(sample_data, case):
+    glycoforms, glycation, library = sample_data
+    old, new = _library_variants(library)[case]
+    G = GlycationGraph(old, glycoforms, glycation)
+    G.correct_abundances()
+    G.update_library(new)
+    G.correct_abundances()
+    result = G.to_dataframe()
+
+    expected = GlycationGraph(new, glycoforms, glycation)
+    expected.correct_abundances()
+    expected = expected.to_dataframe()
+    assert list(result["glycoform"]) == list(expected["glycoform"])
+    assert list(result.columns) == list(expected.columns)
+    numeric = expected.columns[1:]
+    assert np.allclose(result[numeric].values.astype(float),
+                       expected[numeric].values.astype(float),
+                       rtol=1e-12, atol=1e-12)
@@ -0,0 +1,77 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+from uncertainties import ufloat
+
+from correction import GlycationGraph
+from hexchains import ENGINES
+
+
+def _walk(G):
+    """
+    Corrected abundances by the original per-node walk
+    from source to sink, propagating uncertainties with ufloats.
+    """
+
+    corr = {}
+    for n in nx.topological_sort(G):
+        in_abundance = 0.0
+        for pred in G.predecessors(n):
+            in_abundance += corr[pred] * G[pred][n]["c"]
+        out_c = 0.0
+        for succ in G.successors(n):
+            out_c += G[n][succ]["c"]
+        corr[n] = (G.nodes[n]["abundance"] - in_abundance) / (1 - out_c)
+    return pd.DataFrame(
+        [(n.name, a.nominal_value, a.std_dev)
+         for n, a in corr.items()],
+        columns=["glycoform", "corr_abundance", "corr_abundance_error"]
+    ).set_index("glycoform")
+
+
+def _long_chains():
+    """
+    A single-site glycoprotein whose glycans differ only in hexoses,
+    such that all glycoforms form one hexose chain of 40 nodes.
+    """
+
+    library = pd.DataFrame(
+        [("H{}".format(k), "{} Hex, 2 HexNAc".format(k))
+         for k in range(40)])
+    rs = np.random.RandomState(0)
+    abundances = rs.lognormal(size=40)
+    abundances *= 100 / abundances.sum()
+    glycoforms = pd.Series(
+        [ufloat(a, 0.05 * a) for a in abundances],
+        index=pd.Index(library[0], name="index_col"), name="abundance")
+    glycation = pd.Series(
+        [ufloat(80, 2), ufloat(12, 1), ufloat(5, 0.5), ufloat(3, 0.3)],
+        index=pd.Index(range(4), name="index_col"), name="abundance")
+    return glycoforms, glycation, library
+
+
+@pytest.fixture(params=["sample", "long chains"])
+def dataset(request, sample_data):
+    if request.param == "sample":
+        return sample_data
+    return _long_chains()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines_match_walk(dataset, engine):
+    glycoforms, glycation, library = dataset
+    G = GlycationGraph(library, glycoforms, glycation)
+    reference = _walk(G)
+    G.correct_abundances(engine)
+    result = (G.to_dataframe()
+              .set_index("glycoform")
+              [["corr_abundance", "corr_abundance_error"]])
+
+    assert len(result) == len(reference)
+    reference = reference.loc[result.index]
+    assert np.allclose(result["corr_abundance"],
+                       reference["corr_abundance"], rtol=1e-9, atol=1e-12)
+    assert np.allclose(result["corr_abundance_error"],
+                       reference["corr_abundance_error"],
+                       rtol=1e-9, atol=1e-12)
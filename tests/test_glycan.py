@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from correction import GlycationGraph
+from glycan import PTMComposition
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def test_hash_ignores_order():
+    a = PTMComposition({"Hex": 5, "HexNAc": 4, "Fuc": 1})
+    b = PTMComposition({"Fuc": 1, "HexNAc": 4, "Hex": 5})
+    assert a == b
+    assert hash(a) == hash(b)
+    assert len({a, b}) == 1
+
+
+def test_isomers_merged_in_sample_data(sample_data):
+    """
+    Glycoforms with equal monosaccharide composition form a single row;
+    the reference output pins the 93 rows of the sample data.
+    """
+
+    glycoforms, glycation, library = sample_data
+    G = GlycationGraph(library, glycoforms, glycation)
+    G.correct_abundances()
+    result = G.to_dataframe()
+    expected = pd.read_csv(os.path.join(DATA, "sample_corrected.csv"))
+
+    assert len(result) == 93
+    assert list(result["glycoform"]) == list(expected["glycoform"])
+    assert not result[["Fuc", "Hex", "HexNAc", "Neu5Ac"]].duplicated().any()
+    assert ("A2G0F/A2S2F or A2S1G0F/A2S1G0F or A2S2F/A2G0F"
+            in set(result["glycoform"]))
+    for column in ["abundance", "abundance_error",
+                   "corr_abundance", "corr_abundance_error",
+                   "Fuc", "Hex", "HexNAc", "Neu5Ac"]:
+        assert np.allclose(result[column].astype(float), expected[column],
+                           rtol=1e-9, atol=1e-12), column
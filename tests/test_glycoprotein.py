@@ -0,0 +1,27 @@
+from itertools import product
+
+from glycan import PTMComposition
+from glycoprotein import Glycoprotein
+
+
+def test_unique_glycoforms_match_all_combinations(sample_data):
+    """
+    Every combination of glycans is an alias of exactly
+    one glycoform with its monosaccharide composition.
+    """
+
+    library = sample_data[2].iloc[:8]
+    gp = Glycoprotein(sites=3, library=library)
+    expected = {}
+    for combination in product(gp.glycan_library, repeat=gp.sites):
+        composition = sum([PTMComposition(g.composition)
+                           for g in combination], PTMComposition())
+        expected.setdefault(composition.composition_key(), set()).add(
+            "/".join(g.name for g in combination))
+
+    glycoforms = list(gp.unique_glycoforms())
+    assert len(glycoforms) == len(expected)
+    for glycoform in glycoforms:
+        aliases = glycoform.alias_names()
+        assert len(aliases) == len(set(aliases))
+        assert set(aliases) == expected[glycoform.composition_key()]
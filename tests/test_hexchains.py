@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from glycan import PTMComposition
+from hexchains import HexChains
+
+
+@pytest.fixture
+def chains():
+    # chains with missing nodes and dropped edges
+    hc = HexChains(PTMComposition({"Hex": h, "HexNAc": n + 1})
+                   for n in range(6)
+                   for h in range(12)
+                   if (h + n) % 5)
+    hc.drop_edges([0, 3], [1, 5])
+    return hc
+
+
+def test_substitution_matches_operator(chains):
+    rs = np.random.RandomState(0)
+    c = np.array([0.1, 0.03, 0.01])
+    y = rs.rand(len(chains.nodes), 3)
+    reference = chains.from_padded(
+        np.linalg.solve(chains.operator(c), chains.to_padded(y)))
+    assert np.allclose(chains.solve(c, y), reference, rtol=0, atol=1e-14)
+
+    corr, d_abundances, d_c = chains.jacobian(c, y)
+    inverse = chains.from_padded(np.linalg.inv(chains.operator(c)))
+    assert np.allclose(d_abundances, inverse, rtol=0, atol=1e-14)
+    x, d = chains.sensitivities(c, y[:, 0])
+    assert np.allclose(x, inverse, rtol=0, atol=1e-14)
+    assert np.allclose(d, d_c[..., 0], rtol=0, atol=1e-14)
+
+
+def test_substitution_per_sample(chains):
+    rs = np.random.RandomState(1)
+    c = np.array([[0.1, 0.03, 0.01], [0.2, 0.0, 0.05]])
+    y = rs.rand(len(chains.nodes), 2)
+    reference = np.stack(
+        [chains.from_padded(np.linalg.solve(chains.operator(c_s),
+                                            chains.to_padded(y[:, s])))
+         for s, c_s in enumerate(c)], axis=1)
+    assert np.allclose(chains.solve(c, y), reference, rtol=0, atol=1e-14)
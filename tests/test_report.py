@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("PyQt5.QtChart")
+
+from report import aggregate_results  # noqa: E402
+
+
+def test_aggregate_results_sums_errors():
+    results = pd.DataFrame({"glycoform": ["a", "b", "c"],
+                            "abundance": [50.0, 30.0, 20.0],
+                            "abundance_error": [1.0, 3.0, 4.0],
+                            "corr_abundance": [55.0, 25.0, 20.0],
+                            "corr_abundance_error": [1.0, 2.0, 2.5]})
+    aggregated = aggregate_results(results, 1, "other")
+    assert list(aggregated["glycoform"]) == ["a", "other"]
+    assert aggregated.iloc[1]["abundance"] == 50.0
+    assert aggregated.iloc[1]["abundance_error"] == 7.0
+    assert aggregated.iloc[1]["corr_abundance_error"] == 4.5
+
+
+def test_render_reports_unexpected_failure(tmp_path):
+    from report import _render
+
+    results = tmp_path / "sample_corr.csv"
+    results.write_text("glycoform,abundance,corr_abundance\na,1.0,1.0\n")
+    filename, page, error = _render(
+        (str(results), str(tmp_path), "seven", ("png",)))
+    assert filename == str(results)
+    assert page is None
+    assert error.startswith("TypeError")
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from correction import GlycationGraph
+from session import Session, graph_edges, load_session, save_session
+
+
+def test_session_round_trip(sample_data, tmp_path):
+    glycoforms, glycation, library = sample_data
+    G = GlycationGraph(library, glycoforms, glycation)
+    G.correct_abundances()
+    results = G.to_dataframe()
+    session = Session(glycoforms, glycation, library, results,
+                      graph_edges(G, results))
+    filename = str(tmp_path / "session.npz")
+    save_session(filename, session)
+    loaded = load_session(filename)
+
+    for name in ("glycoforms", "glycation"):
+        original, restored = getattr(session, name), getattr(loaded, name)
+        assert list(restored.index) == list(original.index)
+        assert [v.nominal_value for v in restored] == \
+            [v.nominal_value for v in original]
+        assert [v.std_dev for v in restored] == \
+            [v.std_dev for v in original]
+    pd.testing.assert_frame_equal(loaded.library, library,
+                                  check_dtype=False, check_names=False)
+    pd.testing.assert_frame_equal(loaded.results, results)
+    assert np.array_equal(loaded.edges, session.edges)
+    assert len(loaded.edges) == G.number_of_edges()
@@ -0,0 +1,278 @@
+from collections import Counter, namedtuple
+import logging
+import os
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from correction import GlycationGraph, read_clean_datasets, read_library
+
+#: state of a file as seen by :func:`scan`:
+#: modification time (in nanoseconds) and size (in bytes)
+FileState = namedtuple("FileState", ["mtime", "size"])
+
+#: default time (in seconds) between two scans of the watched directory
+POLL_INTERVAL = 1.0
+
+#: suffix of result files, which are never corrected
+RESULT_SUFFIX = "_corr.csv"
+
+
+def scan(directory: str) -> Dict[str, FileState]:
+    """
+    Determine the CSV files in a directory (without subdirectories).
+
+    :param str directory: the directory
+    :return: maps the paths of all CSV files to their state
+    :rtype: dict
+    :raises OSError: if the directory cannot be read
+    """
+
+    states = {}
+    for entry in os.scandir(directory):
+        if not entry.name.lower().endswith(".csv") or not entry.is_file():
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue  # deleted in the meantime
+        states[entry.path] = FileState(mtime=stat.st_mtime_ns,
+                                       size=stat.st_size)
+    return states
+
+
+class Watcher:
+    """
+    Correct glycoform files as they appear in a directory.
+
+    The glycation profile and the glycan library are read once
+    (and again only if their files change), and one glycation graph
+    is kept per set of observed glycans, such that correcting a new file
+    only requires reading it, assigning its abundances to the graph
+    and solving. Directories are polled, i.e., new and changed files
+    are detected by their modification time and size. A file is corrected
+    once its state is unchanged between two scans, such that files
+    that are still being written are not read.
+
+    :ivar str directory: the watched directory
+    :ivar str output_dir: directory for results
+    :ivar dict options: options of the correction
+                        (engine, errors and max_glycoforms)
+
+    .. automethod:: __init__
+    """
+
+    def __init__(self,
+                 directory: str,
+                 output_dir: str,
+                 glycation: str,
+                 library: Optional[str]=None,
+                 engine: str="dense",
+                 errors: bool=True,
+                 max_glycoforms: Optional[int]=None) -> None:
+        """
+        Prepare watching a directory.
+
+        :param str directory: the watched directory
+        :param str output_dir: directory for results, which is created
+                               if it does not exist
+        :param str glycation: name of the glycation file
+        :param str library: name of the glycan library file
+                            (default: no library)
+        :param str engine: engine for solving the correction system
+        :param bool errors: propagate uncertainties if True
+        :param int max_glycoforms: maximum number of glycoforms
+        :return: nothing
+        :rtype: None
+        """
+
+        self.directory = directory
+        self.output_dir = output_dir
+        self.options = {"engine": engine,
+                        "errors": errors,
+                        "max_glycoforms": max_glycoforms}
+        os.makedirs(output_dir, exist_ok=True)
+        self._glycation_file = glycation
+        self._library_file = library
+        self._inputs = {}  # type: Dict[str, Tuple[FileState, Any]]
+        self._graphs = {}  # type: Dict[tuple, GlycationGraph]
+        self._pending = {}  # type: Dict[str, FileState]
+        self._done = {}  # type: Dict[str, FileState]
+        self._ignored = {os.path.abspath(f) for f in (glycation, library)
+                         if f is not None}
+
+    def _input(self,
+               filename: Optional[str],
+               read: Callable[[str], Any]) -> Any:
+        """
+        Provide the content of a shared input file,
+        which is only read again if the file has changed.
+        All glycation graphs are discarded in this case.
+
+        :param str filename: name of the file (or None)
+        :param read: function that reads the file
+        :return: the content of the file (or None)
+        :raises OSError: if the file cannot be read
+        :raises ValueError: if the file is invalid
+        """
+
+        if filename is None:
+            return None
+        stat = os.stat(filename)
+        state = FileState(mtime=stat.st_mtime_ns, size=stat.st_size)
+        cached = self._inputs.get(filename)
+        if cached is not None and cached[0] == state:
+            return cached[1]
+        if cached is not None:
+            logging.info("'{}' has changed.".format(filename))
+        content = read(filename)
+        self._inputs[filename] = (state, content)
+        self._graphs.clear()
+        return content
+
+    def _graph(self,
+               glycoforms: pd.Series) -> GlycationGraph:
+        """
+        Provide a glycation graph with the observed abundances
+        of a sample, reusing the graph of a previous sample
+        with the same glycans if possible.
+
+        :param pd.Series glycoforms: list of glycoforms with abundances/errors
+        :return: the glycation graph
+        :rtype: GlycationGraph
+        :raises OSError: if an input file cannot be read
+        :raises ValueError: if an input file is invalid
+                            or the correction fails
+        """
+
+        errors = self.options["errors"]
+        glycation = self._input(
+            self._glycation_file,
+            lambda f: read_clean_datasets(f, errors=errors))
+        library = self._input(self._library_file, read_library)
+
+        # the glycoprotein of a graph is determined by the library
+        # and the glycans (and number of sites) of observed glycoforms
+        names = [name.split("/") for name in glycoforms.index]
+        key = (frozenset(g for glycans in names for g in glycans),
+               frozenset(len(glycans) for glycans in names))
+        G = self._graphs.get(key)
+        if G is None:
+            G = GlycationGraph(library, glycoforms, glycation,
+                               errors=errors,
+                               max_glycoforms=self.options["max_glycoforms"])
+            self._graphs[key] = G
+        else:
+            G.set_abundances(glycoforms)
+        return G
+
+    def output_file(self,
+                    filename: str) -> str:
+        """
+        Determine the name of the result file of a glycoform file.
+
+        :param str filename: name of the glycoform file
+        :return: name of the result file
+        :rtype: str
+        """
+
+        name = os.path.splitext(os.path.basename(filename))[0]
+        return os.path.join(self.output_dir, name + RESULT_SUFFIX)
+
+    def correct(self,
+                filename: str) -> str:
+        """
+        Correct a glycoform file and write its results atomically.
+
+        :param str filename: name of the glycoform file
+        :return: name of the result file
+        :rtype: str
+        :raises OSError: if an input file cannot be read
+        :raises ValueError: if an input file is invalid
+                            or the correction fails
+        """
+
+        glycoforms = read_clean_datasets(filename,
+                                         errors=self.options["errors"])
+        G = self._graph(glycoforms)
+        G.correct_abundances(self.options["engine"])
+        output = self.output_file(filename)
+        temp_file = output + ".tmp"
+        G.to_dataframe().to_csv(temp_file, index=False)
+        os.replace(temp_file, output)
+        return output
+
+    def poll(self) -> Counter:
+        """
+        Scan the directory once and correct all new or changed files
+        whose state has not changed since the previous scan.
+        Files whose results are newer than the file itself
+        (e.g., from an earlier run) are skipped.
+
+        :return: number of files per outcome ("done" and "failed")
+        :rtype: Counter
+        :raises OSError: if the directory cannot be read
+        """
+
+        outcomes = Counter()  # type: Counter
+        states = scan(self.directory)
+        for filename in sorted(states):
+            state = states[filename]
+            if (filename.endswith(RESULT_SUFFIX)
+                    or os.path.abspath(filename) in self._ignored
+                    or self._done.get(filename) == state):
+                continue
+            if self._pending.get(filename) != state:
+                self._pending[filename] = state  # may still be written
+                continue
+            del self._pending[filename]
+            seen = filename in self._done
+            self._done[filename] = state
+
+            output = self.output_file(filename)
+            if (not seen and os.path.exists(output)
+                    and os.stat(output).st_mtime_ns >= state.mtime):
+                continue
+            start = time.perf_counter()
+            try:
+                self.correct(filename)
+            except Exception as e:  # report any failure, keep watching
+                logging.error("'{}' failed: {}".format(
+                    filename, str(e) or type(e).__name__))
+                logging.debug(traceback.format_exc())
+                outcomes["failed"] += 1
+                continue
+            logging.info("Corrected '{}' in {:.2f} s.".format(
+                filename, time.perf_counter() - start))
+            outcomes["done"] += 1
+
+        # forget deleted files
+        for files in (self._pending, self._done):
+            for filename in set(files) - set(states):
+                del files[filename]
+        return outcomes
+
+    def run(self,
+            interval: float=POLL_INTERVAL,
+            polls: Optional[int]=None) -> None:
+        """
+        Poll the directory until interrupted.
+
+        :param float interval: time (in seconds) between two scans
+        :param int polls: stop after this number of scans
+                          (default: run until interrupted)
+        :return: nothing
+        :rtype: None
+        :raises OSError: if the directory cannot be read
+        """
+
+        logging.info("Watching '{}' …".format(self.directory))
+        while True:
+            self.poll()
+            if polls is not None:
+                polls -= 1
+                if polls <= 0:
+                    return
+            time.sleep(interval)
@@ -71,6 +71,7 @@ class FileTypes:
         "svg": ("svg", "Scalable vector graphics"),
         "gv": ("gv", "GraphViz DOT"),
         "gexf": ("gexf", "Graph exchange XML format"),
+        "npz": ("npz", "cafog session"),
         "": ("", "all files")
     }
 